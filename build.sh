@@ -13,6 +13,11 @@ python manage.py collectstatic --noinput
 # Application des migrations
 echo "🔄 Application des migrations..."
 python manage.py migrate --noinput
+# Table du cache si CACHE_URL=db://… ; sans effet avec Redis ou si elle existe déjà
+python manage.py createcachetable
+
+# Statistiques quotidiennes du dashboard (à relancer chaque nuit : rebuild_daily_stats)
+python manage.py rebuild_daily_stats --tout
 
 # Création des données initiales
 echo "📊 Création des données de démo..."
@@ -122,4 +127,7 @@ print(f'✓ {len(voitures)} voitures créées')
 print('✅ Données de démo créées avec succès!')
 "
 
+# Annonces similaires de tout l'inventaire (le worker les tient ensuite à jour)
+python manage.py rebuild_similar_cars
+
 echo "✅ Build terminé avec succès!"
\ No newline at end of file
@@ -50,8 +50,10 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'voitures.profilage.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'voitures.requetes.QueryBudgetMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -132,6 +134,8 @@ LOGIN_URL = 'connexion'
 if not DEBUG:
     SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
     SECURE_SSL_REDIRECT = True
+    # Les sondes de santé arrivent en HTTP depuis le réseau interne
+    SECURE_REDIRECT_EXEMPT = [r"^healthz$", r"^readyz$"]
     SESSION_COOKIE_SECURE = True
     CSRF_COOKIE_SECURE = True
 
@@ -139,3 +143,92 @@ if not DEBUG:
 DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", "noreply@automarket.local")
 if DEBUG:
     EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
+
+# File de tâches en arrière-plan (python manage.py process_tasks)
+TACHES_MAX_TENTATIVES = int(os.getenv("TACHES_MAX_TENTATIVES", "5"))
+TACHES_DUREE_BAIL = int(os.getenv("TACHES_DUREE_BAIL", "300"))
+# Purge par le worker (toutes les TACHES_PURGE_INTERVALLE secondes) des tâches terminées
+# depuis plus de TACHES_RETENTION_JOURS jours et des tâches abandonnées depuis plus de
+# TACHES_RETENTION_ECHOUEES_JOURS jours
+TACHES_PURGE_INTERVALLE = int(os.getenv("TACHES_PURGE_INTERVALLE", "3600"))
+TACHES_RETENTION_JOURS = int(os.getenv("TACHES_RETENTION_JOURS", "7"))
+TACHES_RETENTION_ECHOUEES_JOURS = int(os.getenv("TACHES_RETENTION_ECHOUEES_JOURS", "30"))
+
+# Cache partagé par tous les workers, choisi par CACHE_URL :
+# - vide ou file:///chemin : fichiers locaux (aucun service externe) ;
+# - redis://hôte:6379/0 : Redis, la configuration de production (render.yaml) ;
+# - db://nom_table : table de la base (python manage.py createcachetable) ; partagée sans
+#   service de plus, mais chaque get/add/set devient une requête SQL (voir le README) ;
+# - locmem:// : mémoire du processus (non partagée, tests).
+def _cache_config(url: str) -> dict:
+    if url.startswith(("redis://", "rediss://")):
+        return {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": url}
+    if url.startswith("db://"):
+        return {"BACKEND": "django.core.cache.backends.db.DatabaseCache", "LOCATION": url[5:] or "cache_automarket"}
+    if url.startswith("locmem://"):
+        return {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": url[9:] or "automarket"}
+    location = url[7:] if url.startswith("file://") else ""
+    return {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": location or str(BASE_DIR / "cache"),
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv("CACHE_MAX_ENTREES", "20000"))},
+    }
+
+
+CACHES = {"default": _cache_config(os.getenv("CACHE_URL", ""))}
+
+# Durée de cache (secondes) des statistiques et listes du dashboard (invalidées par signaux)
+DASHBOARD_CACHE_TIMEOUT = int(os.getenv("DASHBOARD_CACHE_TIMEOUT", "60"))
+
+# Durée de vie (secondes) du compteur de notifications non lues en cache
+NOTIFICATIONS_CACHE_TIMEOUT = int(os.getenv("NOTIFICATIONS_CACHE_TIMEOUT", "300"))
+
+# Compteur de vues des annonces : tampon en mémoire écrit par lots
+VUES_FLUSH_INTERVALLE = int(os.getenv("VUES_FLUSH_INTERVALLE", "10"))
+VUES_FLUSH_SEUIL = int(os.getenv("VUES_FLUSH_SEUIL", "500"))
+# Un visiteur n'est compté qu'une fois par annonce sur cette fenêtre (0 = désactivé)
+VUES_FENETRE_DEDUP = int(os.getenv("VUES_FENETRE_DEDUP", "1800"))
+
+# Durée de cache (secondes) du nombre de résultats / prix moyen de la liste des voitures
+CATALOGUE_STATS_TIMEOUT = int(os.getenv("CATALOGUE_STATS_TIMEOUT", "120"))
+
+# Tranches des facettes prix / année de la liste des voitures (bornes inférieures incluses)
+FACETTES_TRANCHES_PRIX = [10000, 20000, 30000, 50000]
+FACETTES_TRANCHES_ANNEE = [2010, 2015, 2020, 2023]
+
+# Durée de vie maximale (secondes) du contexte de la page d'accueil en cache (invalidé par signaux)
+ACCUEIL_CACHE_TIMEOUT = int(os.getenv("ACCUEIL_CACHE_TIMEOUT", "3600"))
+
+# Délai maximal (ms) de la sonde base de données de /readyz, connexion comprise
+HEALTHCHECK_DB_TIMEOUT_MS = int(os.getenv("HEALTHCHECK_DB_TIMEOUT_MS", "2000"))
+
+# Images envoyées par les utilisateurs : taille maximale du fichier, nombre de pixels
+# maximal avant décodage, et plus grand côté après réduction
+TELEVERSEMENT_MAX_OCTETS = int(os.getenv("TELEVERSEMENT_MAX_OCTETS", str(5 * 1024 * 1024)))
+IMAGES_MAX_PIXELS = int(os.getenv("IMAGES_MAX_PIXELS", "40000000"))
+IMAGES_DIMENSION_MAX = int(os.getenv("IMAGES_DIMENSION_MAX", "2048"))
+
+# Durée (secondes) pendant laquelle les réponses de l'API JSON peuvent être réutilisées sans revalidation
+API_CACHE_MAX_AGE = int(os.getenv("API_CACHE_MAX_AGE", "60"))
+
+# Surveillance des requêtes SQL par vue (budgets @query_budget, détection des N+1) :
+# journalisée en développement, erreur si REQUETES_STRICT (CI)
+REQUETES_SURVEILLANCE = _env_bool("REQUETES_SURVEILLANCE", default=DEBUG)
+REQUETES_STRICT = _env_bool("REQUETES_STRICT", default=False)
+REQUETES_SEUIL_N_PLUS_1 = int(os.getenv("REQUETES_SEUIL_N_PLUS_1", "5"))
+
+# Profilage des requêtes (en-tête X-Profilage du staff, session staff ou échantillon aléatoire)
+PROFILAGE_ACTIF = _env_bool("PROFILAGE_ACTIF", default=False)
+PROFILAGE_ECHANTILLON = float(os.getenv("PROFILAGE_ECHANTILLON", "0"))
+PROFILAGE_JETON = os.getenv("PROFILAGE_JETON", "")
+# "echantillonnage" (pile relevée toutes les PROFILAGE_INTERVALLE_MS ms) ou "cprofile"
+PROFILAGE_MODE = os.getenv("PROFILAGE_MODE", "echantillonnage")
+PROFILAGE_INTERVALLE_MS = int(os.getenv("PROFILAGE_INTERVALLE_MS", "2"))
+PROFILAGE_DOSSIER = Path(os.getenv("PROFILAGE_DOSSIER", str(BASE_DIR / "profils")))
+PROFILAGE_MAX_CAPTURES = int(os.getenv("PROFILAGE_MAX_CAPTURES", "200"))
+
+# Nombre de voisines précalculées par annonce pour « Annonces similaires » (voitures.similaires)
+SIMILAIRES_NOMBRE = int(os.getenv("SIMILAIRES_NOMBRE", "8"))
+
+# Nombre maximal de recherches sauvegardées par utilisateur (alertes nouvelles annonces)
+RECHERCHES_MAX_PAR_UTILISATEUR = int(os.getenv("RECHERCHES_MAX_PAR_UTILISATEUR", "20"))
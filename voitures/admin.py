@@ -1,8 +1,14 @@
 from django.contrib import admin
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
 from django.utils.html import format_html
+from . import notes
+from .catalogue import invalidate_homepage
 from .models import (
     Marque, Modele, Voiture, ImageVoiture, 
-    Favori, Avis, Transaction, Message, Notification
+    Favori, Avis, Transaction, Message, Notification, Tache,
+    FichierMedia, StatistiqueJour, RechercheSauvegardee,
 )
 
 class ImageVoitureInline(admin.TabularInline):
@@ -33,6 +39,23 @@ class MarqueAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_queryset(self, request):
+        # Un seul GROUP BY plutôt que deux COUNT par ligne de la liste
+        return super().get_queryset(request).annotate(
+            nb_modeles=Count('modeles', distinct=True),
+            nb_voitures=Count('modeles__voitures', distinct=True),
+        )
+
+    def nombre_modeles(self, obj):
+        return obj.nb_modeles
+    nombre_modeles.short_description = "Modèles"
+    nombre_modeles.admin_order_field = 'nb_modeles'
+
+    def nombre_voitures(self, obj):
+        return obj.nb_voitures
+    nombre_voitures.short_description = "Voitures"
+    nombre_voitures.admin_order_field = 'nb_voitures'
+
 @admin.register(Modele)
 class ModeleAdmin(admin.ModelAdmin):
     list_display = ['marque', 'nom', 'annee_lancement', 'type_carburant', 'transmission', 'nombre_voitures']
@@ -40,6 +63,14 @@ class ModeleAdmin(admin.ModelAdmin):
     search_fields = ['nom', 'marque__nom']
     readonly_fields = ['nombre_voitures']
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(nb_voitures=Count('voitures'))
+
+    def nombre_voitures(self, obj):
+        return obj.nb_voitures
+    nombre_voitures.short_description = "Voitures"
+    nombre_voitures.admin_order_field = 'nb_voitures'
+
 @admin.register(Voiture)
 class VoitureAdmin(admin.ModelAdmin):
     list_display = ['id', 'modele', 'annee', 'get_prix_format', 'vendeur', 'est_vendue', 'date_ajout']
@@ -107,16 +138,45 @@ class AvisAdmin(admin.ModelAdmin):
     readonly_fields = ['date_publication']
     actions = ['approuver_avis', 'desapprouver_avis']
     
+    def _moderer(self, queryset, approuve):
+        # Avis et note dénormalisée des annonces concernées changent dans la même transaction.
+        with transaction.atomic():
+            voiture_ids = set(queryset.values_list('voiture_id', flat=True))
+            count = queryset.update(approuve=approuve)
+            notes.refresh(voiture_ids)
+            transaction.on_commit(invalidate_homepage)
+        return count
+
     def approuver_avis(self, request, queryset):
-        queryset.update(approuve=True)
-        self.message_user(request, f"{queryset.count()} avis ont été approuvés.")
+        count = self._moderer(queryset, True)
+        self.message_user(request, f"{count} avis ont été approuvés.")
     approuver_avis.short_description = "Approuver les avis sélectionnés"
     
     def desapprouver_avis(self, request, queryset):
-        queryset.update(approuve=False)
-        self.message_user(request, f"{queryset.count()} avis ont été désapprouvés.")
+        count = self._moderer(queryset, False)
+        self.message_user(request, f"{count} avis ont été désapprouvés.")
     desapprouver_avis.short_description = "Désapprouver les avis sélectionnés"
 
+    # Édition et suppression depuis l'admin : la note de l'annonce suit aussi.
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+            notes.refresh([obj.voiture_id])
+            transaction.on_commit(invalidate_homepage)
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            super().delete_model(request, obj)
+            notes.refresh([obj.voiture_id])
+            transaction.on_commit(invalidate_homepage)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            voiture_ids = set(queryset.values_list('voiture_id', flat=True))
+            super().delete_queryset(request, queryset)
+            notes.refresh(voiture_ids)
+            transaction.on_commit(invalidate_homepage)
+
 @admin.register(Transaction)
 class TransactionAdmin(admin.ModelAdmin):
     list_display = ['id', 'voiture', 'acheteur', 'vendeur', 'prix_final', 'statut', 'date_transaction']
@@ -164,3 +224,47 @@ class NotificationAdmin(admin.ModelAdmin):
     list_filter = ["type", "lu", "date_creation"]
     search_fields = ["utilisateur__username", "titre", "contenu"]
     readonly_fields = ["date_creation"]
+
+
+@admin.register(RechercheSauvegardee)
+class RechercheSauvegardeeAdmin(admin.ModelAdmin):
+    list_display = ["nom", "utilisateur", "date_creation"]
+    list_filter = ["date_creation"]
+    search_fields = ["nom", "utilisateur__username"]
+    list_select_related = ["utilisateur"]
+    readonly_fields = ["date_creation"]
+
+
+@admin.register(Tache)
+class TacheAdmin(admin.ModelAdmin):
+    list_display = ["id", "type", "statut", "tentatives", "disponible_a", "date_creation"]
+    list_filter = ["statut", "type", "date_creation"]
+    readonly_fields = ["date_creation", "date_mise_a_jour", "derniere_erreur"]
+    actions = ["relancer_taches"]
+
+    def relancer_taches(self, request, queryset):
+        count = queryset.update(statut="en_attente", tentatives=0, disponible_a=timezone.now())
+        self.message_user(request, f"{count} tâches relancées.")
+    relancer_taches.short_description = "Relancer les tâches sélectionnées"
+
+
+@admin.register(FichierMedia)
+class FichierMediaAdmin(admin.ModelAdmin):
+    list_display = ["nom", "taille", "references", "date_creation", "date_maj"]
+    search_fields = ["sha256", "nom"]
+    readonly_fields = ["sha256", "nom", "taille", "references", "date_creation", "date_maj"]
+
+
+@admin.register(StatistiqueJour)
+class StatistiqueJourAdmin(admin.ModelAdmin):
+    list_display = [
+        "jour", "annonces_creees", "annonces_vendues", "annonces_reservees",
+        "transactions_confirmees", "chiffre_affaires", "nouveaux_utilisateurs", "vues",
+    ]
+    date_hierarchy = "jour"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,251 @@
+"""
+Recherches sauvegardées : notifier leurs propriétaires des nouvelles annonces qui y correspondent.
+
+Les filtres de toutes les recherches sont compilés une fois en index, par processus :
+- un index inversé par marque (plus un groupe « toutes marques ») ;
+- dans chaque groupe, un arbre de segments par intervalle [prix_min, prix_max] et un par
+  intervalle [annee_min, annee_max] : chacun donne en O(log n + k) les k recherches dont
+  l'intervalle contient la valeur. La dimension qui en renvoie le moins fournit les
+  candidates, et les bornes de l'autre sont vérifiées sur elles seules (opération vectorisée).
+Les filtres restants (texte, état, couleur, carburant, transmission, statut) ne sont vérifiés
+que sur ces candidates. L'index est recompilé quand une recherche est créée ou supprimée
+(espace de cache NAMESPACE). Le worker fait la correspondance (tâche "saved_search_matches").
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Iterable
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from voitures import caches
+from voitures.catalogue import clean_filters
+from voitures.models import Notification, RechercheSauvegardee, Voiture
+from voitures.notifications import invalidate_unread
+from voitures.recherche import tokens
+
+NAMESPACE = "recherches"
+
+
+def serialize(filters: dict) -> dict:
+    """Filtres nettoyés -> valeurs JSON (texte, comme dans l'URL de la liste)."""
+    return {name: str(value) for name, value in filters.items()}
+
+
+def describe(filters: dict, marque_nom: str | None = None) -> str:
+    """Nom par défaut d'une recherche : "Renault · « clio » · 5000 à 9000 · 2018 à 2022"."""
+    parts = [marque_nom] if marque_nom else []
+    if filters.get("q"):
+        parts.append(f"« {filters['q']} »")
+    for low, high in (("prix_min", "prix_max"), ("annee_min", "annee_max")):
+        if low in filters and high in filters:
+            parts.append(f"{filters[low]} à {filters[high]}")
+        elif low in filters:
+            parts.append(f"dès {filters[low]}")
+        elif high in filters:
+            parts.append(f"jusqu'à {filters[high]}")
+    parts += [str(filters[name]) for name in ("etat", "couleur", "carburant", "transmission", "statut") if name in filters]
+    return " · ".join(parts)[:100] or "Toutes les annonces"
+
+
+# ==================== INDEX ====================
+
+
+class _Arbre:
+    """
+    Arbre de segments statique sur des intervalles fermés [bas, haut] (bornes infinies admises).
+
+    Les bornes distinctes découpent l'axe en créneaux élémentaires (chaque borne, et chaque écart
+    entre deux bornes consécutives). Un intervalle est rangé dans les O(log n) nœuds qui couvrent
+    exactement ses créneaux ; une valeur ne lit que les nœuds entre son créneau et la racine.
+    """
+
+    def __init__(self, bas: np.ndarray, haut: np.ndarray):
+        self.bornes = np.unique(np.concatenate([bas[np.isfinite(bas)], haut[np.isfinite(haut)]]))
+        self.taille = 1 << (2 * len(self.bornes)).bit_length()
+        noeuds: dict[int, list[int]] = defaultdict(list)
+        for position, (gauche, droite) in enumerate(zip(self._creneaux(bas).tolist(), self._creneaux(haut).tolist())):
+            # Créneaux [gauche, droite] : parcours ascendant classique (vide si bas > haut).
+            gauche, droite = gauche + self.taille, droite + self.taille + 1
+            while gauche < droite:
+                if gauche & 1:
+                    noeuds[gauche].append(position)
+                    gauche += 1
+                if droite & 1:
+                    droite -= 1
+                    noeuds[droite].append(position)
+                gauche >>= 1
+                droite >>= 1
+        self.noeuds = {noeud: np.array(positions, dtype=np.int64) for noeud, positions in noeuds.items()}
+
+    def _creneaux(self, valeurs: np.ndarray) -> np.ndarray:
+        # Borne i -> créneau 2i + 1 ; écart avant la borne i -> créneau 2i (-inf : 0, +inf : le dernier).
+        i = np.searchsorted(self.bornes, valeurs, side="left")
+        if not len(self.bornes):
+            return 2 * i
+        exact = (i < len(self.bornes)) & (self.bornes[np.minimum(i, len(self.bornes) - 1)] == valeurs)
+        return 2 * i + exact
+
+    def chemin(self, valeur: float) -> list[np.ndarray]:
+        """Positions des intervalles qui contiennent `valeur`, par nœud (sans doublon d'un nœud à l'autre)."""
+        noeud = int(self._creneaux(np.array([valeur]))[0]) + self.taille
+        found = []
+        while noeud:
+            positions = self.noeuds.get(noeud)
+            if positions is not None:
+                found.append(positions)
+            noeud >>= 1
+        return found
+
+
+@dataclass
+class _Groupe:
+    """Recherches d'une même marque : bornes (ouvertes = ±inf) et arbres de segments prix / année."""
+
+    prix_min: np.ndarray
+    prix_max: np.ndarray
+    annee_min: np.ndarray
+    annee_max: np.ndarray
+    positions: np.ndarray
+    prix: _Arbre
+    annee: _Arbre
+
+
+def _borne(filters: dict, name: str, default: float) -> float:
+    value = filters.get(name)
+    return default if value is None else float(value)
+
+
+def _concat(parts: list[np.ndarray]) -> np.ndarray:
+    return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+
+class Index:
+    def __init__(self, recherches: Iterable[tuple[int, int, str, dict]]):
+        # (id, utilisateur_id, nom, filtres nettoyés)
+        self.recherches: list[tuple[int, int, str, dict]] = []
+        par_marque: dict[int | None, list[int]] = defaultdict(list)
+        for recherche_id, utilisateur_id, nom, raw in recherches:
+            filters = clean_filters(raw)
+            par_marque[filters.get("marque")].append(len(self.recherches))
+            self.recherches.append((recherche_id, utilisateur_id, nom, filters))
+        self.groupes = {marque: self._groupe(positions) for marque, positions in par_marque.items()}
+
+    def __len__(self) -> int:
+        return len(self.recherches)
+
+    def _groupe(self, positions: list[int]) -> _Groupe:
+        bornes = np.array(
+            [
+                [
+                    _borne(f, "prix_min", -np.inf),
+                    _borne(f, "prix_max", np.inf),
+                    _borne(f, "annee_min", -np.inf),
+                    _borne(f, "annee_max", np.inf),
+                ]
+                for f in (self.recherches[p][3] for p in positions)
+            ],
+            dtype=np.float64,
+        )
+        prix_min, prix_max, annee_min, annee_max = bornes.T.copy()
+        return _Groupe(
+            prix_min, prix_max, annee_min, annee_max, np.array(positions),
+            _Arbre(prix_min, prix_max), _Arbre(annee_min, annee_max),
+        )
+
+    def candidates(self, marque_id: int, prix: float, annee: int) -> list[int]:
+        """Positions des recherches dont la marque, le prix et l'année acceptent ces valeurs."""
+        found: list[int] = []
+        for key in (marque_id, None):
+            groupe = self.groupes.get(key)
+            if groupe is None:
+                continue
+            par_prix, par_annee = groupe.prix.chemin(prix), groupe.annee.chemin(annee)
+            if sum(map(len, par_prix)) <= sum(map(len, par_annee)):
+                locales = _concat(par_prix)
+                ok = (groupe.annee_min[locales] <= annee) & (groupe.annee_max[locales] >= annee)
+            else:
+                locales = _concat(par_annee)
+                ok = (groupe.prix_min[locales] <= prix) & (groupe.prix_max[locales] >= prix)
+            found.extend(groupe.positions[np.sort(locales[ok])].tolist())
+        return found
+
+    def match(self, voiture: Voiture) -> list[tuple[int, int, str]]:
+        """(id, utilisateur_id, nom) des recherches qui trouveraient cette annonce."""
+        modele = voiture.modele
+        mots = tokens(f"{modele.marque.nom} {modele.nom} {voiture.description}")
+        valeurs = {
+            "etat": voiture.etat,
+            "couleur": voiture.couleur,
+            "carburant": modele.type_carburant,
+            "transmission": modele.transmission,
+            "statut": "reservee" if voiture.est_reservee else "disponible",
+        }
+        matches = []
+        for position in self.candidates(modele.marque_id, float(voiture.prix), int(voiture.annee)):
+            recherche_id, utilisateur_id, nom, filters = self.recherches[position]
+            if any(filters[name] != value for name, value in valeurs.items() if name in filters):
+                continue
+            if filters.get("q") and not all(any(m.startswith(t) for m in mots) for t in tokens(filters["q"])):
+                continue
+            matches.append((recherche_id, utilisateur_id, nom))
+        return matches
+
+
+# Index compilé de ce processus, avec la version de NAMESPACE dont il est issu.
+_compiled: tuple[str, Index] | None = None
+
+
+def index() -> Index:
+    global _compiled
+    version = caches.versioned_key(NAMESPACE)
+    compiled = _compiled
+    if compiled is None or compiled[0] != version:
+        rows = RechercheSauvegardee.objects.order_by().values_list("id", "utilisateur_id", "nom", "filtres")
+        compiled = _compiled = (version, Index(rows.iterator(chunk_size=2000)))
+    return compiled[1]
+
+
+def invalidate() -> None:
+    caches.invalidate(NAMESPACE)
+
+
+# ==================== NOTIFICATIONS ====================
+
+
+@transaction.atomic
+def notify_matches(voiture_id: int) -> int:
+    """Notifie (une fois par utilisateur) les propriétaires des recherches qui trouvent cette annonce."""
+    voiture = Voiture.objects.select_related("modele__marque").filter(pk=voiture_id, est_vendue=False).first()
+    if voiture is None:
+        return 0
+    par_utilisateur: dict[int, str] = {}
+    for _, utilisateur_id, nom in index().match(voiture):
+        if utilisateur_id != voiture.vendeur_id:
+            par_utilisateur.setdefault(utilisateur_id, nom)
+    if not par_utilisateur:
+        return 0
+    actifs = User.objects.filter(id__in=list(par_utilisateur), is_active=True).values_list("id", flat=True)
+    notifications = [
+        Notification(
+            utilisateur_id=utilisateur_id,
+            type="saved_search",
+            titre=f"Nouvelle annonce pour « {par_utilisateur[utilisateur_id]} »",
+            contenu=f"{voiture.modele.marque.nom} {voiture.modele.nom} ({voiture.annee}).",
+            url=voiture.get_absolute_url(),
+        )
+        for utilisateur_id in actifs
+    ]
+    Notification.objects.bulk_create(notifications, batch_size=1000)
+    invalidate_unread({n.utilisateur_id for n in notifications})
+    return len(notifications)
+
+
+def request_matching(voiture_id: int) -> None:
+    """Confie la recherche des correspondances au worker, une fois la transaction validée."""
+    from voitures import taches
+
+    transaction.on_commit(lambda: taches.enqueue("saved_search_matches", voiture_id=voiture_id))
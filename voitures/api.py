@@ -0,0 +1,220 @@
+"""
+API JSON en lecture seule du catalogue (annonces, marques, modèles) pour les partenaires.
+
+- mêmes filtres que la liste des voitures (voitures.catalogue) ;
+- pagination par curseur (`cursor`, `limit`), comme la liste HTML ;
+- `fields=id,prix,marque` : seules les colonnes nécessaires sont lues (`.only()`) ;
+- ETag / If-None-Match (réponse 304 sans corps) et compression gzip.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Q
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_GET
+
+from voitures.catalogue import clean_filters, filter_voitures
+from voitures.models import Marque, Modele, Voiture
+from voitures.pagination import SORTS, KeysetPaginator
+
+MAX_LIMIT = 100
+DEFAULT_LIMIT = 20
+
+
+def _image_url(field_file) -> str | None:
+    return field_file.url if field_file else None
+
+
+# Champ exposé -> (colonnes à lire, fonction qui produit la valeur).
+VOITURE_FIELDS = {
+    "id": (["id"], lambda v: v.id),
+    "url": (["id"], lambda v: v.get_absolute_url()),
+    "marque": (["modele__marque__nom"], lambda v: v.modele.marque.nom),
+    "marque_id": (["modele__marque_id"], lambda v: v.modele.marque_id),
+    "modele": (["modele__nom"], lambda v: v.modele.nom),
+    "modele_id": (["modele_id"], lambda v: v.modele_id),
+    "carburant": (["modele__type_carburant"], lambda v: v.modele.type_carburant),
+    "transmission": (["modele__transmission"], lambda v: v.modele.transmission),
+    "prix": (["prix"], lambda v: v.prix),
+    "annee": (["annee"], lambda v: v.annee),
+    "kilometrage": (["kilometrage"], lambda v: v.kilometrage),
+    "couleur": (["couleur"], lambda v: v.couleur),
+    "etat": (["etat"], lambda v: v.etat),
+    "description": (["description"], lambda v: v.description),
+    "image": (["image_principale"], lambda v: _image_url(v.image_principale)),
+    "est_reservee": (["est_reservee"], lambda v: v.est_reservee),
+    "est_vendue": (["est_vendue"], lambda v: v.est_vendue),
+    "date_ajout": (["date_ajout"], lambda v: v.date_ajout),
+    "note_moyenne": (["note_moyenne"], lambda v: v.note_moyenne),
+    "nombre_avis": (["nombre_avis"], lambda v: v.nombre_avis),
+}
+
+MARQUE_FIELDS = {
+    "id": (["id"], lambda m: m.id),
+    "nom": (["nom"], lambda m: m.nom),
+    "pays": (["pays"], lambda m: m.pays),
+    "logo": (["logo"], lambda m: _image_url(m.logo)),
+    "date_creation": (["date_creation"], lambda m: m.date_creation),
+    "description": (["description"], lambda m: m.description),
+    "nombre_voitures": ([], lambda m: m.nombre_voitures_dispo),
+}
+
+MODELE_FIELDS = {
+    "id": (["id"], lambda m: m.id),
+    "nom": (["nom"], lambda m: m.nom),
+    "marque_id": (["marque_id"], lambda m: m.marque_id),
+    "marque": (["marque__nom"], lambda m: m.marque.nom),
+    "annee_lancement": (["annee_lancement"], lambda m: m.annee_lancement),
+    "carburant": (["type_carburant"], lambda m: m.type_carburant),
+    "transmission": (["transmission"], lambda m: m.transmission),
+    "puissance": (["puissance"], lambda m: m.puissance),
+    "consommation": (["consommation"], lambda m: m.consommation),
+    "description": (["description"], lambda m: m.description),
+}
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _selected_fields(request, spec: dict) -> list[str]:
+    raw = request.GET.get("fields", "")
+    if not raw.strip():
+        return list(spec)
+    names = [name.strip() for name in raw.split(",") if name.strip()]
+    unknown = [name for name in names if name not in spec]
+    if unknown:
+        raise BadRequest(f"Champs inconnus: {', '.join(unknown)}. Disponibles: {', '.join(spec)}")
+    return list(dict.fromkeys(names))
+
+
+def _project(queryset, spec: dict, names: list[str], extra: tuple[str, ...] = ()):
+    """Restreint la requête aux colonnes des champs demandés (+ jointures nécessaires)."""
+    columns = {"id", *extra}
+    for name in names:
+        columns.update(spec[name][0])
+    relations = {column.rsplit("__", 1)[0] for column in columns if "__" in column}
+    if relations:
+        queryset = queryset.select_related(*relations)
+        # Les relations suivies doivent elles-mêmes figurer dans .only().
+        columns.update(relations)
+        columns.update(rel.split("__", 1)[0] for rel in relations)
+    return queryset.only(*columns)
+
+
+def _serialize(obj, spec: dict, names: list[str]) -> dict:
+    return {name: spec[name][1](obj) for name in names}
+
+
+def _limit(request) -> int:
+    try:
+        return max(1, min(int(request.GET.get("limit", DEFAULT_LIMIT)), MAX_LIMIT))
+    except ValueError:
+        return DEFAULT_LIMIT
+
+
+def _page_url(request, cursor: str | None) -> str | None:
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    params["cursor"] = cursor
+    return request.build_absolute_uri(f"{request.path}?{params.urlencode()}")
+
+
+def _paginated(request, queryset, spec, names, field: str, descending: bool) -> dict:
+    page = KeysetPaginator(queryset, field, descending, per_page=_limit(request)).get_page(request.GET.get("cursor"))
+    return {
+        "results": [_serialize(obj, spec, names) for obj in page],
+        "next": _page_url(request, page.next_cursor),
+        "previous": _page_url(request, page.previous_cursor),
+    }
+
+
+def _json(request, payload: dict) -> HttpResponse:
+    """Réponse JSON avec ETag : un client qui renvoie le même ETag reçoit un 304 sans corps."""
+    body = json.dumps(payload, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(",", ":")).encode()
+    etag = f'"{hashlib.sha1(body).hexdigest()}"'
+    # GZipMiddleware affaiblit l'ETag (W/"...") : on compare sans tenir compte du préfixe.
+    client_etags = {tag.removeprefix("W/") for tag in parse_etags(request.headers.get("If-None-Match", ""))}
+    if etag in client_etags or "*" in client_etags:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type="application/json; charset=utf-8")
+    response["ETag"] = etag
+    patch_cache_control(response, public=True, max_age=getattr(settings, "API_CACHE_MAX_AGE", 60))
+    return response
+
+
+def _api_view(view):
+    """GET uniquement, gzip, et erreurs de paramètres renvoyées en 400 JSON."""
+
+    @gzip_page
+    @require_GET
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except BadRequest as exc:
+            return JsonResponse({"error": str(exc)}, status=400)
+
+    wrapper.__name__ = view.__name__
+    wrapper.__doc__ = view.__doc__
+    return wrapper
+
+
+@_api_view
+def voitures(request):
+    """Annonces en vente, avec les filtres et les tris de la liste des voitures."""
+    names = _selected_fields(request, VOITURE_FIELDS)
+    sort = request.GET.get("sort") or ""
+    if sort not in SORTS:
+        raise BadRequest(f"Tri inconnu: {sort}. Disponibles: {', '.join(s for s in SORTS if s)}")
+
+    filters = clean_filters(request.GET)
+    field, descending = SORTS[sort]
+    if filters.get("q") and not sort:
+        field, descending = "pertinence", True
+
+    queryset = filter_voitures(Voiture.objects.filter(est_vendue=False), filters)
+    extra = () if field == "pertinence" else (field,)
+    queryset = _project(queryset, VOITURE_FIELDS, names, extra)
+    return _json(request, _paginated(request, queryset, VOITURE_FIELDS, names, field, descending))
+
+
+@_api_view
+def voiture(request, voiture_id):
+    names = _selected_fields(request, VOITURE_FIELDS)
+    queryset = _project(Voiture.objects.all(), VOITURE_FIELDS, names)
+    return _json(request, _serialize(get_object_or_404(queryset, pk=voiture_id), VOITURE_FIELDS, names))
+
+
+@_api_view
+def marques(request):
+    names = _selected_fields(request, MARQUE_FIELDS)
+    queryset = _project(Marque.objects.all(), MARQUE_FIELDS, names, ("nom",))
+    if "nombre_voitures" in names:
+        queryset = queryset.annotate(
+            nombre_voitures_dispo=Count("modeles__voitures", filter=Q(modeles__voitures__est_vendue=False))
+        )
+    return _json(request, _paginated(request, queryset, MARQUE_FIELDS, names, "nom", False))
+
+
+@_api_view
+def modeles(request):
+    """Modèles, éventuellement restreints à une marque (`?marque=<id>`)."""
+    names = _selected_fields(request, MODELE_FIELDS)
+    queryset = Modele.objects.all()
+    marque = request.GET.get("marque", "")
+    if marque:
+        if not marque.isdigit():
+            raise BadRequest("Paramètre marque invalide.")
+        queryset = queryset.filter(marque_id=int(marque))
+    queryset = _project(queryset, MODELE_FIELDS, names)
+    return _json(request, _paginated(request, queryset, MODELE_FIELDS, names, "id", False))
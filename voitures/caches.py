@@ -0,0 +1,130 @@
+"""
+Aides de mise en cache partagées par les vues (backend configuré par CACHE_URL).
+
+- clés versionnées : `versioned_key("accueil", depends=("catalogue",))` change dès que
+  `invalidate("catalogue")` est appelé, sans avoir à connaître ni supprimer les anciennes clés ;
+- `get_or_compute` : protection contre l'effet de meute. Un seul processus recalcule une
+  valeur absente (verrou `cache.add`), et une valeur proche de l'expiration est recalculée
+  en avance, de façon probabiliste, pendant que les autres servent encore l'ancienne ;
+- `cached_queryset` : résultat d'un QuerySet (instances déjà construites) en cache.
+"""
+from __future__ import annotations
+
+import hashlib
+import math
+import random
+import threading
+import time
+import uuid
+from typing import Callable, Iterable, TypeVar
+
+from django.core.cache import cache
+from django.db.models import Model, QuerySet
+
+T = TypeVar("T")
+M = TypeVar("M", bound=Model)
+
+VERSION_KEY = "version:{}"
+LOCK_KEY = "verrou:{}"
+# Attente maximale (secondes) de la valeur calculée par un autre processus avant de la calculer soi-même.
+LOCK_WAIT = 5.0
+LOCK_POLL = 0.05
+
+# Verrous du processus (par tranche de clés) : les threads d'un même worker ne lancent pas le
+# même calcul. Entre processus, le verrou est `cache.add` (atomique avec Redis ou la base ;
+# au mieux avec le backend fichiers).
+_STRIPES = [threading.Lock() for _ in range(64)]
+
+
+def _versions(namespaces: Iterable[str]) -> list[str]:
+    # Versions aléatoires plutôt qu'un compteur : une clé de version évincée donne une
+    # nouvelle version (donc un cache vide) et jamais le retour à une version déjà servie.
+    keys = [VERSION_KEY.format(ns) for ns in namespaces]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, uuid.uuid4().hex[:12], None)
+            found[key] = cache.get(key)
+    return [str(found[key]) for key in keys]
+
+
+def invalidate(*namespaces: str) -> None:
+    """Rend obsolètes toutes les clés qui dépendent de ces espaces de noms."""
+    cache.set_many({VERSION_KEY.format(ns): uuid.uuid4().hex[:12] for ns in namespaces}, None)
+
+
+def versioned_key(name: str, *parts, depends: Iterable[str] = ()) -> str:
+    """Clé `name` + paramètres, liée aux versions des espaces de noms `depends` (et de `name`)."""
+    namespaces = [name, *depends]
+    raw = "|".join([*_versions(namespaces), *map(str, parts)])
+    return f"{name}:{hashlib.sha1(raw.encode()).hexdigest()}"
+
+
+def peek(key: str):
+    """Valeur stockée par get_or_compute sous `key`, sans jamais la calculer (None si absente)."""
+    entry = cache.get(key)
+    return None if entry is None else entry[0]
+
+
+def get_or_compute(key: str, compute: Callable[[], T], timeout: int, *, beta: float = 1.0) -> T:
+    """
+    Valeur en cache sous `key`, calculée par `compute()` si besoin.
+
+    L'entrée stocke (valeur, expiration, durée du calcul). Plus le calcul est long et
+    l'expiration proche, plus la probabilité de le relancer en avance est forte
+    (« XFetch ») ; `beta` > 1 anticipe davantage.
+    """
+    entry = cache.get(key)
+    local = _STRIPES[hash(key) % len(_STRIPES)]
+    if entry is not None:
+        value, expires_at, delta = entry
+        if time.time() - delta * beta * math.log(random.random() or 1e-12) < expires_at:
+            return value
+        # Recalcul anticipé : un seul thread / processus s'en charge, les autres servent la valeur actuelle.
+        if not local.acquire(blocking=False):
+            return value
+        try:
+            if not cache.add(LOCK_KEY.format(key), 1, max(1, int(delta * 4) + 1)):
+                return value
+            return _store(key, compute, timeout)
+        finally:
+            local.release()
+
+    acquired = local.acquire(timeout=LOCK_WAIT)
+    try:
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+        if not cache.add(LOCK_KEY.format(key), 1, int(LOCK_WAIT) + 1):
+            # Un autre processus calcule déjà la valeur : on l'attend un peu plutôt que de lancer le même calcul.
+            deadline = time.monotonic() + LOCK_WAIT
+            while time.monotonic() < deadline:
+                time.sleep(LOCK_POLL)
+                entry = cache.get(key)
+                if entry is not None:
+                    return entry[0]
+        return _store(key, compute, timeout)
+    finally:
+        if acquired:
+            local.release()
+
+
+def _store(key: str, compute: Callable[[], T], timeout: int) -> T:
+    try:
+        start = time.monotonic()
+        value = compute()
+        delta = time.monotonic() - start
+        cache.set(key, (value, time.time() + timeout, delta), timeout)
+    finally:
+        cache.delete(LOCK_KEY.format(key))
+    return value
+
+
+def cached_queryset(queryset: QuerySet[M], name: str, timeout: int, *, depends: Iterable[str] = ()) -> list[M]:
+    """
+    Liste des résultats de `queryset`, mise en cache sous une clé dérivée de son SQL.
+    Invalidée par `invalidate(name)` ou `invalidate(<un des espaces de depends>)`.
+    """
+    sql, params = queryset.query.sql_with_params()
+    key = versioned_key(name, sql, params, depends=depends)
+    return get_or_compute(key, lambda: list(queryset), timeout)
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db.models import Avg, Count
+
+from voitures import caches, recherche
+from voitures.models import Marque, Modele, Voiture
+
+# Filtres acceptés par la liste des voitures -> convertisseur de la valeur saisie.
+FILTERS = {
+    "q": str,
+    "marque": int,
+    "prix_min": Decimal,
+    "prix_max": Decimal,
+    "annee_min": int,
+    "annee_max": int,
+    "statut": str,
+    "etat": str,
+    "couleur": str,
+    "carburant": str,
+    "transmission": str,
+}
+
+# Filtres à valeurs fermées -> valeurs autorisées.
+CHOICES = {
+    "statut": {"disponible", "reservee"},
+    "etat": {value for value, _ in Voiture.ETAT_CHOICES},
+    "couleur": {value for value, _ in Voiture.COULEUR_CHOICES},
+    "carburant": {value for value, _ in Modele.TYPE_CARBURANT},
+    "transmission": {value for value, _ in Modele.TRANSMISSION},
+}
+
+
+def clean_filters(params) -> dict:
+    """Ne garde que les filtres renseignés et valides (une valeur invalide est ignorée)."""
+    cleaned = {}
+    for name, convert in FILTERS.items():
+        raw = (params.get(name) or "").strip()
+        if not raw:
+            continue
+        try:
+            value = convert(raw)
+        except (ValueError, InvalidOperation):
+            continue
+        if isinstance(value, Decimal) and not value.is_finite():
+            continue
+        cleaned[name] = value
+    for name, allowed in CHOICES.items():
+        if name in cleaned and cleaned[name] not in allowed:
+            del cleaned[name]
+    return cleaned
+
+
+def filter_voitures(queryset, filters: dict):
+    if filters.get("q"):
+        queryset = recherche.search(queryset, filters["q"])
+    if "marque" in filters:
+        queryset = queryset.filter(modele__marque_id=filters["marque"])
+    if "prix_min" in filters:
+        queryset = queryset.filter(prix__gte=filters["prix_min"])
+    if "prix_max" in filters:
+        queryset = queryset.filter(prix__lte=filters["prix_max"])
+    if "annee_min" in filters:
+        queryset = queryset.filter(annee__gte=filters["annee_min"])
+    if "annee_max" in filters:
+        queryset = queryset.filter(annee__lte=filters["annee_max"])
+    if "etat" in filters:
+        queryset = queryset.filter(etat=filters["etat"])
+    if "couleur" in filters:
+        queryset = queryset.filter(couleur=filters["couleur"])
+    if "carburant" in filters:
+        queryset = queryset.filter(modele__type_carburant=filters["carburant"])
+    if "transmission" in filters:
+        queryset = queryset.filter(modele__transmission=filters["transmission"])
+    if filters.get("statut") == "reservee":
+        queryset = queryset.filter(est_reservee=True)
+    elif filters.get("statut") == "disponible":
+        queryset = queryset.filter(est_reservee=False)
+    return queryset
+
+
+def filters_key(filters: dict) -> str:
+    normalized = json.dumps(filters, sort_keys=True, default=str)
+    return hashlib.sha1(normalized.encode()).hexdigest()
+
+
+def estimated_stats(queryset, filters: dict, *, compute: bool) -> dict | None:
+    """
+    Nombre de résultats et prix moyen pour ces filtres, mis en cache quelques minutes
+    (la valeur affichée est donc une estimation). Si `compute` est faux, on ne renvoie
+    que la valeur en cache : les pages profondes ne paient jamais le COUNT(*).
+    """
+    key = f"catalogue:stats:{filters_key(filters)}"
+    if not compute:
+        return caches.peek(key)
+    return caches.get_or_compute(
+        key,
+        lambda: queryset.order_by().aggregate(total=Count("id"), prix_moyen=Avg("prix")),
+        getattr(settings, "CATALOGUE_STATS_TIMEOUT", 120),
+    )
+
+
+# ==================== PAGE D'ACCUEIL ====================
+
+# Espace de noms du cache invalidé à chaque modification d'annonce, de modèle ou de marque.
+CATALOGUE = "catalogue"
+
+
+def homepage_snapshot() -> dict:
+    """
+    Contexte de la page d'accueil, calculé une fois puis servi depuis le cache.
+    Invalidé par les signaux (voitures.signals) à chaque modification d'annonce ou de marque.
+    """
+    return caches.get_or_compute(
+        caches.versioned_key("accueil", depends=(CATALOGUE,)),
+        _homepage,
+        getattr(settings, "ACCUEIL_CACHE_TIMEOUT", 3600),
+    )
+
+
+def _homepage() -> dict:
+    dispo = Voiture.objects.filter(est_vendue=False).select_related("modele__marque")
+    voitures_vedette = list(dispo.order_by("-date_ajout")[:12])
+    snapshot = {
+        "voitures_recentes": voitures_vedette[:6],
+        "voitures_promo": list(dispo.order_by("prix")[:6]),
+        "marques_populaires": list(
+            Marque.objects.annotate(nb_voitures=Count("modeles__voitures")).order_by("-nb_voitures")[:8]
+        ),
+        "marques": list(Marque.objects.all().order_by("nom")),
+        "voitures_vedette": voitures_vedette,
+        "total_voitures": dispo.count(),
+    }
+    return snapshot
+
+
+def invalidate_homepage() -> None:
+    caches.invalidate(CATALOGUE)
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import atexit
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from voitures import statistiques
+from voitures.models import Voiture
+
+logger = logging.getLogger(__name__)
+
+# Vues en attente d'écriture, par id de voiture (propre au processus).
+_pending: Counter[int] = Counter()
+_lock = threading.Lock()
+_last_flush = time.monotonic()
+# Thread d'écriture périodique, démarré à la première vue (pid : relancé après un fork).
+_timer: tuple[int, threading.Thread] | None = None
+
+
+def _visitor_key(request) -> str:
+    session_key = getattr(getattr(request, "session", None), "session_key", None)
+    if session_key:
+        return session_key
+    raw = f"{request.META.get('REMOTE_ADDR', '')}|{request.META.get('HTTP_USER_AGENT', '')}"
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def record_view(request, voiture_id: int) -> bool:
+    """
+    Comptabilise une vue sans toucher à la base : l'incrément est mis en tampon
+    et écrit lors du prochain flush. Un même visiteur n'est compté qu'une fois
+    par fenêtre de VUES_FENETRE_DEDUP secondes (0 pour désactiver).
+    """
+    window = getattr(settings, "VUES_FENETRE_DEDUP", 0)
+    if window and not cache.add(f"vues:vu:{_visitor_key(request)}:{voiture_id}", 1, window):
+        return False
+
+    _ensure_timer()
+    with _lock:
+        _pending[voiture_id] += 1
+        due = (
+            time.monotonic() - _last_flush >= getattr(settings, "VUES_FLUSH_INTERVALLE", 10)
+            or sum(_pending.values()) >= getattr(settings, "VUES_FLUSH_SEUIL", 500)
+        )
+    if due:
+        flush()
+    return True
+
+
+def flush() -> int:
+    """Écrit les vues en attente : une requête UPDATE ... SET vue = vue + n par valeur de n."""
+    global _last_flush
+    with _lock:
+        batch = dict(_pending)
+        _pending.clear()
+        _last_flush = time.monotonic()
+    if not batch:
+        return 0
+
+    by_increment: dict[int, list[int]] = defaultdict(list)
+    for voiture_id, n in batch.items():
+        by_increment[n].append(voiture_id)
+    try:
+        with transaction.atomic():
+            for n, ids in by_increment.items():
+                Voiture.objects.filter(id__in=ids).update(vue=F("vue") + n)
+            statistiques.bump(timezone.localdate(), vues=sum(batch.values()))
+    except Exception:
+        logger.exception("Échec de l'écriture des compteurs de vues, nouvel essai au prochain flush")
+        with _lock:
+            _pending.update(batch)
+        return 0
+    return sum(batch.values())
+
+
+def _interval() -> float:
+    return max(1, getattr(settings, "VUES_FLUSH_INTERVALLE", 10))
+
+
+def _run_timer() -> None:
+    # Une annonce peu consultée n'attend pas une prochaine vue pour être écrite ; un worker
+    # tué sans atexit (SIGKILL, mise en veille) perd au plus VUES_FLUSH_INTERVALLE secondes.
+    while True:
+        time.sleep(_interval())
+        try:
+            if _pending and time.monotonic() - _last_flush >= _interval():
+                flush()
+        finally:
+            # Connexion propre à ce thread : fermée entre deux passages.
+            connections.close_all()
+
+
+def _ensure_timer() -> None:
+    global _timer
+    pid = os.getpid()
+    if _timer is not None and _timer[0] == pid and _timer[1].is_alive():
+        return
+    with _lock:
+        if _timer is None or _timer[0] != pid or not _timer[1].is_alive():
+            thread = threading.Thread(target=_run_timer, name="compteur-vues", daemon=True)
+            thread.start()
+            _timer = (pid, thread)
+
+
+atexit.register(flush)
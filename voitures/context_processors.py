@@ -1,14 +1,9 @@
 from __future__ import annotations
 
-from voitures.models import Notification
+from voitures.notifications import unread_count
 
 
 def notification_counts(request):
     if not getattr(request, "user", None) or not request.user.is_authenticated:
         return {"unread_notifications_count": 0}
-    return {
-        "unread_notifications_count": Notification.objects.filter(
-            utilisateur=request.user, lu=False
-        ).count()
-    }
-
+    return {"unread_notifications_count": unread_count(request.user)}
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import csv
+from dataclasses import dataclass
+from typing import Iterator
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from voitures.models import Transaction, Voiture
+
+# Nombre de lignes lues par aller-retour avec la base et regroupées par morceau envoyé.
+CHUNK_SIZE = 2000
+
+
+@dataclass(frozen=True)
+class Dataset:
+    model: type
+    # (en-tête, chemin ORM lu par values_list)
+    columns: tuple[tuple[str, str], ...]
+
+    @property
+    def headers(self) -> list[str]:
+        return [header for header, _ in self.columns]
+
+    def rows(self, chunk_size: int = CHUNK_SIZE) -> Iterator[tuple]:
+        # Tuples bruts par lots : ni instances de modèle, ni cache du QuerySet, mémoire constante.
+        paths = [path for _, path in self.columns]
+        return self.model.objects.order_by("id").values_list(*paths).iterator(chunk_size=chunk_size)
+
+
+DATASETS = {
+    "voitures": Dataset(
+        Voiture,
+        (
+            ("id", "id"),
+            ("marque", "modele__marque__nom"),
+            ("modele", "modele__nom"),
+            ("carburant", "modele__type_carburant"),
+            ("transmission", "modele__transmission"),
+            ("prix", "prix"),
+            ("annee", "annee"),
+            ("kilometrage", "kilometrage"),
+            ("couleur", "couleur"),
+            ("etat", "etat"),
+            ("vendeur", "vendeur__username"),
+            ("est_vendue", "est_vendue"),
+            ("est_reservee", "est_reservee"),
+            ("vues", "vue"),
+            ("date_ajout", "date_ajout"),
+            ("date_modification", "date_modification"),
+        ),
+    ),
+    "transactions": Dataset(
+        Transaction,
+        (
+            ("id", "id"),
+            ("voiture_id", "voiture_id"),
+            ("marque", "voiture__modele__marque__nom"),
+            ("modele", "voiture__modele__nom"),
+            ("acheteur", "acheteur__username"),
+            ("vendeur", "vendeur__username"),
+            ("prix_final", "prix_final"),
+            ("statut", "statut"),
+            ("date_transaction", "date_transaction"),
+            ("date_mise_a_jour", "date_mise_a_jour"),
+        ),
+    ),
+}
+
+CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson; charset=utf-8",
+}
+
+
+class _Echo:
+    """Pseudo-fichier pour csv.writer : renvoie la ligne au lieu de l'écrire."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def _batched(lines: Iterator[str], chunk_size: int) -> Iterator[str]:
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= chunk_size:
+            yield "".join(batch)
+            batch = []
+    if batch:
+        yield "".join(batch)
+
+
+def _csv_lines(dataset: Dataset, chunk_size: int) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    yield writer.writerow(dataset.headers)
+    for row in dataset.rows(chunk_size):
+        yield writer.writerow(row)
+
+
+def _ndjson_lines(dataset: Dataset, chunk_size: int) -> Iterator[str]:
+    headers = dataset.headers
+    encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(",", ":"))
+    for row in dataset.rows(chunk_size):
+        yield encoder.encode(dict(zip(headers, row))) + "\n"
+
+
+def stream(name: str, fmt: str, chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """Contenu de l'export `name` au format `fmt`, produit morceau par morceau."""
+    dataset = DATASETS[name]
+    lines = _csv_lines(dataset, chunk_size) if fmt == "csv" else _ndjson_lines(dataset, chunk_size)
+    return _batched(lines, chunk_size)
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+from collections import Counter
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import CharField, Case, Count, F, IntegerField, Value, When
+from django.db.models.functions import Cast
+
+from voitures import caches
+from voitures.catalogue import filters_key
+from voitures.models import Modele, Voiture
+
+# Facette -> colonne groupée (une agrégation par facette, réunies par UNION ALL).
+COLUMNS = {
+    "marque": "modele__marque_id",
+    "etat": "etat",
+    "couleur": "couleur",
+    "carburant": "modele__type_carburant",
+    "transmission": "modele__transmission",
+    "prix": "tranche_prix",
+    "annee": "tranche_annee",
+}
+
+TITLES = {
+    "marque": "Marque",
+    "etat": "État",
+    "couleur": "Couleur",
+    "carburant": "Carburant",
+    "transmission": "Transmission",
+    "prix": "Prix",
+    "annee": "Année",
+}
+
+# Facettes dont la valeur groupée est un entier (renvoyée en texte par l'UNION).
+INTEGER_FACETS = {"marque", "prix", "annee"}
+
+# Écart entre la borne max exclue d'une tranche et le filtre `*_max` (inclus) de son lien :
+# les prix ont deux décimales, les années sont entières.
+STEPS = {"prix": Decimal("0.01"), "annee": 1}
+
+LABELS = {
+    "etat": dict(Voiture.ETAT_CHOICES),
+    "couleur": dict(Voiture.COULEUR_CHOICES),
+    "carburant": dict(Modele.TYPE_CARBURANT),
+    "transmission": dict(Modele.TRANSMISSION),
+}
+
+
+def _bounds(name: str, default: list[int]) -> list[int]:
+    return sorted(getattr(settings, name, default))
+
+
+def _buckets(bounds: list[int]) -> list[tuple[int | None, int | None]]:
+    """[a, b, c] -> [(None, a), (a, b), (b, c), (c, None)] (bornes min incluses, max exclues)."""
+    edges = [None, *bounds, None]
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def _bucket_expression(field: str, bounds: list[int]) -> Case:
+    whens = [When(**{f"{field}__lt": bound}, then=Value(i)) for i, bound in enumerate(bounds)]
+    return Case(*whens, default=Value(len(bounds)), output_field=IntegerField())
+
+
+def compute(queryset) -> dict[str, Counter]:
+    """
+    Comptes par valeur de chaque facette pour `queryset`, en UNE requête : un GROUP BY par
+    facette, réunis par UNION ALL. Chaque partie renvoie au plus autant de lignes que la
+    facette a de valeurs, donc le résultat est borné par la somme de ces cardinalités.
+    """
+    prix_bounds = _bounds("FACETTES_TRANCHES_PRIX", [])
+    annee_bounds = _bounds("FACETTES_TRANCHES_ANNEE", [])
+    base = queryset.order_by().annotate(
+        tranche_prix=_bucket_expression("prix", prix_bounds),
+        tranche_annee=_bucket_expression("annee", annee_bounds),
+    )
+    parts = [
+        base.annotate(facette=Value(facet, output_field=CharField()), valeur=Cast(F(column), CharField()))
+        .values("facette", "valeur")
+        .annotate(n=Count("id"))
+        .values_list("facette", "valeur", "n")
+        for facet, column in COLUMNS.items()
+    ]
+    counts = {facet: Counter() for facet in COLUMNS}
+    for facet, value, n in parts[0].union(*parts[1:], all=True):
+        if facet in INTEGER_FACETS and value is not None:
+            value = int(value)
+        counts[facet][value] += n
+    return counts
+
+
+def cached_counts(queryset, filters: dict) -> dict[str, Counter]:
+    key = f"catalogue:facettes:{filters_key(filters)}"
+    return caches.get_or_compute(key, lambda: compute(queryset), getattr(settings, "CATALOGUE_STATS_TIMEOUT", 120))
+
+
+def _item(label: str, count: int, selected: bool, params, changes: dict) -> dict:
+    """Lien qui applique la valeur de facette (ou la retire si elle est déjà sélectionnée)."""
+    query = params.copy()
+    query.pop("cursor", None)
+    for name, value in changes.items():
+        query.pop(name, None)
+        if not selected and value not in (None, ""):
+            query[name] = value
+    return {"label": label, "count": count, "selected": selected, "query": query.urlencode()}
+
+
+def build(counts: dict[str, Counter], filters: dict, marques, params) -> list[tuple[str, list[dict]]]:
+    """
+    Met en forme les comptes pour le gabarit : [(titre, [valeurs]), ...] dans l'ordre de COLUMNS.
+    `params` est la QueryDict de la requête, utilisée pour construire les liens.
+    """
+    facets: dict[str, list[dict]] = {}
+
+    facets["marque"] = [
+        _item(m.nom, counts["marque"][m.id], filters.get("marque") == m.id, params, {"marque": m.id})
+        for m in marques
+        if counts["marque"][m.id]
+    ]
+    for facet, labels in LABELS.items():
+        facets[facet] = [
+            _item(label, counts[facet][value], filters.get(facet) == value, params, {facet: value})
+            for value, label in labels.items()
+            if counts[facet][value]
+        ]
+
+    for facet, setting, fmt in (
+        ("prix", "FACETTES_TRANCHES_PRIX", lambda n: f"{n:,} FCFA".replace(",", " ")),
+        ("annee", "FACETTES_TRANCHES_ANNEE", str),
+    ):
+        items = []
+        for i, (low, high) in enumerate(_buckets(_bounds(setting, []))):
+            if not counts[facet][i] or (low is None and high is None):
+                continue
+            if low is None:
+                label = f"Moins de {fmt(high)}"
+            elif high is None:
+                label = f"{fmt(low)} et plus"
+            else:
+                label = f"{fmt(low)} – {fmt(high - 1)}"
+            # Même tranche que le comptage (high exclu) : prix_max = high - 0,01, annee_max = high - 1.
+            changes = {f"{facet}_min": low, f"{facet}_max": high - STEPS[facet] if high is not None else None}
+            selected = all(filters.get(name) == value for name, value in changes.items())
+            items.append(_item(label, counts[facet][i], selected, params, changes))
+        facets[facet] = items
+    return [(TITLES[facet], facets[facet]) for facet in COLUMNS]
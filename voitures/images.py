@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import logging
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, default_storage
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Variant:
+    widths: tuple[int, ...]
+    sizes: str
+
+
+# Déclinaisons générées pour chaque photo : largeurs (px) et attribut `sizes` par défaut.
+VARIANTS = {
+    "card": Variant((320, 480, 640), "(min-width: 1200px) 300px, (min-width: 768px) 50vw, 100vw"),
+    "detail": Variant((640, 960, 1280), "(min-width: 992px) 800px, 100vw"),
+}
+
+FORMATS = {"webp": ("WEBP", 80), "jpg": ("JPEG", 82)}
+
+# Orientations EXIF qui échangent largeur et hauteur une fois l'image redressée.
+_ORIENTATIONS_PIVOTEES = {5, 6, 7, 8}
+
+variant_storage = FileSystemStorage(
+    location=Path(settings.MEDIA_ROOT) / "variants",
+    base_url=f"{settings.MEDIA_URL}variants/",
+)
+
+
+def variant_name(name: str, width: int, fmt: str) -> str:
+    stem = PurePosixPath(name).with_suffix("")
+    return f"{width}/{stem}.{fmt}"
+
+
+def _all_widths() -> list[int]:
+    return sorted({w for v in VARIANTS.values() for w in v.widths})
+
+
+def variant_widths(widths, source_width: int) -> list[int]:
+    """Largeurs réellement écrites pour une source de cette largeur : jamais d'agrandissement."""
+    return sorted({min(w, source_width) for w in widths})
+
+
+def _encode(image: Image.Image, path: str, fmt: str) -> None:
+    pil_format, quality = FORMATS[fmt]
+    if pil_format == "JPEG" and image.mode not in ("RGB", "L"):
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.convert("RGBA").getchannel("A"))
+        image = background
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    image.save(tmp, pil_format, quality=quality, optimize=True, **({"progressive": True} if fmt == "jpg" else {}))
+    os.replace(tmp, path)
+
+
+def _record_width(name: str, width: int) -> None:
+    """Largeur de la source, lue au rendu (sans accès disque) par toutes les lignes qui utilisent ce fichier."""
+    from voitures.models import ImageVoiture, Voiture
+
+    Voiture.objects.filter(image_principale=name).exclude(image_largeur=width).update(image_largeur=width)
+    ImageVoiture.objects.filter(image=name).exclude(image_largeur=width).update(image_largeur=width)
+
+
+def write_variants(name: str, *, force: bool = False) -> tuple[int | None, int]:
+    """
+    Génère les largeurs manquantes (WebP + JPEG) d'une image du stockage média, sans dépasser
+    la largeur de la source. Fichiers seulement, sans accès à la base : utilisable dans les
+    processus d'import. Renvoie (largeur de la source ou None si elle est absente, fichiers écrits).
+    """
+    if not default_storage.exists(name):
+        logger.warning("Image source introuvable, déclinaisons ignorées: %s", name)
+        return None, 0
+
+    written = 0
+    with default_storage.open(name, "rb") as source:
+        # Image.open ne lit que l'en-tête : largeur et orientation sans décoder les pixels.
+        image = Image.open(source)
+        source_width = image.height if image.getexif().get(0x0112) in _ORIENTATIONS_PIVOTEES else image.width
+        widths = [
+            w for w in variant_widths(_all_widths(), source_width)
+            if force or not all(variant_storage.exists(variant_name(name, w, fmt)) for fmt in FORMATS)
+        ]
+        if widths:
+            # JPEG : décodage directement à une résolution réduite quand c'est possible.
+            image.draft("RGB", (max(widths), max(widths)))
+            image = ImageOps.exif_transpose(image)
+            image.load()
+
+    for width in sorted(widths, reverse=True):
+        resized = image.copy()
+        if resized.width > width:
+            resized.thumbnail((width, width * 10), Image.Resampling.LANCZOS)
+        for fmt in FORMATS:
+            _encode(resized, variant_storage.path(variant_name(name, width, fmt)), fmt)
+            written += 1
+    return source_width, written
+
+
+def generate_variants(name: str, *, force: bool = False) -> int:
+    """write_variants, puis enregistre la largeur de la source. Renvoie le nombre de fichiers écrits."""
+    source_width, written = write_variants(name, force=force)
+    if source_width is not None:
+        _record_width(name, source_width)
+    return written
+
+
+def generate_for_row(model, pk, field: str, name: str) -> int:
+    """
+    write_variants, puis largeur enregistrée sur la seule ligne `pk` (par sa clé primaire,
+    et seulement si elle utilise toujours ce fichier). Renvoie le nombre de fichiers écrits.
+    """
+    source_width, written = write_variants(name)
+    if source_width is not None:
+        model.objects.filter(pk=pk, **{field: name}).exclude(image_largeur=source_width).update(
+            image_largeur=source_width
+        )
+    return written
+
+
+def delete_variants(name: str) -> None:
+    for width in _all_widths():
+        for fmt in FORMATS:
+            variant_storage.delete(variant_name(name, width, fmt))
+
+
+def picture_sources(field_file, variant: str, sizes: str | None = None) -> dict[str, str]:
+    """
+    Sources d'un <picture> pour cette image : srcset WebP, et srcset JPEG + src de repli.
+    Sans accès disque ni écriture : les largeurs disponibles se déduisent de `image_largeur`,
+    renseignée à la génération. Tant qu'elle est vide, on sert l'original.
+    """
+    name = getattr(field_file, "name", "") or ""
+    if not name:
+        return {"src": ""}
+    # Lecture sans déclencher le chargement d'un champ différé (.only()/.defer()).
+    instance = getattr(field_file, "instance", None)
+    source_width = instance.__dict__.get("image_largeur") if instance is not None else None
+    if not source_width:
+        return {"src": field_file.url}
+    spec = VARIANTS[variant]
+    widths = variant_widths(spec.widths, source_width)
+
+    def srcset(fmt: str) -> str:
+        return ", ".join(f"{variant_storage.url(variant_name(name, w, fmt))} {w}w" for w in widths)
+
+    return {
+        "src": variant_storage.url(variant_name(name, widths[len(widths) // 2], "jpg")),
+        "webp": srcset("webp"),
+        "srcset": srcset("jpg"),
+        "sizes": sizes or spec.sizes,
+    }
+
+
+# ==================== TÉLÉVERSEMENT ====================
+
+# Format détecté par Pillow -> (extension, options d'encodage). Le type MIME du client est ignoré.
+UPLOAD_FORMATS = {
+    "JPEG": ("jpg", {"quality": 85, "optimize": True, "progressive": True}),
+    "PNG": ("png", {"optimize": True}),
+    "WEBP": ("webp", {"quality": 85}),
+}
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+def _spool(uploaded_file, max_bytes: int):
+    """Copie le fichier reçu dans un fichier temporaire, morceau par morceau, sans dépasser `max_bytes`."""
+    tmp = tempfile.TemporaryFile()
+    size = 0
+    for chunk in uploaded_file.chunks():
+        size += len(chunk)
+        if size > max_bytes:
+            tmp.close()
+            raise InvalidImage(f"Image trop volumineuse (max {max_bytes // (1024 * 1024)}MB).")
+        tmp.write(chunk)
+    tmp.seek(0)
+    return tmp
+
+
+def normalize_upload(uploaded_file) -> File:
+    """
+    Valide une image envoyée par un utilisateur et renvoie sa version normalisée :
+    format réel et dimensions lus dans l'en-tête (sans décoder les pixels), puis
+    redressement selon l'orientation EXIF, réduction à IMAGES_DIMENSION_MAX et
+    réencodage sans métadonnées. La mémoire utilisée est bornée par IMAGES_MAX_PIXELS.
+    """
+    max_bytes = getattr(settings, "TELEVERSEMENT_MAX_OCTETS", 5 * 1024 * 1024)
+    max_pixels = getattr(settings, "IMAGES_MAX_PIXELS", 40_000_000)
+    max_dimension = getattr(settings, "IMAGES_DIMENSION_MAX", 2048)
+
+    source = _spool(uploaded_file, max_bytes)
+    try:
+        try:
+            with Image.open(source) as image:
+                pil_format = image.format
+                width, height = image.size
+                image.verify()
+        except (OSError, SyntaxError, Image.DecompressionBombError) as exc:
+            raise InvalidImage("Fichier image illisible ou corrompu.") from exc
+        if pil_format not in UPLOAD_FORMATS:
+            raise InvalidImage("Format d'image non supporté (JPG, PNG, WEBP).")
+        if not width or not height or width * height > max_pixels:
+            raise InvalidImage("Dimensions d'image non supportées.")
+
+        # verify() rend l'image inutilisable : on la rouvre pour la décoder.
+        source.seek(0)
+        try:
+            with Image.open(source) as image:
+                image.draft("RGB", (max_dimension, max_dimension))
+                image = ImageOps.exif_transpose(image)
+                image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+                image.load()
+        except (OSError, SyntaxError) as exc:
+            raise InvalidImage("Fichier image illisible ou corrompu.") from exc
+    finally:
+        source.close()
+
+    if pil_format == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    elif image.mode not in ("RGB", "RGBA", "L", "LA", "P"):
+        image = image.convert("RGBA")
+
+    ext, options = UPLOAD_FORMATS[pil_format]
+    output = tempfile.TemporaryFile()
+    # Aucun `exif=` ni `pnginfo=` : les métadonnées (GPS, appareil…) ne sont pas recopiées.
+    image.save(output, pil_format, **options)
+    output.seek(0)
+    stem = PurePosixPath(getattr(uploaded_file, "name", "") or "image").stem or "image"
+    return File(output, name=f"{stem}.{ext}")
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+from django.conf import settings
+from django.db import transaction
+
+from voitures import images, stockage
+from voitures.catalogue import invalidate_homepage
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = ".import_manifest.json"
+CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class CopyJob:
+    source: str
+    # Racine du stockage par contenu (MEDIA_ROOT), passée explicitement aux processus du pool.
+    root: str
+    # Générer aussi les déclinaisons (voitures.images) dans le même processus.
+    variants: bool = False
+
+
+@dataclass(frozen=True)
+class CopyResult:
+    source: str
+    sha256: str
+    size: int
+    mtime_ns: int
+    name: str
+    written: bool
+    # Largeur de la source, si ses déclinaisons ont été générées.
+    largeur: int | None = None
+
+
+def file_sha256(path: str | Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def copy_file(job: CopyJob) -> CopyResult:
+    """
+    Exécuté dans un processus du pool : aucun accès à la base ici, uniquement des fichiers.
+    Le fichier est rangé sous son empreinte (voitures.stockage) ; un contenu déjà présent
+    n'est pas réécrit. Avec `job.variants`, ses déclinaisons sont générées ici aussi : le
+    redimensionnement, bien plus coûteux que la copie, profite du même parallélisme.
+    """
+    stat = os.stat(job.source)
+    sha = file_sha256(job.source)
+    with open(job.source, "rb") as fh:
+        name = stockage.blob_name(sha, stockage.content_extension(fh, job.source))
+    dest = os.path.join(job.root, name)
+    written = False
+    if not os.path.exists(dest):
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        tmp = f"{dest}.{os.getpid()}.tmp"
+        shutil.copy2(job.source, tmp)
+        os.replace(tmp, dest)
+        written = True
+    largeur = None
+    if job.variants:
+        try:
+            largeur, _ = images.write_variants(name)
+        except Exception:
+            logger.exception("Échec de la génération des déclinaisons: %s", name)
+    return CopyResult(job.source, sha, stat.st_size, stat.st_mtime_ns, name, written, largeur)
+
+
+def run_copies(jobs: list[CopyJob], workers: int) -> Iterator[CopyResult]:
+    if workers <= 1 or len(jobs) <= 1:
+        yield from map(copy_file, jobs)
+        return
+    chunksize = max(1, len(jobs) // (workers * 8))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(copy_file, jobs, chunksize=chunksize)
+
+
+class Manifest:
+    """
+    Sources des imports précédents, stockées dans MEDIA_ROOT/.import_manifest.json :
+    chemin source -> taille, mtime, SHA-256, nom du contenu stocké et, si ses déclinaisons
+    ont été générées, largeur de l'image. Une source dont la taille et la mtime n'ont pas
+    bougé n'est même pas relue.
+    """
+
+    def __init__(self, path: Path | None = None):
+        self.root = Path(settings.MEDIA_ROOT)
+        self.path = path or self.root / MANIFEST_NAME
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            data = {}
+        self.sources: dict[str, dict] = data.get("sources", {})
+
+    def current(self, source: Path, variants: bool = False) -> dict | None:
+        """
+        Entrée de la source si elle n'a pas changé depuis le dernier import (et, avec
+        `variants`, si ses déclinaisons ont déjà été générées), sinon None.
+        """
+        record = self.sources.get(str(source))
+        if record is None or "name" not in record or not (self.root / record["name"]).exists():
+            return None
+        if variants and not record.get("largeur"):
+            return None
+        stat = source.stat()
+        if record["size"] != stat.st_size or record["mtime_ns"] != stat.st_mtime_ns:
+            return None
+        return record
+
+    def job(self, source: Path, variants: bool = False) -> CopyJob:
+        return CopyJob(str(source), str(self.root), variants)
+
+    def record(self, result: CopyResult) -> None:
+        self.sources[result.source] = {
+            "size": result.size,
+            "mtime_ns": result.mtime_ns,
+            "sha256": result.sha256,
+            "name": result.name,
+            **({"largeur": result.largeur} if result.largeur else {}),
+        }
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.tmp")
+        tmp.write_text(json.dumps({"sources": self.sources}, indent=1, sort_keys=True))
+        os.replace(tmp, self.path)
+
+
+@dataclass
+class Imported:
+    # Source -> nom du contenu stocké, et largeur de l'image si ses déclinaisons existent.
+    names: dict[Path, str]
+    largeurs: dict[Path, int]
+    # Sources réellement écrites, et sources dont le contenu était déjà stocké.
+    written: int
+    unchanged: int
+
+
+def import_files(sources, workers: int, variants: bool = False) -> Imported:
+    """
+    Range chaque source dans le stockage par contenu (en parallèle si workers > 1), avec ses
+    déclinaisons si `variants` : elles sont générées par les processus qui copient.
+    """
+    manifest = Manifest()
+    imported = Imported({}, {}, 0, 0)
+    jobs = []
+    for source in sources:
+        record = manifest.current(source, variants)
+        if record is None:
+            jobs.append(manifest.job(source, variants))
+            continue
+        imported.names[source] = record["name"]
+        if record.get("largeur"):
+            imported.largeurs[source] = record["largeur"]
+        imported.unchanged += 1
+
+    entries = []
+    for result in run_copies(jobs, workers):
+        manifest.record(result)
+        source = Path(result.source)
+        imported.names[source] = result.name
+        if result.largeur:
+            imported.largeurs[source] = result.largeur
+        entries.append((result.sha256, result.name, result.size))
+        if result.written:
+            imported.written += 1
+        else:
+            imported.unchanged += 1
+    if entries:
+        stockage.register(entries)
+    manifest.save()
+    return imported
+
+
+def link_files(
+    planned: dict[Path, list], field: str, workers: int, batch_size: int | None = None, width_field: str | None = None
+) -> tuple[int, int, set[str]]:
+    """
+    Range les sources (import_files), puis fait pointer le champ fichier `field` des objets
+    associés à chaque source vers son contenu stocké, par lots. bulk_update n'émet pas
+    post_save : on fait nous-mêmes ce que font les signaux (références, page d'accueil).
+    Avec `width_field`, les déclinaisons sont générées pendant l'import et la largeur de
+    chaque image est enregistrée dans ce champ, dans le même bulk_update.
+    Renvoie le nombre de sources copiées, inchangées, et les noms nouvellement liés.
+    """
+    imported = import_files(planned, workers, variants=width_field is not None)
+    names = imported.names
+
+    to_update, relinked, old_names = [], [], []
+    for source, targets in planned.items():
+        largeur = imported.largeurs.get(source)
+        for obj in targets:
+            file = getattr(obj, field)
+            changed = False
+            if file.name != names[source]:
+                old_names.append(file.name)
+                file.name = names[source]
+                relinked.append(obj)
+                changed = True
+            if width_field and largeur and getattr(obj, width_field) != largeur:
+                setattr(obj, width_field, largeur)
+                changed = True
+            if changed:
+                to_update.append(obj)
+    if to_update:
+        fields = [field, width_field] if width_field else [field]
+        with transaction.atomic():
+            type(to_update[0]).objects.bulk_update(to_update, fields, batch_size=batch_size)
+            stockage.retain(getattr(obj, field).name for obj in relinked)
+            stockage.release(old_names)
+        invalidate_homepage()
+    return imported.written, imported.unchanged, {getattr(obj, field).name for obj in relinked}
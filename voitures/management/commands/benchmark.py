@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+import io
+import json
+import logging
+import statistics
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext,
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlencode, urlsafe_base64_encode
+
+from voitures import urls as voitures_urls
+from voitures.models import Marque, Transaction, Voiture
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / "benchmarks" / "baseline.json"
+
+# Vue -> utilisateur connecté pour la mesure (par défaut : un acheteur connecté).
+ROLES = {
+    "accueil": "anonyme",
+    "liste_voitures": "anonyme",
+    "inscription": "anonyme",
+    "connexion": "anonyme",
+    "password_reset": "anonyme",
+    "password_reset_done": "anonyme",
+    "password_reset_confirm": "anonyme",
+    "password_reset_complete": "anonyme",
+    "api_voitures": "anonyme",
+    "api_voiture": "anonyme",
+    "api_marques": "anonyme",
+    "api_modeles": "anonyme",
+    "healthz": "anonyme",
+    "readyz": "anonyme",
+    "test": "anonyme",
+    "modifier_voiture": "vendeur",
+    "supprimer_voiture": "vendeur",
+    "mes_voitures": "vendeur",
+    "mes_ventes": "vendeur",
+    "confirmer_vente": "vendeur",
+    "dashboard": "staff",
+    "exporter": "staff",
+    "profils": "staff",
+    "profil": "staff",
+    "profil_fichier": "staff",
+}
+
+# Recherche plein texte sur le jeu de données agrandi (--recherche-voitures) : première page et suivante.
+RECHERCHE_VOLUME = ("liste_voitures:volume", "liste_voitures:volume_suivante")
+
+# Vues qui déconnectent le client : il est reconnecté avant chaque requête (hors chronométrage).
+RELOGIN = {"deconnexion"}
+
+
+@dataclass
+class Scenario:
+    name: str
+    url: str
+    role: str
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure toutes les vues de voitures/urls.py sur un jeu de données fixe (base de test) : "
+        "latence p50/p95/p99, nombre de requêtes SQL et octets renvoyés, comparés à une référence JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--voitures", type=int, default=2000, help="Taille du jeu de données (par défaut: 2000).")
+        parser.add_argument("--seed", type=int, default=42, help="Graine du jeu de données (par défaut: 42).")
+        parser.add_argument(
+            "--recherche-voitures",
+            type=int,
+            default=20000,
+            help=(
+                "Taille du jeu de données, agrandi après les autres scénarios, pour mesurer la recherche "
+                "plein texte et sa page suivante (par défaut: 20000 ; 0 pour ne pas les mesurer)."
+            ),
+        )
+        parser.add_argument("--iterations", type=int, default=20, help="Requêtes mesurées par vue (par défaut: 20).")
+        parser.add_argument("--warmup", type=int, default=3, help="Requêtes d'échauffement par vue (par défaut: 3).")
+        parser.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="Fichier de référence JSON.")
+        parser.add_argument("--save-baseline", action="store_true", help="Enregistre les résultats comme nouvelle référence.")
+        parser.add_argument(
+            "--seuil",
+            type=float,
+            default=0.25,
+            help="Hausse relative tolérée de la latence p50 et des octets (par défaut: 0.25 = +25%%).",
+        )
+        parser.add_argument(
+            "--marge-ms",
+            type=float,
+            default=2.0,
+            help="Hausse absolue de latence ignorée, pour absorber le bruit des vues rapides (par défaut: 2 ms).",
+        )
+        parser.add_argument("--output", help="Écrit aussi les résultats bruts dans ce fichier JSON.")
+        parser.add_argument("--filtre", default="", help="Ne mesure que les scénarios dont le nom contient ce texte.")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        # Cache propre au processus : ni le cache partagé de l'application ni ses entrées ne sont touchés.
+        cache_override = override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+        cache_override.enable()
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            cache.clear()
+            self.stdout.write(f"Jeu de données: {options['voitures']} annonces (graine {options['seed']})…")
+            call_command("generate_load_data", voitures=options["voitures"], seed=options["seed"], stdout=io.StringIO())
+            scenarios, users = self._scenarios()
+            results = self._run(
+                [s for s in scenarios if options["filtre"] in s.name],
+                users,
+                options["iterations"],
+                options["warmup"],
+            )
+            if options["recherche_voitures"] > options["voitures"] and any(
+                options["filtre"] in name for name in RECHERCHE_VOLUME
+            ):
+                volume = self._search_volume(options["recherche_voitures"], options["voitures"], options["seed"])
+                results.update(
+                    self._run(
+                        [s for s in volume if options["filtre"] in s.name],
+                        users,
+                        options["iterations"],
+                        options["warmup"],
+                    )
+                )
+        finally:
+            cache_override.disable()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            "parametres": {
+                "voitures": options["voitures"],
+                "recherche_voitures": options["recherche_voitures"],
+                "seed": options["seed"],
+                "iterations": options["iterations"],
+            },
+            "vues": results,
+        }
+        if options["output"]:
+            Path(options["output"]).write_text(json.dumps(report, indent=2, ensure_ascii=False))
+
+        baseline_path = Path(options["baseline"])
+        if options["save_baseline"]:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(report, indent=2, ensure_ascii=False, sort_keys=True))
+            self.stdout.write(self.style.SUCCESS(f"Référence enregistrée dans {baseline_path}"))
+            return
+
+        baseline = None
+        if baseline_path.exists():
+            baseline = json.loads(baseline_path.read_text())
+            parametres = baseline.get("parametres", {})
+            if (parametres.get("voitures"), parametres.get("recherche_voitures")) != (
+                options["voitures"],
+                options["recherche_voitures"],
+            ):
+                self.stdout.write(self.style.WARNING("La référence a été mesurée sur un jeu de données différent."))
+        else:
+            self.stdout.write(self.style.WARNING(f"Pas de référence ({baseline_path}) : lancez avec --save-baseline."))
+
+        regressions = self._report(results, (baseline or {}).get("vues", {}), options["seuil"], options["marge_ms"])
+        errors = [name for name, r in results.items() if r["status"] >= 500]
+        if errors:
+            raise CommandError(f"Erreurs serveur: {', '.join(errors)}")
+        if regressions:
+            raise CommandError(f"{len(regressions)} régression(s): " + "; ".join(regressions))
+        self.stdout.write(self.style.SUCCESS("Aucune régression."))
+
+    # ------------------------------------------------------------------ scénarios
+
+    def _scenarios(self) -> tuple[list[Scenario], dict[str, User]]:
+        vendeur = User.objects.filter(voitures_vendues__isnull=False).order_by("id").first()
+        acheteur = User.objects.exclude(pk=vendeur.pk).order_by("-id").first()
+        staff = User.objects.create_superuser("bench-staff", "bench-staff@example.com", "Bench123!")
+        users = {"vendeur": vendeur, "acheteur": acheteur, "staff": staff}
+
+        dispo = Voiture.objects.filter(est_vendue=False, est_reservee=False).order_by("id")
+        a_vendre = dispo.exclude(vendeur=vendeur).first()
+        sienne = dispo.filter(vendeur=vendeur).first() or Voiture.objects.filter(vendeur=vendeur).first()
+        transaction = Transaction.objects.filter(statut="en_attente").order_by("id").first()
+        if transaction is not None:
+            users["vendeur_transaction"] = transaction.vendeur
+
+        params = {
+            "uidb64": urlsafe_base64_encode(force_bytes(acheteur.pk)),
+            "token": default_token_generator.make_token(acheteur),
+            "transaction_id": transaction.id if transaction else 0,
+            "recherche_id": 0,
+            "dataset": "voitures",
+            "fmt": "csv",
+            # Pas de capture dans la base de test : mesure le chemin 404.
+            "capture_id": "00000000T000000-00000000",
+            "kind": "speedscope",
+        }
+
+        scenarios = []
+        for pattern in voitures_urls.urlpatterns:
+            name = pattern.name
+            role = ROLES.get(name, "acheteur")
+            if name == "confirmer_vente" and transaction is not None:
+                role = "vendeur_transaction"
+            kwargs = {}
+            for key in pattern.pattern.converters:
+                if key == "voiture_id":
+                    kwargs[key] = (sienne if role == "vendeur" else a_vendre).id
+                else:
+                    kwargs[key] = params[key]
+            scenarios.append(Scenario(name, reverse(name, kwargs=kwargs), role))
+
+        # Variantes de la liste : recherche plein texte, filtres + tri, page suivante.
+        marque = Marque.objects.order_by("id").first()
+        liste = reverse("liste_voitures")
+        for suffix, query in (
+            ("recherche", {"q": "toyota gps"}),
+            ("filtres", {"marque": marque.id, "prix_max": 20000, "sort": "prix_asc"}),
+            ("facettes", {"carburant": "diesel", "etat": "occasion"}),
+        ):
+            scenarios.append(Scenario(f"liste_voitures:{suffix}", f"{liste}?{urlencode(query)}", "anonyme"))
+        scenarios.append(Scenario("api_voitures:fields", f"{reverse('api_voitures')}?fields=id,prix,marque&limit=100", "anonyme"))
+        return scenarios, users
+
+    def _search_volume(self, total: int, existing: int, seed: int) -> list[Scenario]:
+        """
+        Ajoute des annonces jusqu'à `total` puis renvoie les scénarios RECHERCHE_VOLUME : un mot
+        court qui correspond à des milliers d'annonces, triées par pertinence, et la page suivante.
+        """
+        self.stdout.write(f"Jeu de données agrandi à {total} annonces pour la recherche…")
+        call_command(
+            "generate_load_data", voitures=total - existing, seed=seed + 1, prefixe="bench-volume", stdout=io.StringIO()
+        )
+        url = f"{reverse('liste_voitures')}?{urlencode({'q': 'toy'})}"
+        page = Client().get(url).context["voitures"]
+        first, following = RECHERCHE_VOLUME
+        return [
+            Scenario(first, url, "anonyme"),
+            Scenario(following, f"{url}&{urlencode({'cursor': page.next_cursor})}", "anonyme"),
+        ]
+
+    # ------------------------------------------------------------------ mesure
+
+    def _client(self, role: str, users: dict) -> Client:
+        client = Client()
+        if role != "anonyme":
+            client.force_login(users[role])
+        return client
+
+    def _run(self, scenarios, users, iterations: int, warmup: int) -> dict:
+        # Les 4xx attendus (vues POST appelées en GET) ne doivent pas noyer le rapport.
+        logger = logging.getLogger("django.request")
+        level = logger.level
+        logger.setLevel(logging.ERROR)
+        try:
+            return self._measure(scenarios, users, iterations, warmup)
+        finally:
+            logger.setLevel(level)
+
+    def _measure(self, scenarios, users, iterations: int, warmup: int) -> dict:
+        results = {}
+        for scenario in scenarios:
+            client = self._client(scenario.role, users)
+            timings, queries, size, status = [], [], 0, 0
+            for i in range(warmup + iterations):
+                if scenario.name in RELOGIN:
+                    client.force_login(users[scenario.role])
+                with CaptureQueriesContext(connection) as ctx:
+                    start = time.perf_counter()
+                    response = client.get(scenario.url)
+                    body = b"".join(response.streaming_content) if response.streaming else response.content
+                    elapsed = time.perf_counter() - start
+                if i >= warmup:
+                    timings.append(elapsed * 1000)
+                    queries.append(len(ctx.captured_queries))
+                size, status = len(body), response.status_code
+
+            cuts = statistics.quantiles(timings, n=100, method="inclusive") if len(timings) > 1 else timings * 99
+            results[scenario.name] = {
+                "url": scenario.url,
+                "role": scenario.role,
+                "status": status,
+                "p50_ms": round(cuts[49], 2),
+                "p95_ms": round(cuts[94], 2),
+                "p99_ms": round(cuts[98], 2),
+                "requetes": int(statistics.median(queries)),
+                "octets": size,
+            }
+        return results
+
+    def _report(self, results: dict, baseline: dict, seuil: float, marge_ms: float) -> list[str]:
+        regressions = []
+        header = f"{'vue':<32} {'statut':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'req.':>5} {'octets':>9}  comparaison"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for name, r in results.items():
+            notes = []
+            ref = baseline.get(name)
+            if ref:
+                if r["requetes"] > ref["requetes"]:
+                    notes.append(f"requêtes {ref['requetes']} -> {r['requetes']}")
+                if r["p50_ms"] > ref["p50_ms"] * (1 + seuil) and r["p50_ms"] - ref["p50_ms"] > marge_ms:
+                    notes.append(f"p50 {ref['p50_ms']} -> {r['p50_ms']} ms")
+                if r["octets"] > ref["octets"] * (1 + seuil):
+                    notes.append(f"octets {ref['octets']} -> {r['octets']}")
+                if r["status"] != ref["status"]:
+                    notes.append(f"statut {ref['status']} -> {r['status']}")
+            if notes:
+                regressions.append(f"{name}: {', '.join(notes)}")
+            comparison = ", ".join(notes) if notes else ("ok" if ref else "-")
+            line = (
+                f"{name:<32} {r['status']:>6} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} "
+                f"{r['requetes']:>5} {r['octets']:>9}  {comparison}"
+            )
+            self.stdout.write(self.style.ERROR(line) if notes or r["status"] >= 500 else line)
+        return regressions
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, Q
+
+from voitures.models import Avis, Marque, Message, Notification, Transaction, Voiture
+from voitures.pagination import SORTS
+
+
+def _uses_index(plan: str) -> bool:
+    if connection.vendor == "postgresql":
+        return "Index Scan" in plan or "Index Only Scan" in plan or "Bitmap Index Scan" in plan
+    if connection.vendor == "sqlite":
+        return "USING INDEX" in plan or "USING COVERING INDEX" in plan or "USING INTEGER PRIMARY KEY" in plan
+    return "index" in plan.lower()
+
+
+class Command(BaseCommand):
+    help = "Affiche le plan d'exécution (EXPLAIN) des requêtes principales de chaque vue et vérifie l'usage des index."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            help="Nom d'utilisateur pour les requêtes propres à un compte (par défaut: le premier utilisateur).",
+        )
+        parser.add_argument(
+            "--verbose-plans",
+            action="store_true",
+            help="Affiche le plan complet de chaque requête.",
+        )
+        parser.add_argument(
+            "--strict",
+            action="store_true",
+            help="Échoue si une requête n'utilise aucun index.",
+        )
+
+    def _queries(self, user):
+        dispo = Voiture.objects.filter(est_vendue=False)
+        voiture = dispo.first() or Voiture.objects.first()
+
+        yield "accueil: voitures récentes", dispo.order_by("-date_ajout")[:6]
+        yield "accueil: voitures promo", dispo.order_by("prix")[:6]
+        yield "accueil: marques populaires", Marque.objects.annotate(
+            nb_voitures=Count("modeles__voitures")
+        ).order_by("-nb_voitures")[:8]
+
+        for sort, (field, descending) in SORTS.items():
+            prefix = "-" if descending else ""
+            qs = dispo.select_related("modele__marque", "vendeur").order_by(f"{prefix}{field}", f"{prefix}id")
+            yield f"liste_voitures: sort={sort or 'défaut'}", qs[:13]
+            if voiture:
+                op = "lt" if descending else "gt"
+                after = Q(**{f"{field}__{op}": getattr(voiture, field)}) | Q(
+                    **{field: getattr(voiture, field), f"id__{op}": voiture.id}
+                )
+                yield f"liste_voitures: sort={sort or 'défaut'}, page suivante", qs.filter(after)[:13]
+
+        if voiture:
+            yield "detail_voiture: avis approuvés", Avis.objects.filter(voiture=voiture, approuve=True)
+            yield "detail_voiture: voitures similaires", dispo.filter(
+                modele__marque_id=voiture.modele.marque_id
+            ).exclude(id=voiture.id)[:4]
+
+        if user:
+            yield "mes_voitures", Voiture.objects.filter(vendeur=user).order_by("-date_ajout")
+            yield "notifications: liste", Notification.objects.filter(utilisateur=user).order_by("-date_creation")[:200]
+            yield "notifications: non lues", Notification.objects.filter(utilisateur=user, lu=False)
+            yield "mes_messages: reçus", Message.objects.filter(destinataire=user).order_by("-date_envoi")
+            yield "mes_messages: envoyés", Message.objects.filter(expediteur=user).order_by("-date_envoi")
+            yield "mes_messages: non lus", Message.objects.filter(destinataire=user, lu=False)
+
+        yield "dashboard: transactions récentes", Transaction.objects.order_by("-date_transaction")[:10]
+        yield "dashboard: transactions en attente", Transaction.objects.filter(statut="en_attente").order_by(
+            "-date_transaction"
+        )[:10]
+
+    def handle(self, *args, **options):
+        username = options.get("user")
+        if username:
+            user = User.objects.filter(username=username).first()
+            if not user:
+                raise CommandError(f"Utilisateur introuvable: {username}")
+        else:
+            user = User.objects.order_by("id").first()
+
+        self.stdout.write(f"Base: {connection.vendor}")
+        without_index = []
+        for label, qs in self._queries(user):
+            plan = qs.explain()
+            if _uses_index(plan):
+                self.stdout.write(self.style.SUCCESS(f"INDEX  {label}"))
+            else:
+                without_index.append(label)
+                self.stdout.write(self.style.WARNING(f"SCAN   {label}"))
+            if options["verbose_plans"]:
+                self.stdout.write("       " + plan.replace("\n", "\n       "))
+
+        if without_index and options["strict"]:
+            raise CommandError(f"{len(without_index)} requête(s) sans index: {', '.join(without_index)}")
+        self.stdout.write(self.style.SUCCESS(f"Terminé. Requêtes sans index: {len(without_index)}"))
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import sys
+
+from django.core.management.base import BaseCommand
+
+from voitures import export
+
+
+class Command(BaseCommand):
+    help = "Exporte toutes les annonces ou transactions en CSV ou NDJSON, à mémoire constante."
+
+    def add_arguments(self, parser):
+        parser.add_argument("dataset", choices=sorted(export.DATASETS), help="Données à exporter.")
+        parser.add_argument("--format", choices=sorted(export.CONTENT_TYPES), default="csv", help="Format (par défaut: csv).")
+        parser.add_argument("--output", "-o", help="Fichier de sortie (par défaut: sortie standard).")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=export.CHUNK_SIZE,
+            help=f"Lignes lues par requête (par défaut: {export.CHUNK_SIZE}).",
+        )
+
+    def handle(self, *args, **options):
+        chunks = export.stream(options["dataset"], options["format"], options["chunk_size"])
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8", newline="") as fh:
+                fh.writelines(chunks)
+            self.stderr.write(self.style.SUCCESS(f"Export écrit dans {options['output']}"))
+        else:
+            sys.stdout.writelines(chunks)
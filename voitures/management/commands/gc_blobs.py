@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import os
+from datetime import timedelta
+from pathlib import Path
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from voitures import images, stockage
+from voitures.models import FichierMedia
+
+
+class Command(BaseCommand):
+    help = (
+        "Ramasse-miettes du stockage par contenu : recompte les références de chaque fichier "
+        "et supprime ceux qui ne sont plus utilisés par aucune annonce, image ou marque."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace-hours",
+            type=int,
+            default=24,
+            help="Âge minimal (heures) d'un fichier non référencé avant suppression (par défaut: 24).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Affiche ce qui serait supprimé sans rien supprimer.",
+        )
+        parser.add_argument(
+            "--adopt-legacy",
+            action="store_true",
+            help="Range d'abord les fichiers nommés à l'ancienne (voitures/…, logos/…) dans le stockage par contenu.",
+        )
+
+    def handle(self, *args, **options):
+        dry_run: bool = options["dry_run"]
+        storage = stockage.blob_storage()
+
+        if options["adopt_legacy"] and not dry_run:
+            adopted, freed = self._adopt_legacy(storage)
+            self.stdout.write(f"Fichiers adoptés: {adopted}, anciens fichiers supprimés: {freed}")
+
+        # Fichiers présents sur disque mais jamais déclarés (import interrompu par exemple).
+        self._register_unknown_files(storage)
+
+        # Comptes par empreinte : un même contenu nommé .jpeg ici et .jpg là est un seul fichier.
+        counts = stockage.count_references()
+        fixed = []
+        for fichier in FichierMedia.objects.iterator(chunk_size=2000):
+            if fichier.references != counts[fichier.sha256]:
+                fichier.references = counts[fichier.sha256]
+                fixed.append(fichier)
+        if not dry_run:
+            FichierMedia.objects.bulk_update(fixed, ["references"], batch_size=1000)
+
+        limit = timezone.now() - timedelta(hours=options["grace_hours"])
+        orphans = FichierMedia.objects.filter(references=0, date_maj__lt=limit)
+        deleted = freed_bytes = 0
+        for fichier in orphans.iterator(chunk_size=500):
+            if counts[fichier.sha256]:
+                continue
+            self.stdout.write(f"DEL  {fichier.nom} ({fichier.taille} octets)")
+            if dry_run:
+                continue
+            with transaction.atomic():
+                # Revérifie sous verrou : le contenu a pu être réutilisé depuis le comptage.
+                locked = FichierMedia.objects.select_for_update().filter(
+                    pk=fichier.pk, references=0, date_maj__lt=limit
+                ).first()
+                if locked is None:
+                    continue
+                locked.delete()
+                for name in {fichier.nom, *storage.blob_files(fichier.sha256)}:
+                    storage.delete_blob(name)
+            images.delete_variants(fichier.nom)
+            deleted += 1
+            freed_bytes += fichier.taille
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Terminé. Références corrigées: {len(fixed)}, fichiers supprimés: {deleted}, "
+                f"espace libéré: {freed_bytes / 1024 / 1024:.1f} Mo"
+            )
+        )
+
+    def _register_unknown_files(self, storage) -> None:
+        root = Path(storage.path(stockage.BLOB_PREFIX))
+        if not root.exists():
+            return
+        # Connu = empreinte suivie, quelle que soit l'extension du fichier trouvé.
+        known = set(FichierMedia.objects.values_list("sha256", flat=True))
+        entries = []
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                if filename.endswith(".tmp"):
+                    continue
+                path = Path(dirpath) / filename
+                name = path.relative_to(storage.location).as_posix()
+                if path.stem not in known:
+                    known.add(path.stem)
+                    entries.append((path.stem, name, path.stat().st_size))
+        if entries:
+            stockage.register(entries)
+
+    def _adopt_legacy(self, storage) -> tuple[int, int]:
+        adopted = 0
+        legacy_names = set()
+        for label, field_name in stockage.FIELDS:
+            model = apps.get_model(label)
+            field = model._meta.get_field(field_name)
+            names = (
+                model.objects.exclude(**{f"{field_name}__startswith": stockage.BLOB_PREFIX})
+                .exclude(**{f"{field_name}__in": ["", field.default]})
+                .exclude(**{f"{field_name}__isnull": True})
+                .values_list(field_name, flat=True)
+                .distinct()
+            )
+            for name in list(names):
+                if not storage.exists(name):
+                    continue
+                with storage.open(name, "rb") as fh:
+                    new_name = storage.save(name, fh)
+                with transaction.atomic():
+                    count = model.objects.filter(**{field_name: name}).update(**{field_name: new_name})
+                    stockage.retain([new_name] * count)
+                legacy_names.add(name)
+                adopted += 1
+
+        freed = 0
+        still_used = set()
+        for label, field_name in stockage.FIELDS:
+            model = apps.get_model(label)
+            still_used.update(
+                model.objects.filter(**{f"{field_name}__in": legacy_names}).values_list(field_name, flat=True)
+            )
+        for name in legacy_names - still_used:
+            storage.delete(name)
+            images.delete_variants(name)
+            freed += 1
+        return adopted, freed
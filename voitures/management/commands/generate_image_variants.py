@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from voitures import images
+from voitures.models import ImageVoiture, Voiture
+
+
+class Command(BaseCommand):
+    help = "Génère les déclinaisons redimensionnées (WebP/JPEG) de toutes les photos d'annonces."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Régénère même les déclinaisons existantes.")
+
+    def handle(self, *args, **options):
+        names = set(Voiture.objects.exclude(image_principale="").values_list("image_principale", flat=True))
+        names |= set(ImageVoiture.objects.exclude(image="").values_list("image", flat=True))
+
+        written = errors = 0
+        for name in sorted(names):
+            try:
+                written += images.generate_variants(name, force=options["force"])
+            except Exception as exc:
+                errors += 1
+                self.stderr.write(f"{name}: {exc}")
+        self.stdout.write(
+            self.style.SUCCESS(f"Terminé. Images: {len(names)}, fichiers écrits: {written}, erreurs: {errors}")
+        )
@@ -0,0 +1,449 @@
+from __future__ import annotations
+
+import itertools
+import math
+import random
+import time
+from array import array
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from voitures import caches, notes, recherche, similaires, statistiques
+from voitures.catalogue import invalidate_homepage
+from voitures.models import Avis, Favori, Marque, Message, Modele, Notification, Transaction, Voiture
+
+MARQUES = [
+    ("Toyota", "Japon"), ("Renault", "France"), ("Peugeot", "France"), ("Volkswagen", "Allemagne"),
+    ("Mercedes-Benz", "Allemagne"), ("Hyundai", "Corée du Sud"), ("Citroën", "France"), ("Ford", "États-Unis"),
+    ("BMW", "Allemagne"), ("Nissan", "Japon"), ("Kia", "Corée du Sud"), ("Suzuki", "Japon"),
+    ("Audi", "Allemagne"), ("Honda", "Japon"), ("Mitsubishi", "Japon"), ("Dacia", "Roumanie"),
+    ("Opel", "Allemagne"), ("Mazda", "Japon"), ("Fiat", "Italie"), ("Skoda", "République tchèque"),
+    ("Land Rover", "Royaume-Uni"), ("Lexus", "Japon"), ("Isuzu", "Japon"), ("Chevrolet", "États-Unis"),
+    ("Seat", "Espagne"), ("Volvo", "Suède"), ("Jeep", "États-Unis"), ("Tesla", "États-Unis"),
+    ("Porsche", "Allemagne"), ("Mini", "Royaume-Uni"), ("Subaru", "Japon"), ("Alfa Romeo", "Italie"),
+    ("Jaguar", "Royaume-Uni"), ("Infiniti", "Japon"), ("Chery", "Chine"), ("Geely", "Chine"),
+    ("BYD", "Chine"), ("Great Wall", "Chine"), ("Tata", "Inde"), ("Proton", "Malaisie"),
+]
+
+CARBURANTS = (["essence", "diesel", "hybride", "electrique", "gpl"], [45, 35, 11, 6, 3])
+TRANSMISSIONS = (["manuelle", "automatique", "semi-auto"], [55, 40, 5])
+COULEURS = (
+    ["blanc", "noir", "gris", "argent", "bleu", "rouge", "vert", "beige", "marron", "jaune", "orange", "violet"],
+    [24, 20, 17, 12, 9, 8, 3, 2, 2, 1, 1, 1],
+)
+ETATS = (["occasion", "reconditionne", "neuf"], [82, 11, 7])
+NOTES = ([5, 4, 3, 2, 1], [38, 33, 15, 7, 7])
+STATUTS_VENTE = (["terminee", "confirmee"], [80, 20])
+STATUTS_OUVERTS = (["en_attente", "annulee"], [60, 40])
+TYPES_NOTIFICATION = (["message", "purchase_request", "sale_confirmed", "new_listing"], [45, 25, 10, 20])
+
+ATOUTS = [
+    "climatisation", "GPS", "caméra de recul", "jantes alliage", "toit ouvrant", "sièges chauffants",
+    "régulateur de vitesse", "Bluetooth", "radar de stationnement", "carnet d'entretien complet",
+    "première main", "pneus neufs", "boîte révisée", "intérieur cuir", "faible consommation",
+]
+SUJETS = ["Disponibilité", "Prix négociable ?", "Visite du véhicule", "Historique d'entretien", "Question sur l'annonce"]
+COMMENTAIRES = [
+    "Vendeur sérieux, voiture conforme à l'annonce.",
+    "Très bon état général, je recommande.",
+    "Quelques rayures non mentionnées mais bon rapport qualité/prix.",
+    "Transaction rapide et sans souci.",
+    "Kilométrage conforme, moteur en bon état.",
+    "Déçu par l'état intérieur.",
+]
+
+
+def _zipf(n: int, s: float = 1.1) -> list[float]:
+    """Poids cumulés d'une loi de Zipf : quelques éléments très fréquents, une longue traîne."""
+    return list(itertools.accumulate(1 / (i + 1) ** s for i in range(n)))
+
+
+def _batched(iterable, size: int):
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+def _geometric(rng: random.Random, mean: float) -> int:
+    """Entier >= 0 de loi géométrique et de moyenne `mean` (beaucoup de 0 et 1, quelques grandes valeurs)."""
+    if mean <= 0:
+        return 0
+    return int(math.log(1.0 - rng.random()) / math.log(mean / (mean + 1)))
+
+
+class Command(BaseCommand):
+    help = (
+        "Génère un grand volume de données réalistes (utilisateurs, annonces, favoris, avis, messages, "
+        "transactions, notifications) pour les tests de charge. Même graine => mêmes données. "
+        "Débit mesuré sous SQLite : 35 000 à 45 000 lignes/s. L'executemany de SQLite plafonne "
+        "vers 100 000 lignes/s à lui seul (index maintenus pendant l'insertion), et chaque ligne "
+        "demande plusieurs tirages aléatoires en Python."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--voitures", type=int, default=100_000, help="Nombre d'annonces (par défaut: 100000).")
+        parser.add_argument("--utilisateurs", type=int, help="Nombre d'utilisateurs (par défaut: voitures / 5).")
+        parser.add_argument("--marques", type=int, default=len(MARQUES), help=f"Nombre de marques (par défaut: {len(MARQUES)}).")
+        parser.add_argument("--modeles-par-marque", type=int, default=12, help="Modèles par marque (par défaut: 12).")
+        parser.add_argument("--favoris", type=int, help="Nombre de favoris (par défaut: 2 x voitures).")
+        parser.add_argument("--avis", type=int, help="Nombre d'avis (par défaut: voitures / 2).")
+        parser.add_argument("--messages", type=int, help="Nombre de messages (par défaut: voitures).")
+        parser.add_argument("--transactions", type=int, help="Nombre de transactions (par défaut: voitures / 4).")
+        parser.add_argument("--notifications", type=int, help="Nombre de notifications (par défaut: 3 x voitures).")
+        parser.add_argument("--seed", type=int, default=42, help="Graine aléatoire (par défaut: 42).")
+        parser.add_argument("--batch-size", type=int, default=5000, help="Lignes par insertion groupée (par défaut: 5000).")
+        parser.add_argument("--prefixe", default="charge", help="Préfixe des noms d'utilisateur générés (par défaut: charge).")
+        parser.add_argument(
+            "--sans-index",
+            action="store_true",
+            help=(
+                "Ne reconstruit ni l'index de recherche ni les annonces similaires "
+                "(à faire ensuite avec rebuild_search_index et rebuild_similar_cars)."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        n_voitures = options["voitures"]
+        self.batch_size = options["batch_size"]
+        self.seed = options["seed"]
+        self.prefixe = options["prefixe"]
+        self.rows_written = 0
+        # Lu une fois : connection.vendor passe par un proxy thread-local, trop coûteux à chaque ligne.
+        self.sqlite = connection.vendor == "sqlite"
+        # Dates relatives à minuit (UTC) aujourd'hui : seuls les décalages dépendent de la graine.
+        self.now = timezone.now().astimezone(dt_timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+
+        if User.objects.filter(username__startswith=f"{self.prefixe}-").exists():
+            raise CommandError(
+                f"Des utilisateurs '{self.prefixe}-…' existent déjà : choisissez un autre --prefixe "
+                "ou supprimez-les avant de relancer."
+            )
+
+        def count(name, default):
+            return options[name] if options[name] is not None else default
+
+        start = time.perf_counter()
+        users = self._step("utilisateurs", lambda: self._users(count("utilisateurs", max(10, n_voitures // 5))))
+        modeles = self._step("marques/modèles", lambda: self._catalogue(options["marques"], options["modeles_par_marque"]))
+        voitures = self._step("voitures", lambda: self._voitures(n_voitures, users, modeles))
+        self._step("favoris", lambda: self._favoris(count("favoris", 2 * n_voitures), users, voitures))
+        self._step("avis", lambda: self._avis(count("avis", n_voitures // 2), users, voitures))
+        self._step("messages", lambda: self._messages(count("messages", n_voitures), users, voitures))
+        self._step("transactions", lambda: self._transactions(count("transactions", n_voitures // 4), users, voitures))
+        self._step("notifications", lambda: self._notifications(count("notifications", 3 * n_voitures), users))
+        total, elapsed = self.rows_written, time.perf_counter() - start
+
+        self._reset_sequences()
+        # Les insertions groupées contournent les signaux : agrégats quotidiens et notes recalculés en entier.
+        statistiques.rebuild()
+        notes.refresh()
+        invalidate_homepage()
+        caches.invalidate("transactions")
+        if not options["sans_index"] and n_voitures:
+            # Les insertions groupées n'émettent pas post_save : l'index de recherche est reconstruit ici.
+            t0 = time.perf_counter()
+            recherche.reindex(Voiture.objects.filter(id__gte=voitures["first_id"]).order_by("id"), batch_size=self.batch_size)
+            self.stdout.write(f"  {'index de recherche':<20} {n_voitures:>10} annonces {time.perf_counter() - t0:6.1f}s")
+            t0 = time.perf_counter()
+            n_similaires = similaires.rebuild()
+            self.stdout.write(f"  {'annonces similaires':<20} {n_similaires:>10} annonces {time.perf_counter() - t0:6.1f}s")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Terminé. {total} lignes insérées en {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} lignes/s)".replace(",", " ")
+        ))
+
+    # ------------------------------------------------------------------ outils
+
+    def _step(self, label, func):
+        before, t0 = self.rows_written, time.perf_counter()
+        result = func()
+        n, elapsed = self.rows_written - before, time.perf_counter() - t0
+        self.stdout.write(f"  {label:<20} {n:>10} lignes  {elapsed:6.1f}s  ({n / max(elapsed, 1e-9):,.0f}/s)".replace(",", " "))
+        return result
+
+    def _rng(self, name: str) -> random.Random:
+        # Une graine par table : le contenu d'une table ne dépend pas de la taille des autres.
+        return random.Random(f"{self.seed}:{name}")
+
+    def _next_id(self, model) -> int:
+        return (model.objects.aggregate(m=Max("id"))["m"] or 0) + 1
+
+    def _when(self, rng: random.Random, max_days: float, recent_bias: float = 1.0) -> datetime:
+        """Date passée sur `max_days` jours ; recent_bias > 1 concentre les dates vers aujourd'hui."""
+        return self.now - timedelta(days=max_days * rng.random() ** recent_bias, seconds=rng.randrange(86400))
+
+    def _db_datetime(self, value: datetime):
+        # Même représentation que DateTimeField sous SQLite (UTC naïf), sans passer par le champ à chaque ligne.
+        if self.sqlite:
+            return str(value.replace(tzinfo=None))
+        return value
+
+    def _insert(self, model, columns: tuple[str, ...], rows) -> None:
+        """
+        Insertion groupée de tuples déjà prêts pour la base, par lots de --batch-size, une transaction par table.
+
+        bulk_create passe chaque valeur par Field.get_db_prep_save() et instancie un modèle par ligne,
+        ce qui plafonne vers 10k lignes/s ; ici les colonnes non fournies reçoivent leur valeur par défaut
+        (préparée une seule fois) et le lot part en un seul executemany (SQLite) ou INSERT multi-lignes
+        (PostgreSQL, psycopg2.extras.execute_values).
+        """
+        opts = model._meta
+        fields = [opts.get_field(name) for name in columns]
+        given = {f.attname for f in fields}
+        defaults = tuple(
+            f.get_db_prep_save(f.get_default(), connection)
+            for f in opts.concrete_fields
+            if f.attname not in given and not f.primary_key
+        )
+        names = [f.column for f in fields] + [
+            f.column for f in opts.concrete_fields if f.attname not in given and not f.primary_key
+        ]
+        quote = connection.ops.quote_name
+        head = f"INSERT INTO {quote(opts.db_table)} ({', '.join(quote(n) for n in names)}) VALUES "
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            for batch in _batched(rows, self.batch_size):
+                batch = [row + defaults for row in batch] if defaults else batch
+                if connection.vendor == "postgresql":
+                    from psycopg2.extras import execute_values
+
+                    execute_values(cursor.cursor, head + "%s", batch, page_size=len(batch))
+                else:
+                    cursor.executemany(head + f"({', '.join(['%s'] * len(names))})", batch)
+                self.rows_written += len(batch)
+
+    def _reset_sequences(self) -> None:
+        # Les id sont fixés par le générateur : les séquences PostgreSQL doivent être recalées.
+        models = [User, Marque, Modele, Voiture, Favori, Avis, Message, Transaction, Notification]
+        statements = connection.ops.sequence_reset_sql(no_style(), models)
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+
+    # ------------------------------------------------------------------ tables
+
+    def _users(self, n: int) -> dict:
+        rng = self._rng("utilisateurs")
+        first_id = self._next_id(User)
+        password = make_password("Charge123!")  # un seul hachage, partagé par tous les comptes générés
+
+        def rows():
+            for uid in range(first_id, first_id + n):
+                name = f"{self.prefixe}-{uid}"
+                yield uid, name, f"{name}@example.com", password, self._db_datetime(self._when(rng, 3 * 365, 0.8))
+
+        self._insert(User, ("id", "username", "email", "password", "date_joined"), rows())
+        # Vendeurs : loi de Zipf (quelques garages avec beaucoup d'annonces, beaucoup de particuliers).
+        return {"first_id": first_id, "n": n, "vendeur_weights": _zipf(n, 0.9)}
+
+    def _catalogue(self, n_marques: int, per_marque: int) -> dict:
+        # Quelques centaines de lignes au plus : bulk_create suffit et renvoie les id.
+        rng = self._rng("catalogue")
+        names = MARQUES[:n_marques] + [(f"Marque {i}", "Divers") for i in range(len(MARQUES) + 1, n_marques + 1)]
+        rank = {nom: i for i, (nom, _) in enumerate(names)}
+        existing = set(Marque.objects.filter(nom__in=rank).values_list("nom", flat=True))
+        new_marques = [
+            Marque(nom=nom, pays=pays, date_creation=date(rng.randint(1890, 2005), rng.randint(1, 12), 1))
+            for nom, pays in names
+            if nom not in existing
+        ]
+        Marque.objects.bulk_create(new_marques, batch_size=self.batch_size)
+        self.rows_written += len(new_marques)
+        marques = sorted(Marque.objects.filter(nom__in=rank), key=lambda m: rank[m.nom])
+
+        existing_modeles = set(Modele.objects.filter(marque__in=marques).values_list("marque_id", "nom"))
+        new_modeles = []
+        for marque in marques:
+            for j in range(per_marque):
+                nom = f"{marque.nom[:3].upper()}-{j + 1}"
+                if (marque.id, nom) in existing_modeles:
+                    continue
+                new_modeles.append(Modele(
+                    marque=marque,
+                    nom=nom,
+                    annee_lancement=rng.randint(1975, 2023),
+                    type_carburant=rng.choices(*CARBURANTS)[0],
+                    transmission=rng.choices(*TRANSMISSIONS)[0],
+                    puissance=max(60, int(rng.gauss(130, 45))),
+                    consommation=round(max(2.0, rng.gauss(6.5, 1.8)), 1),
+                ))
+        Modele.objects.bulk_create(new_modeles, batch_size=self.batch_size)
+        self.rows_written += len(new_modeles)
+
+        # Modèles groupés par marque ; les marques sont tirées selon leur rang (Zipf).
+        by_marque: dict[int, list[int]] = {}
+        for marque_id, modele_id in Modele.objects.filter(marque__in=marques).order_by("id").values_list("marque_id", "id"):
+            by_marque.setdefault(marque_id, []).append(modele_id)
+        marque_ids = [m.id for m in marques if m.id in by_marque]
+        if not marque_ids:
+            raise CommandError("Aucun modèle disponible pour générer des annonces.")
+        return {"marques": marque_ids, "weights": _zipf(len(marque_ids)), "modeles": by_marque}
+
+    def _voitures(self, n: int, users: dict, modeles: dict) -> dict:
+        rng = self._rng("voitures")
+        first_id = self._next_id(Voiture)
+        current_year = self.now.year
+        # Conservés pour les tables suivantes, en tableaux compacts plutôt qu'en objets :
+        vendeurs = array("q")
+        prix_list = array("d")
+        vendues = bytearray(n)
+        image = Voiture._meta.get_field("image_principale").get_default()
+
+        def rows():
+            marque_choices = rng.choices(modeles["marques"], cum_weights=modeles["weights"], k=n)
+            vendeur_offsets = rng.choices(range(users["n"]), cum_weights=users["vendeur_weights"], k=n)
+            for i in range(n):
+                annee = min(current_year, int(rng.triangular(2000, current_year + 1, current_year - 5)))
+                age = current_year - annee
+                kilometrage = 0 if age == 0 and rng.random() < 0.5 else max(0, int(age * rng.gauss(14000, 5000)))
+                prix = max(1500, int(rng.lognormvariate(10.0, 0.55) * 0.88 ** age / 50) * 50)
+                est_vendue = rng.random() < 0.2
+                vendeur_id = users["first_id"] + vendeur_offsets[i]
+                date_ajout = self._db_datetime(self._when(rng, 730, 1.6))
+                atouts = ", ".join(rng.sample(ATOUTS, rng.randint(2, 5)))
+
+                vendeurs.append(vendeur_id)
+                prix_list.append(prix)
+                vendues[i] = est_vendue
+                yield (
+                    first_id + i,
+                    rng.choice(modeles["modeles"][marque_choices[i]]),
+                    Decimal(prix),
+                    kilometrage,
+                    annee,
+                    rng.choices(*COULEURS)[0],
+                    "neuf" if kilometrage == 0 else rng.choices(*ETATS)[0],
+                    f"Véhicule {annee}, {kilometrage} km. Équipements : {atouts}.",
+                    date_ajout,
+                    date_ajout,
+                    vendeur_id,
+                    est_vendue,
+                    not est_vendue and rng.random() < 0.05,
+                    image,
+                    int(rng.expovariate(1 / 80)),
+                )
+
+        columns = (
+            "id", "modele", "prix", "kilometrage", "annee", "couleur", "etat", "description", "date_ajout",
+            "date_modification", "vendeur", "est_vendue", "est_reservee", "image_principale", "vue",
+        )
+        self._insert(Voiture, columns, rows())
+        return {"first_id": first_id, "n": n, "vendeurs": vendeurs, "prix": prix_list, "vendues": vendues}
+
+    def _favoris(self, n: int, users: dict, voitures: dict) -> None:
+        rng = self._rng("favoris")
+        mean = n / users["n"] if users["n"] else 0
+
+        def rows():
+            produced = 0
+            for offset in range(users["n"]):
+                # Couples (utilisateur, voiture) uniques : tirage sans remise par utilisateur.
+                k = min(voitures["n"], n - produced, _geometric(rng, mean))
+                for v in rng.sample(range(voitures["n"]), k):
+                    yield users["first_id"] + offset, voitures["first_id"] + v, self._db_datetime(self._when(rng, 365, 1.5))
+                produced += k
+                if produced >= n:
+                    return
+
+        self._insert(Favori, ("utilisateur", "voiture", "date_ajout"), rows())
+
+    def _avis(self, n: int, users: dict, voitures: dict) -> None:
+        rng = self._rng("avis")
+        mean = n / voitures["n"] if voitures["n"] else 0
+
+        def rows():
+            produced = 0
+            for v in range(voitures["n"]):
+                k = min(users["n"], n - produced, _geometric(rng, mean))
+                for offset in rng.sample(range(users["n"]), k):
+                    yield (
+                        voitures["first_id"] + v,
+                        users["first_id"] + offset,
+                        rng.choices(*NOTES)[0],
+                        rng.choice(COMMENTAIRES),
+                        self._db_datetime(self._when(rng, 700, 1.3)),
+                        rng.random() < 0.8,
+                    )
+                produced += k
+                if produced >= n:
+                    return
+
+        self._insert(Avis, ("voiture", "utilisateur", "note", "commentaire", "date_publication", "approuve"), rows())
+
+    def _messages(self, n: int, users: dict, voitures: dict) -> None:
+        rng = self._rng("messages")
+        if not voitures["n"]:
+            return
+        contenu = "Bonjour, je suis intéressé par votre annonce. Est-elle toujours disponible ?"
+
+        def rows():
+            for _ in range(n):
+                v = rng.randrange(voitures["n"])
+                vendeur_id = voitures["vendeurs"][v]
+                acheteur_id = users["first_id"] + rng.randrange(users["n"])
+                # Deux messages sur trois vont de l'acheteur vers le vendeur, le reste est une réponse.
+                if rng.random() < 0.67:
+                    expediteur, destinataire = acheteur_id, vendeur_id
+                else:
+                    expediteur, destinataire = vendeur_id, acheteur_id
+                yield (
+                    expediteur,
+                    destinataire,
+                    f"{rng.choice(SUJETS)} - annonce #{voitures['first_id'] + v}",
+                    contenu,
+                    self._db_datetime(self._when(rng, 365, 1.5)),
+                    rng.random() < 0.7,
+                )
+
+        self._insert(Message, ("expediteur", "destinataire", "sujet", "contenu", "date_envoi", "lu"), rows())
+
+    def _transactions(self, n: int, users: dict, voitures: dict) -> None:
+        rng = self._rng("transactions")
+        if not voitures["n"]:
+            return
+        vendues = [i for i, sold in enumerate(voitures["vendues"]) if sold]
+
+        def rows():
+            for t in range(n):
+                # D'abord une vente conclue par annonce vendue, puis des demandes en cours ou annulées.
+                if t < len(vendues):
+                    v, statut = vendues[t], rng.choices(*STATUTS_VENTE)[0]
+                else:
+                    v, statut = rng.randrange(voitures["n"]), rng.choices(*STATUTS_OUVERTS)[0]
+                date_transaction = self._when(rng, 700, 1.4)
+                yield (
+                    voitures["first_id"] + v,
+                    users["first_id"] + rng.randrange(users["n"]),
+                    voitures["vendeurs"][v],
+                    Decimal(int(voitures["prix"][v] * rng.uniform(0.9, 1.0) / 50) * 50),
+                    self._db_datetime(date_transaction),
+                    statut,
+                    self._db_datetime(date_transaction + timedelta(days=rng.randint(0, 10))),
+                )
+
+        columns = ("voiture", "acheteur", "vendeur", "prix_final", "date_transaction", "statut", "date_mise_a_jour")
+        self._insert(Transaction, columns, rows())
+
+    def _notifications(self, n: int, users: dict) -> None:
+        rng = self._rng("notifications")
+        titres = dict(Notification.TYPE_CHOICES)
+        # Les utilisateurs actifs (mêmes poids que les vendeurs) reçoivent l'essentiel des notifications.
+        offsets = rng.choices(range(users["n"]), cum_weights=users["vendeur_weights"], k=n) if users["n"] else []
+
+        def rows():
+            for offset in offsets:
+                type_ = rng.choices(*TYPES_NOTIFICATION)[0]
+                when = self._when(rng, 180, 2.0)
+                lu = (self.now - when).days > 7 or rng.random() < 0.3
+                yield users["first_id"] + offset, type_, titres[type_], self._db_datetime(when), lu
+
+        self._insert(Notification, ("utilisateur", "type", "titre", "date_creation", "lu"), rows())
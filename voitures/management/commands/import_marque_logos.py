@@ -1,14 +1,12 @@
 from __future__ import annotations
 
-import os
-import shutil
 import unicodedata
 from dataclasses import dataclass
 from pathlib import Path
 
-from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
 
+from voitures.importation import link_files
 from voitures.models import Marque
 
 
@@ -46,6 +44,12 @@ class Command(BaseCommand):
             action="store_true",
             help="Remplace un logo existant si déjà défini.",
         )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Nombre de processus qui copient les fichiers en parallèle (par défaut: 1).",
+        )
 
     def handle(self, *args, **options):
         source_dir = Path(options["source_dir"]).expanduser().resolve()
@@ -84,14 +88,11 @@ class Command(BaseCommand):
                 marque_by_key["mercedesbenz"] = m
         # Si la DB a "Citroën" ça matche déjà via normalisation.
 
-        media_root = Path(settings.MEDIA_ROOT)
-        dest_dir = media_root / "logos"
-        if not dry_run:
-            dest_dir.mkdir(parents=True, exist_ok=True)
-
         matched = 0
         skipped = 0
         missing = []
+        # Source -> marques qui recevront ce logo
+        planned: dict[Path, list[Marque]] = {}
 
         for c in sorted(candidates, key=lambda x: x.source.name.lower()):
             marque = marque_by_key.get(c.key)
@@ -104,19 +105,15 @@ class Command(BaseCommand):
                 self.stdout.write(self.style.WARNING(f"SKIP {marque.nom}: logo déjà défini"))
                 continue
 
-            safe_name = f"{_normalize_key(marque.nom)}{c.ext}"
-            dest_path = dest_dir / safe_name
-            relative = os.path.join("logos", safe_name)
-
-            self.stdout.write(f"SET  {marque.nom} <- {c.source.name}  =>  {relative}")
-
-            if not dry_run:
-                shutil.copy2(c.source, dest_path)
-                marque.logo.name = relative
-                marque.save(update_fields=["logo"])
+            self.stdout.write(f"SET  {marque.nom} <- {c.source.name}")
 
+            planned.setdefault(c.source, []).append(marque)
             matched += 1
 
+        copied = unchanged = 0
+        if not dry_run and planned:
+            copied, unchanged, _ = link_files(planned, "logo", options["workers"])
+
         if missing:
             self.stdout.write(self.style.WARNING("Fichiers non associés (aucune marque correspondante):"))
             for name in missing:
@@ -124,7 +121,7 @@ class Command(BaseCommand):
 
         self.stdout.write(
             self.style.SUCCESS(
-                f"Terminé. Liés: {matched}, ignorés: {skipped}, non associés: {len(missing)}"
+                f"Terminé. Liés: {matched}, copiés: {copied}, inchangés: {unchanged}, "
+                f"ignorés: {skipped}, non associés: {len(missing)}"
             )
         )
-
@@ -1,16 +1,15 @@
 from __future__ import annotations
 
 import os
-import shutil
 import unicodedata
 from dataclasses import dataclass
 from pathlib import Path
 
-from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
 
 from django.contrib.auth.models import User
 
+from voitures.importation import link_files
 from voitures.models import Marque, Modele, Voiture
 
 
@@ -53,6 +52,18 @@ class Command(BaseCommand):
             action="store_true",
             help="Crée une annonce de démo si aucune voiture ne correspond à l'image (ex: 'TESLA.jpg').",
         )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Nombre de processus qui copient les fichiers et génèrent leurs déclinaisons (par défaut: 1).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Nombre d'annonces mises à jour par requête (par défaut: 500).",
+        )
 
     def handle(self, *args, **options):
         source_dir = Path(options["source_dir"]).expanduser().resolve()
@@ -99,11 +110,6 @@ class Command(BaseCommand):
 
         marque_by_key = {_normalize_key(m.nom): m for m in Marque.objects.all()}
 
-        media_root = Path(settings.MEDIA_ROOT)
-        dest_dir = media_root / "voitures"
-        if not dry_run:
-            dest_dir.mkdir(parents=True, exist_ok=True)
-
         def should_skip(v: Voiture) -> bool:
             if overwrite:
                 return False
@@ -113,6 +119,8 @@ class Command(BaseCommand):
         linked = 0
         skipped = 0
         unmatched = []
+        # Source -> annonces qui recevront cette image
+        planned: dict[Path, list[Voiture]] = {}
 
         default_model_by_marque = {
             "citroen": "C3",
@@ -185,23 +193,17 @@ class Command(BaseCommand):
                     self.stdout.write(self.style.WARNING(f"SKIP voiture#{v.id}: image déjà définie"))
                     continue
 
-                marque_key = _normalize_key(v.modele.marque.nom)
-                modele_key = _normalize_key(v.modele.nom)
-                dest_name = f"{marque_key}_{modele_key}_{v.id}{img.ext}"
-                dest_path = dest_dir / dest_name
-                relative = os.path.join("voitures", dest_name)
-
-                self.stdout.write(
-                    f"SET  voiture#{v.id} ({v.modele.marque.nom} {v.modele.nom}) <- {img.source.name}  =>  {relative}"
-                )
-
-                if not dry_run:
-                    shutil.copy2(img.source, dest_path)
-                    v.image_principale.name = relative
-                    v.save(update_fields=["image_principale"])
+                self.stdout.write(f"SET  voiture#{v.id} ({v.modele.marque.nom} {v.modele.nom}) <- {img.source.name}")
 
+                planned.setdefault(img.source, []).append(v)
                 linked += 1
 
+        copied = unchanged = 0
+        if not dry_run and planned:
+            copied, unchanged, _ = link_files(
+                planned, "image_principale", options["workers"], options["batch_size"], width_field="image_largeur"
+            )
+
         if unmatched:
             self.stdout.write(self.style.WARNING("Fichiers non associés (aucune voiture correspondante):"))
             for name in unmatched:
@@ -209,6 +211,7 @@ class Command(BaseCommand):
 
         self.stdout.write(
             self.style.SUCCESS(
-                f"Terminé. Liés: {linked}, ignorés: {skipped}, non associés: {len(unmatched)}"
+                f"Terminé. Liés: {linked}, copiés: {copied}, inchangés: {unchanged}, "
+                f"ignorés: {skipped}, non associés: {len(unmatched)}"
             )
         )
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from voitures import taches
+
+
+class Command(BaseCommand):
+    help = "Exécute les tâches en arrière-plan (annonces similaires, alertes, déclinaisons d'images) stockées en base."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Traite les tâches disponibles puis s'arrête (utile en cron).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10,
+            help="Nombre de tâches réservées à chaque passage (par défaut: 10).",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=2.0,
+            help="Pause en secondes quand la file est vide (par défaut: 2).",
+        )
+        # Sur un hébergeur où le disque média n'est monté que sur le service web (render.yaml).
+        media = parser.add_mutually_exclusive_group()
+        media.add_argument(
+            "--sans-media",
+            action="store_true",
+            help="Laisse les tâches qui ont besoin des fichiers médias (déclinaisons d'images) à un autre worker.",
+        )
+        media.add_argument(
+            "--media-seulement",
+            action="store_true",
+            help="Ne traite que les tâches qui ont besoin des fichiers médias ; pas de purge.",
+        )
+
+    def handle(self, *args, **options):
+        once: bool = options["once"]
+        batch_size: int = options["batch_size"]
+        sleep: float = options["sleep"]
+        media = True if options["media_seulement"] else False if options["sans_media"] else None
+
+        total = 0
+        purge_interval = getattr(settings, "TACHES_PURGE_INTERVALLE", 3600)
+        next_purge = time.monotonic()
+        self.stdout.write(self.style.SUCCESS("Worker démarré."))
+        try:
+            while True:
+                if media is not True and time.monotonic() >= next_purge:
+                    purged = taches.purge()
+                    if purged:
+                        self.stdout.write(f"{purged} ancienne(s) tâche(s) purgée(s).")
+                    next_purge = time.monotonic() + purge_interval
+                processed = taches.run_pending(batch_size, media)
+                total += processed
+                if processed:
+                    continue
+                if once:
+                    break
+                time.sleep(sleep)
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING("Arrêt demandé."))
+
+        self.stdout.write(self.style.SUCCESS(f"Terminé. Tâches traitées: {total}"))
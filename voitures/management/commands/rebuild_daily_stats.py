@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from voitures import caches, statistiques
+
+
+class Command(BaseCommand):
+    help = (
+        "Réconciliation des statistiques quotidiennes du dashboard : recalcule les derniers jours "
+        "depuis les annonces, transactions et utilisateurs (à lancer chaque nuit)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--jours",
+            type=int,
+            default=3,
+            help="Nombre de jours recalculés, aujourd'hui compris (par défaut: 3).",
+        )
+        parser.add_argument(
+            "--tout",
+            action="store_true",
+            help="Recalcule tout l'historique (première mise en place, après un import en masse).",
+        )
+
+    def handle(self, *args, **options):
+        if options["tout"]:
+            start = None
+            label = "tout l'historique"
+        else:
+            if options["jours"] < 1:
+                raise CommandError("--jours doit être positif.")
+            start = timezone.localdate() - timedelta(days=options["jours"] - 1)
+            label = f"depuis le {start:%d/%m/%Y}"
+
+        corrected = statistiques.rebuild(start)
+        caches.invalidate("transactions")
+        self.stdout.write(self.style.SUCCESS(f"Statistiques recalculées ({label}) : {corrected} jour(s) corrigé(s)."))
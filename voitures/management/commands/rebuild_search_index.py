@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from voitures import recherche
+from voitures.models import DocumentRecherche, Voiture
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index de recherche plein texte des annonces (après un import en masse par exemple)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Nombre d'annonces indexées par requête (par défaut: 1000).",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Moteur de recherche: {recherche.backend()}")
+        orphans, _ = DocumentRecherche.objects.exclude(voiture__in=Voiture.objects.all()).delete()
+        total = recherche.reindex(Voiture.objects.order_by("id"), batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Terminé. Annonces indexées: {total}, documents orphelins supprimés: {orphans}"))
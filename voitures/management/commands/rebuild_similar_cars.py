@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from voitures import similaires
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcule les annonces similaires de toutes les annonces en vente (mise en place, après un "
+        "import en masse ou un changement des pondérations). Le worker tient ensuite la table à jour."
+    )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        count = similaires.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f"Annonces similaires recalculées : {count} annonce(s) en {time.perf_counter() - start:.1f}s.")
+        )
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:32
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('voitures', '0005_tache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LectureDiffusion',
+            fields=[
+                ('utilisateur', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='lecture_diffusions', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('derniere_lue', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Lecture des diffusions',
+                'verbose_name_plural': 'Lectures des diffusions',
+            },
+        ),
+        migrations.CreateModel(
+            name='NotificationDiffusion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[('new_listing', 'Nouvelle annonce'), ('purchase_request', "Demande d'achat"), ('sale_confirmed', 'Vente confirmée'), ('message', 'Message')], max_length=30)),
+                ('titre', models.CharField(max_length=200)),
+                ('contenu', models.TextField(blank=True)),
+                ('url', models.CharField(blank=True, max_length=300)),
+                ('date_creation', models.DateTimeField(auto_now_add=True)),
+                ('emetteur', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='diffusions_emises', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Notification diffusée',
+                'verbose_name_plural': 'Notifications diffusées',
+                'ordering': ['-date_creation'],
+            },
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voitures', '0006_notification_diffusion'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='avis',
+            index=models.Index(condition=models.Q(('approuve', True)), fields=['voiture', 'date_publication'], name='avis_approuve_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['destinataire', 'date_envoi'], name='message_dest_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['expediteur', 'date_envoi'], name='message_exp_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(condition=models.Q(('lu', False)), fields=['destinataire'], name='message_non_lu_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['utilisateur', 'date_creation'], name='notification_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('lu', False)), fields=['utilisateur'], name='notification_non_lue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationdiffusion',
+            index=models.Index(fields=['date_creation'], name='diffusion_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['date_transaction'], name='transaction_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['statut', 'date_transaction'], name='transaction_statut_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voiture',
+            index=models.Index(condition=models.Q(('est_vendue', False)), fields=['date_ajout', 'id'], name='voiture_dispo_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voiture',
+            index=models.Index(condition=models.Q(('est_vendue', False)), fields=['prix', 'id'], name='voiture_dispo_prix_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voiture',
+            index=models.Index(condition=models.Q(('est_vendue', False)), fields=['annee', 'id'], name='voiture_dispo_annee_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voiture',
+            index=models.Index(condition=models.Q(('est_vendue', False)), fields=['kilometrage', 'id'], name='voiture_dispo_km_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voiture',
+            index=models.Index(fields=['vendeur', 'date_ajout'], name='voiture_vendeur_date_idx'),
+        ),
+    ]
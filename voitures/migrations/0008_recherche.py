@@ -0,0 +1,131 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:36
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE voitures_recherche_fts USING fts5(
+        titre, corps,
+        content='voitures_documentrecherche', content_rowid='voiture_id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER voitures_recherche_ai AFTER INSERT ON voitures_documentrecherche BEGIN
+        INSERT INTO voitures_recherche_fts(rowid, titre, corps) VALUES (new.voiture_id, new.titre, new.corps);
+    END
+    """,
+    """
+    CREATE TRIGGER voitures_recherche_ad AFTER DELETE ON voitures_documentrecherche BEGIN
+        INSERT INTO voitures_recherche_fts(voitures_recherche_fts, rowid, titre, corps)
+        VALUES ('delete', old.voiture_id, old.titre, old.corps);
+    END
+    """,
+    """
+    CREATE TRIGGER voitures_recherche_au AFTER UPDATE ON voitures_documentrecherche BEGIN
+        INSERT INTO voitures_recherche_fts(voitures_recherche_fts, rowid, titre, corps)
+        VALUES ('delete', old.voiture_id, old.titre, old.corps);
+        INSERT INTO voitures_recherche_fts(rowid, titre, corps) VALUES (new.voiture_id, new.titre, new.corps);
+    END
+    """,
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS voitures_recherche_au",
+    "DROP TRIGGER IF EXISTS voitures_recherche_ad",
+    "DROP TRIGGER IF EXISTS voitures_recherche_ai",
+    "DROP TABLE IF EXISTS voitures_recherche_fts",
+]
+
+POSTGRESQL_FORWARD = [
+    """
+    ALTER TABLE voitures_documentrecherche ADD COLUMN vecteur tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', titre), 'A') || setweight(to_tsvector('simple', corps), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX voitures_recherche_gin ON voitures_documentrecherche USING GIN (vecteur)",
+]
+
+POSTGRESQL_BACKWARD = [
+    "DROP INDEX IF EXISTS voitures_recherche_gin",
+    "ALTER TABLE voitures_documentrecherche DROP COLUMN IF EXISTS vecteur",
+]
+
+
+def _run(schema_editor, statements):
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        _run(schema_editor, POSTGRESQL_FORWARD)
+    elif vendor == "sqlite":
+        try:
+            _run(schema_editor, SQLITE_FORWARD[:1])
+        except Exception:
+            # SQLite compilé sans FTS5 : voitures.recherche se rabat sur LIKE.
+            return
+        _run(schema_editor, SQLITE_FORWARD[1:])
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        _run(schema_editor, POSTGRESQL_BACKWARD)
+    elif vendor == "sqlite":
+        _run(schema_editor, SQLITE_BACKWARD)
+
+
+def _normalize(value):
+    value = unicodedata.normalize("NFKD", value or "")
+    value = "".join(ch for ch in value if not unicodedata.combining(ch)).lower()
+    return " ".join(re.findall(r"\w+", value))
+
+
+def backfill_documents(apps, schema_editor):
+    Voiture = apps.get_model("voitures", "Voiture")
+    DocumentRecherche = apps.get_model("voitures", "DocumentRecherche")
+    batch = []
+    for voiture in Voiture.objects.select_related("modele__marque").iterator(chunk_size=1000):
+        batch.append(
+            DocumentRecherche(
+                voiture_id=voiture.id,
+                titre=_normalize(f"{voiture.modele.marque.nom} {voiture.modele.nom}"),
+                corps=_normalize(voiture.description),
+            )
+        )
+        if len(batch) >= 1000:
+            DocumentRecherche.objects.bulk_create(batch)
+            batch = []
+    DocumentRecherche.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voitures', '0007_index_catalogue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentRecherche',
+            fields=[
+                ('voiture', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='document_recherche', serialize=False, to='voitures.voiture')),
+                ('titre', models.TextField(blank=True)),
+                ('corps', models.TextField(blank=True)),
+            ],
+            options={
+                'verbose_name': 'Document de recherche',
+                'verbose_name_plural': 'Documents de recherche',
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(backfill_documents, migrations.RunPython.noop),
+    ]
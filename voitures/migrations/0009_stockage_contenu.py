@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:43
+
+from django.db import migrations, models
+import django.utils.timezone
+import voitures.stockage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voitures', '0008_recherche'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='imagevoiture',
+            name='image',
+            field=models.ImageField(storage=voitures.stockage.blob_storage, upload_to='voitures/details/'),
+        ),
+        migrations.AlterField(
+            model_name='marque',
+            name='logo',
+            field=models.ImageField(blank=True, null=True, storage=voitures.stockage.blob_storage, upload_to='logos/'),
+        ),
+        migrations.AlterField(
+            model_name='voiture',
+            name='image_principale',
+            field=models.ImageField(blank=True, default='voitures/default.jpg', storage=voitures.stockage.blob_storage, upload_to='voitures/'),
+        ),
+        migrations.CreateModel(
+            name='FichierMedia',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('nom', models.CharField(max_length=255, unique=True)),
+                ('taille', models.PositiveBigIntegerField(default=0)),
+                ('references', models.PositiveIntegerField(default=0)),
+                ('date_creation', models.DateTimeField(auto_now_add=True)),
+                ('date_maj', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Fichier média',
+                'verbose_name_plural': 'Fichiers médias',
+                'indexes': [models.Index(condition=models.Q(('references', 0)), fields=['date_maj'], name='fichier_orphelin_idx')],
+            },
+        ),
+    ]
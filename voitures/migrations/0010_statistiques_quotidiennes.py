@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-17 13:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voitures', '0009_stockage_contenu'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatistiqueJour',
+            fields=[
+                ('jour', models.DateField(primary_key=True, serialize=False)),
+                ('annonces_creees', models.IntegerField(default=0)),
+                ('annonces_vendues', models.IntegerField(default=0)),
+                ('annonces_reservees', models.IntegerField(default=0)),
+                ('transactions_en_attente', models.IntegerField(default=0)),
+                ('transactions_confirmees', models.IntegerField(default=0)),
+                ('transactions_annulees', models.IntegerField(default=0)),
+                ('transactions_terminees', models.IntegerField(default=0)),
+                ('chiffre_affaires', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('nouveaux_utilisateurs', models.IntegerField(default=0)),
+                ('vues', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Statistique du jour',
+                'verbose_name_plural': 'Statistiques quotidiennes',
+                'ordering': ['-jour'],
+            },
+        ),
+    ]
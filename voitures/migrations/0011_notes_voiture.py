@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-17 13:04
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, DecimalField, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Coalesce
+
+
+def backfill_notes(apps, schema_editor):
+    # Même calcul que voitures.notes.refresh, sur les modèles historiques.
+    Avis = apps.get_model('voitures', 'Avis')
+    Voiture = apps.get_model('voitures', 'Voiture')
+    approuves = Avis.objects.filter(voiture=OuterRef('pk'), approuve=True).order_by().values('voiture')
+    Voiture.objects.filter(avis__approuve=True).distinct().update(
+        nombre_avis=Coalesce(
+            Subquery(approuves.annotate(n=Count('id')).values('n'), output_field=IntegerField()), Value(0)
+        ),
+        note_moyenne=Subquery(
+            approuves.annotate(m=Cast(Avg('note'), DecimalField(max_digits=3, decimal_places=2))).values('m')
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voitures', '0010_statistiques_quotidiennes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='voiture',
+            name='nombre_avis',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='voiture',
+            name='note_moyenne',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=3, null=True),
+        ),
+        migrations.RunPython(backfill_notes, migrations.RunPython.noop),
+    ]
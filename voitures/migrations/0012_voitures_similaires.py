@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-17 13:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voitures', '0011_notes_voiture'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VoitureSimilaire',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rang', models.PositiveSmallIntegerField()),
+                ('distance', models.FloatField()),
+                ('similaire', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='voisine_de', to='voitures.voiture')),
+                ('voiture', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similaires', to='voitures.voiture')),
+            ],
+            options={
+                'verbose_name': 'Voiture similaire',
+                'verbose_name_plural': 'Voitures similaires',
+                'ordering': ['voiture', 'rang'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='voituresimilaire',
+            constraint=models.UniqueConstraint(fields=('voiture', 'rang'), name='voiture_similaire_rang_uniq'),
+        ),
+    ]
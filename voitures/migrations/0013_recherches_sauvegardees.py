@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-17 13:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('voitures', '0012_voitures_similaires'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='type',
+            field=models.CharField(choices=[('new_listing', 'Nouvelle annonce'), ('saved_search', 'Recherche sauvegardée'), ('purchase_request', "Demande d'achat"), ('sale_confirmed', 'Vente confirmée'), ('message', 'Message')], max_length=30),
+        ),
+        migrations.AlterField(
+            model_name='notificationdiffusion',
+            name='type',
+            field=models.CharField(choices=[('new_listing', 'Nouvelle annonce'), ('saved_search', 'Recherche sauvegardée'), ('purchase_request', "Demande d'achat"), ('sale_confirmed', 'Vente confirmée'), ('message', 'Message')], max_length=30),
+        ),
+        migrations.CreateModel(
+            name='RechercheSauvegardee',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nom', models.CharField(max_length=100)),
+                ('filtres', models.JSONField(default=dict)),
+                ('date_creation', models.DateTimeField(auto_now_add=True)),
+                ('utilisateur', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recherches', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Recherche sauvegardée',
+                'verbose_name_plural': 'Recherches sauvegardées',
+                'ordering': ['-date_creation'],
+                'indexes': [models.Index(fields=['utilisateur', 'date_creation'], name='recherche_user_date_idx')],
+            },
+        ),
+    ]
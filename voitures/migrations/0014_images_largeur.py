@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-17 13:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voitures', '0013_recherches_sauvegardees'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imagevoiture',
+            name='image_largeur',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='voiture',
+            name='image_largeur',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-17 13:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voitures', '0014_images_largeur'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentRechercheFTS',
+            fields=[
+                ('voiture', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='document_fts', serialize=False, to='voitures.voiture')),
+            ],
+            options={
+                'db_table': 'voitures_recherche_fts',
+                'managed': False,
+            },
+        ),
+    ]
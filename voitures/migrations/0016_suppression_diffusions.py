@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-17 13:56
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voitures', '0015_recherche_fts_jointure'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='notificationdiffusion',
+            name='emetteur',
+        ),
+        migrations.DeleteModel(
+            name='LectureDiffusion',
+        ),
+        migrations.DeleteModel(
+            name='NotificationDiffusion',
+        ),
+    ]
@@ -4,10 +4,12 @@ from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 import os
 
+from voitures.stockage import blob_storage
+
 class Marque(models.Model):
     nom = models.CharField(max_length=100, unique=True)
     pays = models.CharField(max_length=100)
-    logo = models.ImageField(upload_to='logos/', blank=True, null=True)
+    logo = models.ImageField(upload_to='logos/', storage=blob_storage, blank=True, null=True)
     date_creation = models.DateField()
     description = models.TextField(blank=True)
     
@@ -100,14 +102,28 @@ class Voiture(models.Model):
     est_vendue = models.BooleanField(default=False)
     est_reservee = models.BooleanField(default=False)
     image_principale = models.ImageField(
-        upload_to='voitures/', 
+        upload_to='voitures/',
+        storage=blob_storage,
         default='voitures/default.jpg',
         blank=True
     )
+    # Largeur (px) de l'image, renseignée par voitures.images quand ses déclinaisons sont écrites
+    image_largeur = models.PositiveIntegerField(null=True, blank=True, editable=False)
     vue = models.PositiveIntegerField(default=0)
+    # Avis approuvés, dénormalisés (voitures.notes) pour les cartes et la page de détail
+    note_moyenne = models.DecimalField(max_digits=3, decimal_places=2, null=True, blank=True, editable=False)
+    nombre_avis = models.PositiveIntegerField(default=0, editable=False)
     
     class Meta:
         ordering = ['-date_ajout']
+        # Index partiels sur les annonces en vente : un (champ de tri, id) par tri de la liste.
+        indexes = [
+            models.Index(fields=['date_ajout', 'id'], name='voiture_dispo_date_idx', condition=models.Q(est_vendue=False)),
+            models.Index(fields=['prix', 'id'], name='voiture_dispo_prix_idx', condition=models.Q(est_vendue=False)),
+            models.Index(fields=['annee', 'id'], name='voiture_dispo_annee_idx', condition=models.Q(est_vendue=False)),
+            models.Index(fields=['kilometrage', 'id'], name='voiture_dispo_km_idx', condition=models.Q(est_vendue=False)),
+            models.Index(fields=['vendeur', 'date_ajout'], name='voiture_vendeur_date_idx'),
+        ]
         verbose_name = 'Voiture'
         verbose_name_plural = 'Voitures'
     
@@ -115,8 +131,8 @@ class Voiture(models.Model):
         return f"{self.modele} - {self.annee} - {self.couleur}"
     
     def incrementer_vue(self):
+        Voiture.objects.filter(pk=self.pk).update(vue=models.F('vue') + 1)
         self.vue += 1
-        self.save(update_fields=['vue'])
     
     def prix_format(self):
         if self.prix is None:
@@ -146,9 +162,47 @@ class Voiture(models.Model):
         from django.urls import reverse
         return reverse('detail_voiture', args=[str(self.id)])
 
+class DocumentRecherche(models.Model):
+    """
+    Texte indexé d'une annonce, normalisé (minuscules, sans accents).
+    Indexé par un tsvector + GIN sous PostgreSQL et par une table FTS5 sous SQLite
+    (voir la migration 0008 et voitures.recherche).
+    """
+
+    voiture = models.OneToOneField(
+        Voiture, on_delete=models.CASCADE, primary_key=True, related_name='document_recherche'
+    )
+    titre = models.TextField(blank=True)
+    corps = models.TextField(blank=True)
+
+    class Meta:
+        verbose_name = 'Document de recherche'
+        verbose_name_plural = 'Documents de recherche'
+
+    def __str__(self):
+        return self.titre
+
+class DocumentRechercheFTS(models.Model):
+    """
+    Table FTS5 de la migration 0008 (SQLite seulement), déclarée pour que l'ORM puisse la
+    joindre (rowid = id de la voiture) : MATCH et bm25 sont alors évalués une seule fois par
+    requête, voir voitures.recherche.search.
+    """
+
+    voiture = models.OneToOneField(
+        Voiture, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid',
+        db_constraint=False, related_name='document_fts',
+    )
+
+    class Meta:
+        managed = False
+        db_table = 'voitures_recherche_fts'
+
 class ImageVoiture(models.Model):
     voiture = models.ForeignKey(Voiture, on_delete=models.CASCADE, related_name='images')
-    image = models.ImageField(upload_to='voitures/details/')
+    image = models.ImageField(upload_to='voitures/details/', storage=blob_storage)
+    # Largeur (px) de l'image, renseignée par voitures.images quand ses déclinaisons sont écrites
+    image_largeur = models.PositiveIntegerField(null=True, blank=True, editable=False)
     description = models.CharField(max_length=200, blank=True)
     ordre = models.PositiveIntegerField(default=0)
     
@@ -187,6 +241,9 @@ class Avis(models.Model):
     class Meta:
         ordering = ['-date_publication']
         unique_together = ['voiture', 'utilisateur']
+        indexes = [
+            models.Index(fields=['voiture', 'date_publication'], name='avis_approuve_idx', condition=models.Q(approuve=True)),
+        ]
         verbose_name = 'Avis'
         verbose_name_plural = 'Avis'
     
@@ -212,6 +269,10 @@ class Transaction(models.Model):
     
     class Meta:
         ordering = ['-date_transaction']
+        indexes = [
+            models.Index(fields=['date_transaction'], name='transaction_date_idx'),
+            models.Index(fields=['statut', 'date_transaction'], name='transaction_statut_date_idx'),
+        ]
         verbose_name = 'Transaction'
         verbose_name_plural = 'Transactions'
     
@@ -246,6 +307,11 @@ class Message(models.Model):
     
     class Meta:
         ordering = ['-date_envoi']
+        indexes = [
+            models.Index(fields=['destinataire', 'date_envoi'], name='message_dest_date_idx'),
+            models.Index(fields=['expediteur', 'date_envoi'], name='message_exp_date_idx'),
+            models.Index(fields=['destinataire'], name='message_non_lu_idx', condition=models.Q(lu=False)),
+        ]
         verbose_name = 'Message'
         verbose_name_plural = 'Messages'
     
@@ -260,6 +326,7 @@ class Message(models.Model):
 class Notification(models.Model):
     TYPE_CHOICES = [
         ("new_listing", "Nouvelle annonce"),
+        ("saved_search", "Recherche sauvegardée"),
         ("purchase_request", "Demande d'achat"),
         ("sale_confirmed", "Vente confirmée"),
         ("message", "Message"),
@@ -275,8 +342,144 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ["-date_creation"]
+        indexes = [
+            models.Index(fields=["utilisateur", "date_creation"], name="notification_user_date_idx"),
+            models.Index(fields=["utilisateur"], name="notification_non_lue_idx", condition=models.Q(lu=False)),
+        ]
         verbose_name = "Notification"
         verbose_name_plural = "Notifications"
 
     def __str__(self):
         return f"{self.utilisateur.username}: {self.titre}"
+
+
+class Tache(models.Model):
+    STATUT_CHOICES = [
+        ("en_attente", "En attente"),
+        ("en_cours", "En cours"),
+        ("terminee", "Terminée"),
+        ("echouee", "Échouée"),
+    ]
+
+    type = models.CharField(max_length=50)
+    donnees = models.JSONField(default=dict, blank=True)
+    statut = models.CharField(max_length=20, choices=STATUT_CHOICES, default="en_attente")
+    tentatives = models.PositiveIntegerField(default=0)
+    max_tentatives = models.PositiveIntegerField(default=5)
+    disponible_a = models.DateTimeField(default=timezone.now)
+    derniere_erreur = models.TextField(blank=True)
+    date_creation = models.DateTimeField(auto_now_add=True)
+    date_mise_a_jour = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["disponible_a", "id"]
+        indexes = [models.Index(fields=["statut", "disponible_a"], name="tache_statut_dispo_idx")]
+        verbose_name = "Tâche"
+        verbose_name_plural = "Tâches"
+
+    def __str__(self):
+        return f"Tâche #{self.id} ({self.type}) - {self.statut}"
+
+
+class FichierMedia(models.Model):
+    """
+    Contenu d'une image dans le stockage par contenu (voitures.stockage), stocké une seule fois.
+    `references` compte les champs image qui pointent vers ce contenu.
+    """
+
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    nom = models.CharField(max_length=255, unique=True)
+    taille = models.PositiveBigIntegerField(default=0)
+    references = models.PositiveIntegerField(default=0)
+    date_creation = models.DateTimeField(auto_now_add=True)
+    date_maj = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["date_maj"], name="fichier_orphelin_idx", condition=models.Q(references=0)),
+        ]
+        verbose_name = "Fichier média"
+        verbose_name_plural = "Fichiers médias"
+
+    def __str__(self):
+        return f"{self.nom} ({self.references} réf.)"
+
+
+class StatistiqueJour(models.Model):
+    """
+    Agrégats d'une journée pour le dashboard (voitures.statistiques), tenus à jour par les
+    signaux et recalculés chaque nuit par `python manage.py rebuild_daily_stats`.
+    """
+
+    jour = models.DateField(primary_key=True)
+    annonces_creees = models.IntegerField(default=0)
+    # Ventes confirmées ce jour-là / demandes d'achat (qui réservent l'annonce) faites ce jour-là
+    annonces_vendues = models.IntegerField(default=0)
+    annonces_reservees = models.IntegerField(default=0)
+    # Transactions créées ce jour-là, par statut actuel
+    transactions_en_attente = models.IntegerField(default=0)
+    transactions_confirmees = models.IntegerField(default=0)
+    transactions_annulees = models.IntegerField(default=0)
+    transactions_terminees = models.IntegerField(default=0)
+    # Prix des transactions créées ce jour-là et confirmées ou terminées
+    chiffre_affaires = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    nouveaux_utilisateurs = models.IntegerField(default=0)
+    vues = models.BigIntegerField(default=0)
+
+    class Meta:
+        ordering = ["-jour"]
+        verbose_name = "Statistique du jour"
+        verbose_name_plural = "Statistiques quotidiennes"
+
+    def __str__(self):
+        return f"Statistiques du {self.jour:%d/%m/%Y}"
+
+
+class VoitureSimilaire(models.Model):
+    """
+    Annonces les plus proches d'une annonce en vente (voitures.similaires), précalculées :
+    `rang` 0 est la plus proche. Tenu à jour par le worker à chaque modification d'annonce.
+    """
+
+    voiture = models.ForeignKey(Voiture, on_delete=models.CASCADE, related_name='similaires')
+    similaire = models.ForeignKey(Voiture, on_delete=models.CASCADE, related_name='voisine_de')
+    rang = models.PositiveSmallIntegerField()
+    distance = models.FloatField()
+
+    class Meta:
+        ordering = ['voiture', 'rang']
+        constraints = [
+            models.UniqueConstraint(fields=['voiture', 'rang'], name='voiture_similaire_rang_uniq'),
+        ]
+        verbose_name = 'Voiture similaire'
+        verbose_name_plural = 'Voitures similaires'
+
+    def __str__(self):
+        return f"{self.voiture_id} -> {self.similaire_id} (#{self.rang})"
+
+
+class RechercheSauvegardee(models.Model):
+    """
+    Filtres de la liste des voitures enregistrés par un utilisateur : il est notifié des
+    nouvelles annonces qui y correspondent (voitures.alertes).
+    """
+
+    utilisateur = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recherches')
+    nom = models.CharField(max_length=100)
+    # Filtres nettoyés (catalogue.clean_filters), valeurs en texte comme dans l'URL
+    filtres = models.JSONField(default=dict)
+    date_creation = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-date_creation']
+        indexes = [models.Index(fields=['utilisateur', 'date_creation'], name='recherche_user_date_idx')]
+        verbose_name = 'Recherche sauvegardée'
+        verbose_name_plural = 'Recherches sauvegardées'
+
+    def __str__(self):
+        return f"{self.nom} ({self.utilisateur.username})"
+
+    def get_absolute_url(self):
+        from urllib.parse import urlencode
+        from django.urls import reverse
+        return f"{reverse('liste_voitures')}?{urlencode(self.filtres)}"
@@ -0,0 +1,30 @@
+"""
+Note moyenne et nombre d'avis approuvés, dénormalisés sur Voiture.
+
+À appeler dans la même transaction que toute modification d'avis qui change l'ensemble des
+avis approuvés d'une annonce (dépôt, approbation, désapprobation, suppression).
+"""
+from __future__ import annotations
+
+from typing import Iterable
+
+from django.db.models import Avg, Count, DecimalField, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Coalesce
+
+from voitures.models import Avis, Voiture
+
+
+def refresh(voiture_ids: Iterable[int] | None = None) -> int:
+    """Recalcule les agrégats des annonces données (toutes si None) en un seul UPDATE."""
+    approuves = Avis.objects.filter(voiture=OuterRef("pk"), approuve=True).order_by().values("voiture")
+    queryset = Voiture.objects.all()
+    if voiture_ids is not None:
+        queryset = queryset.filter(pk__in=set(voiture_ids))
+    return queryset.update(
+        nombre_avis=Coalesce(
+            Subquery(approuves.annotate(n=Count("id")).values("n"), output_field=IntegerField()), Value(0)
+        ),
+        note_moyenne=Subquery(
+            approuves.annotate(m=Cast(Avg("note"), DecimalField(max_digits=3, decimal_places=2))).values("m")
+        ),
+    )
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from django.conf import settings
+from django.core.cache import cache
+
+from voitures.models import Notification
+
+UNREAD_KEY = "notifications:non_lues:{}"
+
+
+def _cache_timeout() -> int:
+    return getattr(settings, "NOTIFICATIONS_CACHE_TIMEOUT", 300)
+
+
+def invalidate_unread(user_ids) -> None:
+    """A appeler après la création de notifications personnelles."""
+    cache.delete_many([UNREAD_KEY.format(user_id) for user_id in user_ids])
+
+
+def recent_notifications(user, limit: int) -> list:
+    """Notifications de l'utilisateur, les plus récentes d'abord."""
+    return list(Notification.objects.filter(utilisateur=user).order_by("-date_creation")[:limit])
+
+
+def unread_count(user) -> int:
+    """Nombre de notifications non lues, servi depuis le cache si possible."""
+    key = UNREAD_KEY.format(user.id)
+    count = cache.get(key)
+    if count is None:
+        count = Notification.objects.filter(utilisateur=user, lu=False).count()
+        cache.set(key, count, _cache_timeout())
+    return count
+
+
+def mark_all_read(user, shown) -> None:
+    """
+    Marque comme lues les notifications affichées (`shown`, résultat de recent_notifications).
+    Une notification créée après leur lecture en base reste non lue : seuls les ids affichés
+    comptent, jamais le maximum en base au moment du marquage.
+    """
+    if shown:
+        Notification.objects.filter(utilisateur=user, lu=False, id__lte=max(n.id for n in shown)).update(lu=True)
+    invalidate_unread([user.id])
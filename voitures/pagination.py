@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+# Tri -> (champ, décroissant). L'id sert de départage pour que l'ordre soit total.
+SORTS = {
+    "": ("date_ajout", True),
+    "prix_asc": ("prix", False),
+    "prix_desc": ("prix", True),
+    "annee_desc": ("annee", True),
+    "km_asc": ("kilometrage", False),
+}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(value, pk, direction: str) -> str:
+    raw = json.dumps({"v": str(value), "id": pk, "d": direction}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, int, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if data["d"] not in {"n", "p"}:
+            raise ValueError(data["d"])
+        return data["v"], int(data["id"]), data["d"]
+    except (ValueError, KeyError, TypeError) as exc:
+        raise InvalidCursor(cursor) from exc
+
+
+class KeysetPage:
+    def __init__(self, object_list, *, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+    def has_other_pages(self) -> bool:
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Pagination par curseur (WHERE (champ, id) > (v, id) ORDER BY champ, id LIMIT n) :
+    le coût d'une page ne dépend pas de sa profondeur et aucun COUNT(*) n'est nécessaire.
+    """
+
+    def __init__(self, queryset, field: str, descending: bool, per_page: int):
+        self.queryset = queryset
+        self.field = field
+        self.descending = descending
+        self.per_page = per_page
+
+    def _after(self, value, pk, descending: bool) -> Q:
+        op = "lt" if descending else "gt"
+        return Q(**{f"{self.field}__{op}": value}) | Q(**{self.field: value, f"id__{op}": pk})
+
+    def _ordering(self, descending: bool) -> list[str]:
+        prefix = "-" if descending else ""
+        return [f"{prefix}{self.field}", f"{prefix}id"]
+
+    def _to_python(self, raw_value):
+        # Le champ de tri peut être une annotation (ex: la pertinence d'une recherche).
+        annotation = self.queryset.query.annotations.get(self.field)
+        if annotation is not None:
+            return annotation.output_field.to_python(raw_value)
+        return self.queryset.model._meta.get_field(self.field).to_python(raw_value)
+
+    def get_page(self, cursor: str | None) -> KeysetPage:
+        direction = "n"
+        qs = self.queryset
+        if cursor:
+            try:
+                raw_value, pk, direction = decode_cursor(cursor)
+                value = self._to_python(raw_value)
+            except (InvalidCursor, ValidationError):
+                cursor, direction = None, "n"
+            else:
+                # En arrière : on parcourt l'ordre inverse puis on retourne la page.
+                descending = self.descending if direction == "n" else not self.descending
+                qs = qs.filter(self._after(value, pk, descending))
+
+        descending = self.descending if direction == "n" else not self.descending
+        rows = list(qs.order_by(*self._ordering(descending))[: self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if direction == "p":
+            rows.reverse()
+
+        if not rows:
+            return KeysetPage(rows)
+        first, last = rows[0], rows[-1]
+        has_next = has_more if direction == "n" else True
+        has_previous = bool(cursor) if direction == "n" else has_more
+        return KeysetPage(
+            rows,
+            next_cursor=encode_cursor(getattr(last, self.field), last.pk, "n") if has_next else None,
+            previous_cursor=encode_cursor(getattr(first, self.field), first.pk, "p") if has_previous else None,
+        )
@@ -0,0 +1,342 @@
+"""
+Profilage à la demande des requêtes HTTP (PROFILAGE_ACTIF, désactivé par défaut).
+
+Une requête est profilée si :
+- elle porte l'en-tête `X-Profilage` et vient d'un membre du staff (ou porte PROFILAGE_JETON) ;
+- la session d'un membre du staff a activé le profilage (page /dashboard/profils/) ;
+- elle est tirée au sort (PROFILAGE_ECHANTILLON, proportion entre 0 et 1).
+
+Chaque capture est écrite dans PROFILAGE_DOSSIER :
+- `<id>.json` : résumé (durée, temps SQL, temps de rendu des gabarits, chronologie SQL) ;
+- `<id>.speedscope.json` : pile Python échantillonnée + chronologie gabarits/SQL (speedscope.app) ;
+- `<id>.folded` : piles repliées pour flamegraph.pl ;
+- `<id>.pstats` en mode "cprofile" (snakeviz, pstats) à la place de l'échantillonnage.
+"""
+from __future__ import annotations
+
+import cProfile
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.template.base import Template
+from django.utils import timezone
+
+from voitures.requetes import QueryRecorder, query_shape
+
+logger = logging.getLogger(__name__)
+
+HEADER = "X-Profilage"
+SESSION_KEY = "profilage"
+CAPTURE_NAME = re.compile(r"^[0-9]{8}T[0-9]{6}-[0-9a-f]{8}$")
+EXTENSIONS = {
+    "speedscope": ".speedscope.json",
+    "folded": ".folded",
+    "pstats": ".pstats",
+}
+
+_local = threading.local()
+_template_patch_lock = threading.Lock()
+
+
+def profile_dir() -> Path:
+    return Path(getattr(settings, "PROFILAGE_DOSSIER", Path(settings.BASE_DIR) / "profils"))
+
+
+# ------------------------------------------------------------------ collecte
+
+
+class Sampler(threading.Thread):
+    """Relève la pile Python d'un thread toutes les `interval` secondes."""
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(daemon=True, name="profilage-sampler")
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: list[tuple[float, tuple[tuple[str, str, int], ...]]] = []
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            self.samples.append((time.perf_counter(), tuple(reversed(stack))))
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+@dataclass
+class Capture:
+    start: float = field(default_factory=time.perf_counter)
+    # (nom du gabarit, début, durée, profondeur d'imbrication)
+    templates: list[tuple[str, float, float, int]] = field(default_factory=list)
+    depth: int = 0
+
+
+def _timed_render(render):
+    def wrapper(self, context):
+        capture = getattr(_local, "capture", None)
+        if capture is None:
+            return render(self, context)
+        start = time.perf_counter()
+        capture.depth += 1
+        try:
+            return render(self, context)
+        finally:
+            capture.depth -= 1
+            capture.templates.append((self.name or "<chaîne>", start, time.perf_counter() - start, capture.depth))
+
+    wrapper._profilage = True
+    return wrapper
+
+
+def _install_template_timer():
+    with _template_patch_lock:
+        if not getattr(Template.render, "_profilage", False):
+            Template.render = _timed_render(Template.render)
+
+
+# ------------------------------------------------------------------ formats
+
+
+def _speedscope(name: str, duration: float, start: float, samples, capture: Capture, queries) -> dict:
+    frames: list[dict] = []
+    index: dict[tuple, int] = {}
+
+    def frame_id(key: tuple, **attrs) -> int:
+        if key not in index:
+            index[key] = len(frames)
+            frames.append(attrs)
+        return index[key]
+
+    profiles = []
+    if samples:
+        stacks, weights = [], []
+        previous = start
+        for instant, stack in samples:
+            stacks.append([frame_id(f, name=f[0], file=f[1], line=f[2]) for f in stack])
+            weights.append(round((instant - previous) * 1000, 3))
+            previous = instant
+        profiles.append({
+            "type": "sampled",
+            "name": "Python (échantillonné)",
+            "unit": "milliseconds",
+            "startValue": 0,
+            "endValue": round(duration * 1000, 3),
+            "samples": stacks,
+            "weights": weights,
+        })
+
+    # Gabarits et requêtes SQL s'exécutent dans le même thread : leurs intervalles s'emboîtent.
+    events = []
+    for template, begin, elapsed, _ in capture.templates:
+        key = ("gabarit", template)
+        fid = frame_id(key, name=f"gabarit {template}")
+        events.append((begin, 1, fid))
+        events.append((begin + elapsed, 0, fid))
+    for sql, begin, elapsed in queries:
+        shape = query_shape(sql)[:200]
+        fid = frame_id(("sql", shape), name=f"SQL {shape}")
+        events.append((begin, 1, fid))
+        events.append((begin + elapsed, 0, fid))
+    events.sort(key=lambda e: (e[0], e[1]))
+    profiles.append({
+        "type": "evented",
+        "name": "Gabarits et SQL",
+        "unit": "milliseconds",
+        "startValue": 0,
+        "endValue": round(duration * 1000, 3),
+        "events": [
+            {"type": "O" if opening else "C", "frame": fid, "at": round((at - start) * 1000, 3)}
+            for at, opening, fid in events
+        ],
+    })
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "automarket",
+        "activeProfileIndex": 0,
+        "shared": {"frames": frames},
+        "profiles": profiles,
+    }
+
+
+def _folded(samples) -> str:
+    counts = Counter(";".join(f"{name} ({Path(file).name}:{line})" for name, file, line in stack) for _, stack in samples)
+    return "".join(f"{stack} {n}\n" for stack, n in counts.most_common())
+
+
+# ------------------------------------------------------------------ stockage
+
+
+def _prune(directory: Path, keep: int) -> None:
+    summaries = [p for p in directory.glob("*.json") if CAPTURE_NAME.match(p.name.removesuffix(".json"))]
+    summaries.sort(key=lambda p: p.stat().st_mtime_ns)
+    for summary in summaries[: max(0, len(summaries) - keep)]:
+        capture_id = summary.name.removesuffix(".json")
+        for suffix in (".json", *EXTENSIONS.values()):
+            (directory / f"{capture_id}{suffix}").unlink(missing_ok=True)
+
+
+def list_captures(limit: int = 50) -> list[dict]:
+    """Résumés des captures, les plus lentes d'abord."""
+    captures = []
+    for path in profile_dir().glob("*.json"):
+        if not CAPTURE_NAME.match(path.name.removesuffix(".json")):
+            continue
+        try:
+            captures.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue
+    captures.sort(key=lambda c: c.get("duree_ms", 0), reverse=True)
+    return captures[:limit]
+
+
+def load_capture(capture_id: str) -> dict | None:
+    if not CAPTURE_NAME.match(capture_id):
+        return None
+    try:
+        return json.loads((profile_dir() / f"{capture_id}.json").read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def capture_path(capture_id: str, kind: str) -> Path | None:
+    """Fichier `kind` de la capture, ou None si le nom ou le type est invalide."""
+    if not CAPTURE_NAME.match(capture_id) or kind not in EXTENSIONS:
+        return None
+    path = profile_dir() / f"{capture_id}{EXTENSIONS[kind]}"
+    return path if path.exists() else None
+
+
+# ------------------------------------------------------------------ middleware
+
+
+class ProfilingMiddleware:
+    """À placer après AuthenticationMiddleware (le staff est reconnu par request.user)."""
+
+    def __init__(self, get_response):
+        if not getattr(settings, "PROFILAGE_ACTIF", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.rate = getattr(settings, "PROFILAGE_ECHANTILLON", 0.0)
+        self.token = getattr(settings, "PROFILAGE_JETON", "")
+        self.mode = getattr(settings, "PROFILAGE_MODE", "echantillonnage")
+        self.interval = getattr(settings, "PROFILAGE_INTERVALLE_MS", 2) / 1000
+        self.keep = getattr(settings, "PROFILAGE_MAX_CAPTURES", 200)
+        _install_template_timer()
+
+    def _wanted(self, request) -> str | None:
+        header = request.headers.get(HEADER)
+        if header is not None:
+            if self.token and header == self.token:
+                return "en-tête"
+            if request.user.is_staff:
+                return "en-tête"
+        if settings.SESSION_COOKIE_NAME in request.COOKIES and request.session.get(SESSION_KEY):
+            if request.user.is_staff:
+                return "session"
+        if self.rate and random.random() < self.rate:
+            return "échantillon"
+        return None
+
+    def __call__(self, request):
+        reason = self._wanted(request)
+        if reason is None:
+            return self.get_response(request)
+
+        capture = Capture()
+        _local.capture = capture
+        profiler = sampler = None
+        if self.mode == "cprofile":
+            profiler = cProfile.Profile()
+            profiler.enable()
+        else:
+            sampler = Sampler(threading.get_ident(), self.interval)
+            sampler.start()
+        try:
+            with QueryRecorder() as recorder:
+                response = self.get_response(request)
+        finally:
+            duration = time.perf_counter() - capture.start
+            if profiler is not None:
+                profiler.disable()
+            if sampler is not None:
+                sampler.stop()
+            _local.capture = None
+
+        try:
+            capture_id = self._save(request, response, reason, duration, capture, recorder, sampler, profiler)
+        except OSError:
+            logger.exception("Impossible d'enregistrer le profil de %s", request.path)
+        else:
+            response["X-Profilage-Id"] = capture_id
+        return response
+
+    def _save(self, request, response, reason, duration, capture, recorder, sampler, profiler) -> str:
+        directory = profile_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        now = timezone.now()
+        capture_id = f"{now:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        label = f"{request.method} {request.get_full_path()}"
+
+        files = []
+        if sampler is not None:
+            speedscope = _speedscope(label, duration, capture.start, sampler.samples, capture, recorder.queries)
+            (directory / f"{capture_id}.speedscope.json").write_text(json.dumps(speedscope))
+            (directory / f"{capture_id}.folded").write_text(_folded(sampler.samples))
+            files += ["speedscope", "folded"]
+        if profiler is not None:
+            profiler.dump_stats(directory / f"{capture_id}.pstats")
+            files.append("pstats")
+
+        user = getattr(request, "user", None)
+        summary = {
+            "id": capture_id,
+            "date": now.isoformat(),
+            "methode": request.method,
+            "chemin": request.get_full_path()[:500],
+            "statut": response.status_code,
+            "utilisateur": user.get_username() if user is not None and user.is_authenticated else None,
+            "declencheur": reason,
+            "duree_ms": round(duration * 1000, 2),
+            "sql_ms": round(sum(elapsed for _, _, elapsed in recorder.queries) * 1000, 2),
+            "sql_nombre": len(recorder),
+            "gabarits_ms": round(sum(t[2] for t in capture.templates if t[3] == 0) * 1000, 2),
+            "echantillons": len(sampler.samples) if sampler is not None else None,
+            "fichiers": files,
+            "sql": [
+                {
+                    "debut_ms": round((begin - capture.start) * 1000, 2),
+                    "duree_ms": round(elapsed * 1000, 2),
+                    "sql": sql[:1000],
+                }
+                for sql, begin, elapsed in recorder.queries
+            ],
+            "gabarits": [
+                {"nom": name, "debut_ms": round((begin - capture.start) * 1000, 2), "duree_ms": round(elapsed * 1000, 2)}
+                for name, begin, elapsed, _ in sorted(capture.templates, key=lambda t: t[1])
+            ],
+        }
+        tmp = directory / f"{capture_id}.json.tmp"
+        tmp.write_text(json.dumps(summary, ensure_ascii=False))
+        os.replace(tmp, directory / f"{capture_id}.json")
+        _prune(directory, self.keep)
+        return capture_id
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from voitures.models import DocumentRecherche, Voiture
+
+FTS_TABLE = "voitures_recherche_fts"
+
+_backend: str | None = None
+
+
+def normalize(value: str | None) -> str:
+    """Minuscules, sans accents ni ponctuation : "Citroën C4 (Mégane)" -> "citroen c4 megane"."""
+    value = unicodedata.normalize("NFKD", value or "")
+    value = "".join(ch for ch in value if not unicodedata.combining(ch)).lower()
+    return " ".join(re.findall(r"\w+", value))
+
+
+def tokens(query: str | None) -> list[str]:
+    return normalize(query).split()
+
+
+def backend() -> str:
+    """"postgresql" (tsvector + GIN), "fts5" (SQLite) ou "like" (repli sans index plein texte)."""
+    global _backend
+    if _backend is None:
+        if connection.vendor == "postgresql":
+            _backend = "postgresql"
+        elif connection.vendor == "sqlite" and FTS_TABLE in connection.introspection.table_names():
+            _backend = "fts5"
+        else:
+            _backend = "like"
+    return _backend
+
+
+# ==================== INDEXATION ====================
+
+def build_document(voiture: Voiture) -> DocumentRecherche:
+    return DocumentRecherche(
+        voiture_id=voiture.id,
+        titre=normalize(f"{voiture.modele.marque.nom} {voiture.modele.nom}"),
+        corps=normalize(voiture.description),
+    )
+
+
+def index_voitures(voitures) -> int:
+    """(Ré)indexe les voitures données ; une requête par lot plutôt qu'une par voiture."""
+    documents = [build_document(v) for v in voitures]
+    DocumentRecherche.objects.bulk_create(
+        documents,
+        update_conflicts=True,
+        unique_fields=["voiture"],
+        update_fields=["titre", "corps"],
+    )
+    return len(documents)
+
+
+def reindex(queryset, batch_size: int = 1000) -> int:
+    total = 0
+    batch = []
+    for voiture in queryset.select_related("modele__marque").iterator(chunk_size=batch_size):
+        batch.append(voiture)
+        if len(batch) >= batch_size:
+            total += index_voitures(batch)
+            batch = []
+    return total + index_voitures(batch)
+
+
+# ==================== RECHERCHE ====================
+
+def _join(queryset, relation: str, table: str):
+    """Jointure interne de `queryset` vers `relation` ; renvoie aussi l'alias SQL (cité) de `table`."""
+    queryset = queryset.filter(**{f"{relation}__isnull": False})
+    alias = next(a for a, join in queryset.query.alias_map.items() if join.table_name == table)
+    return queryset, connection.ops.quote_name(alias)
+
+
+def search(queryset, query: str):
+    """
+    Filtre `queryset` (de Voiture) sur la recherche plein texte et l'annote avec `pertinence`.
+    Insensible aux accents et à la casse ; chaque mot peut être un début de mot.
+
+    L'index est joint à voitures_voiture : la correspondance et la pertinence sont calculées
+    une seule fois par requête, et le tri comme la pagination par curseur portent sur la
+    colonne `pertinence` (une sous-requête corrélée relançait MATCH pour chaque ligne).
+    """
+    words = tokens(query)
+    if not words:
+        return queryset.annotate(pertinence=RawSQL("0.0", [], output_field=FloatField()))
+
+    if backend() == "like":
+        condition = Q()
+        for word in words:
+            condition &= Q(document_recherche__titre__contains=word) | Q(document_recherche__corps__contains=word)
+        return queryset.filter(condition).annotate(pertinence=RawSQL("0.0", [], output_field=FloatField()))
+
+    if backend() == "postgresql":
+        expr = " & ".join(f"{w}:*" for w in words)
+        queryset, table = _join(queryset, "document_recherche", DocumentRecherche._meta.db_table)
+        match = f"{table}.vecteur @@ to_tsquery('simple', %s)"
+        rank, rank_params = f"ts_rank({table}.vecteur, to_tsquery('simple', %s))", [expr]
+    else:
+        # FTS5 : chaque mot est un préfixe, tous sont requis ; bm25 pondère le titre 10x.
+        expr = " ".join(f'"{w}"*' for w in words)
+        queryset, table = _join(queryset, "document_fts", FTS_TABLE)
+        match = f"{table}.{FTS_TABLE} MATCH %s"
+        rank, rank_params = f"-bm25({table}.{FTS_TABLE}, 10.0, 1.0)", []
+    return queryset.filter(RawSQL(match, [expr], output_field=BooleanField())).annotate(
+        pertinence=RawSQL(rank, rank_params, output_field=FloatField())
+    )
@@ -0,0 +1,138 @@
+"""
+Surveillance des requêtes SQL exécutées par requête HTTP.
+
+- `@query_budget(n, warm=m)` déclare le nombre maximal de requêtes SQL d'une vue (et,
+  facultativement, celui d'une page servie depuis des caches chauds) ;
+- les requêtes de même forme (même SQL, paramètres mis à part) répétées au moins
+  REQUETES_SEUIL_N_PLUS_1 fois sont signalées comme N+1 ;
+- QueryBudgetMiddleware journalise les dépassements (REQUETES_SURVEILLANCE, actif par
+  défaut en DEBUG) ou lève QueryBudgetExceeded si REQUETES_STRICT est activé (CI) ;
+- `assert_queries(...)` applique les mêmes contrôles dans un test.
+"""
+from __future__ import annotations
+
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# "IN (%s, %s, %s)" et "VALUES (%s, %s), (%s, %s)" ont la même forme quelle que soit leur longueur.
+_PLACEHOLDER_LIST = re.compile(r"\(\s*%s(?:\s*,\s*%s)*\s*\)")
+_VALUES_LIST = re.compile(r"(\(\.\.\.\)\s*,\s*)+\(\.\.\.\)")
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_budget(max_queries: int, *, warm: int | None = None):
+    """
+    Déclare le nombre maximal de requêtes SQL qu'une vue peut exécuter, caches vides compris.
+    `warm` : le maximum pour un visiteur anonyme une fois les caches remplis (vérifié par les tests).
+    """
+
+    def decorator(view):
+        view.query_budget = max_queries
+        view.query_budget_warm = warm
+        return view
+
+    return decorator
+
+
+def query_shape(sql: str) -> str:
+    shape = _PLACEHOLDER_LIST.sub("(...)", sql)
+    shape = _VALUES_LIST.sub("(...)", shape)
+    return _LITERAL.sub("?", shape)
+
+
+@dataclass
+class QueryRecorder:
+    """
+    Enregistre les requêtes exécutées sur toutes les connexions pendant le bloc `with` :
+    (sql, début, durée), instants en secondes de time.perf_counter().
+    """
+
+    queries: list[tuple[str, float, float]] = field(default_factory=list)
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc):
+        self._stack.close()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, start, time.perf_counter() - start))
+
+    def __len__(self) -> int:
+        return len(self.queries)
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Formes de requête exécutées au moins `threshold` fois, les plus fréquentes d'abord."""
+        counts = Counter(query_shape(sql) for sql, _, _ in self.queries)
+        return [(shape, n) for shape, n in counts.most_common() if n >= threshold]
+
+    def violations(self, budget: int | None = None, threshold: int | None = None) -> list[str]:
+        if threshold is None:
+            threshold = getattr(settings, "REQUETES_SEUIL_N_PLUS_1", 5)
+        problems = []
+        if budget is not None and len(self) > budget:
+            problems.append(f"{len(self)} requêtes SQL pour un budget de {budget}")
+        for shape, n in self.repeated(threshold):
+            problems.append(f"N+1 probable ({n}x): {shape[:300]}")
+        return problems
+
+
+@contextmanager
+def assert_queries(max_queries: int | None = None, threshold: int | None = None):
+    """
+    Pour les tests : échoue si le bloc dépasse `max_queries` requêtes ou contient un N+1.
+
+        with assert_queries(6):
+            client.get(url)
+    """
+    with QueryRecorder() as recorder:
+        yield recorder
+    problems = recorder.violations(max_queries, threshold)
+    if problems:
+        raise QueryBudgetExceeded("\n".join(problems))
+
+
+class QueryBudgetMiddleware:
+    """Contrôle le budget (@query_budget) et les N+1 de chaque requête HTTP."""
+
+    def __init__(self, get_response):
+        if not getattr(settings, "REQUETES_SURVEILLANCE", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.strict = getattr(settings, "REQUETES_STRICT", False)
+
+    def __call__(self, request):
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+        problems = recorder.violations(getattr(request, "_query_budget", None))
+        if problems:
+            message = f"{request.method} {request.path} : " + " ; ".join(problems)
+            if self.strict:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._query_budget = getattr(view_func, "query_budget", None)
+        return None
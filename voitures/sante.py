@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import logging
+import math
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.migrations.executor import MigrationExecutor
+
+logger = logging.getLogger(__name__)
+
+# Une fois toutes les migrations appliquées, inutile de relire le graphe à chaque sonde :
+# un nouveau déploiement redémarre le processus.
+_migrations_ok = False
+
+# Sondes de la base dans un thread : /readyz répond dans le délai même si le pilote reste bloqué.
+_sondes = ThreadPoolExecutor(max_workers=2, thread_name_prefix="sante")
+
+
+def _timed(check) -> dict:
+    start = time.perf_counter()
+    try:
+        result = check() or {}
+        status = "ok"
+    except Exception:
+        # /readyz est public : le détail (hôte, utilisateur, chemin) ne va que dans les journaux.
+        logger.exception("Sonde de disponibilité en échec : %s", check.__name__)
+        result = {}
+        status = "error"
+    latency = round((time.perf_counter() - start) * 1000, 2)
+    return {"status": status, "latency_ms": latency, **result}
+
+
+def _ping_database(timeout_ms: int) -> None:
+    """
+    SELECT 1 sur une connexion dédiée, ouverte avec des délais : la connexion partagée du
+    processus n'en a aucun, et une base injoignable bloquerait la sonde au connect().
+    """
+    probe = connections.create_connection(DEFAULT_DB_ALIAS)
+    options = dict(probe.settings_dict.get("OPTIONS") or {})
+    if probe.vendor == "postgresql":
+        # libpq : secondes entières, 2 au minimum.
+        options["connect_timeout"] = max(2, math.ceil(timeout_ms / 1000))
+        options["options"] = f"{options.get('options', '')} -c statement_timeout={int(timeout_ms)}".strip()
+    elif probe.vendor == "sqlite":
+        # Attente maximale d'un verrou tenu par un autre processus.
+        options["timeout"] = timeout_ms / 1000
+    probe.settings_dict = {**probe.settings_dict, "OPTIONS": options}
+    try:
+        with probe.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+    finally:
+        probe.close()
+
+
+def check_database() -> None:
+    timeout_ms = getattr(settings, "HEALTHCHECK_DB_TIMEOUT_MS", 2000)
+    try:
+        _sondes.submit(_ping_database, timeout_ms).result(timeout=timeout_ms / 1000)
+    except FutureTimeout:
+        raise TimeoutError(f"pas de réponse de la base en {timeout_ms} ms") from None
+
+
+def check_migrations() -> dict:
+    global _migrations_ok
+    if _migrations_ok:
+        return {"pending": 0}
+    executor = MigrationExecutor(connection)
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    if plan:
+        raise RuntimeError(f"{len(plan)} migration(s) non appliquée(s)")
+    _migrations_ok = True
+    return {"pending": 0}
+
+
+def check_cache() -> None:
+    key = "sante:ping"
+    value = uuid.uuid4().hex
+    cache.set(key, value, 30)
+    if cache.get(key) != value:
+        raise RuntimeError("valeur relue différente")
+
+
+def readiness() -> tuple[bool, dict]:
+    checks = {"database": _timed(check_database)}
+    # Les migrations ne peuvent être vérifiées que si la base répond.
+    if checks["database"]["status"] == "ok":
+        checks["migrations"] = _timed(check_migrations)
+    else:
+        checks["migrations"] = {"status": "skipped", "latency_ms": 0}
+    checks["cache"] = _timed(check_cache)
+    ok = all(check["status"] == "ok" for check in checks.values())
+    return ok, checks
@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+from voitures import alertes, caches, recherche, similaires, statistiques, stockage, taches
+from voitures.catalogue import invalidate_homepage
+from voitures.models import ImageVoiture, Marque, Modele, RechercheSauvegardee, Transaction, Voiture, VoitureSimilaire
+
+# Champs dont dépend le document de recherche d'une annonce.
+_CHAMPS_RECHERCHE = {"modele", "modele_id", "description"}
+
+
+@receiver(post_save, sender=Voiture)
+def indexer_voiture(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields and not _CHAMPS_RECHERCHE & set(update_fields)):
+        return
+    recherche.index_voitures([instance])
+
+
+# Le document d'une annonce ne reprend que le nom du modèle et de la marque.
+_CHAMPS_RECHERCHE_NOM = {"nom"}
+
+
+@receiver(post_save, sender=Modele)
+def indexer_modele(sender, instance, raw=False, created=False, update_fields=None, **kwargs):
+    if raw or created or (update_fields and not _CHAMPS_RECHERCHE_NOM & set(update_fields)):
+        return
+    recherche.reindex(Voiture.objects.filter(modele=instance))
+
+
+@receiver(post_save, sender=Marque)
+def indexer_marque(sender, instance, raw=False, created=False, update_fields=None, **kwargs):
+    if raw or created or (update_fields and not _CHAMPS_RECHERCHE_NOM & set(update_fields)):
+        return
+    recherche.reindex(Voiture.objects.filter(modele__marque=instance))
+
+
+@receiver([post_save, post_delete], sender=Voiture)
+@receiver([post_save, post_delete], sender=Modele)
+@receiver([post_save, post_delete], sender=Marque)
+def invalider_accueil(sender, **kwargs):
+    # Annonce publiée, vendue, réservée, modifiée ou supprimée : la page d'accueil change.
+    invalidate_homepage()
+
+
+@receiver([post_save, post_delete], sender=Transaction)
+def invalider_transactions(sender, **kwargs):
+    # Listes et chiffre d'affaires du dashboard
+    caches.invalidate("transactions")
+
+
+@receiver([post_save, post_delete], sender=RechercheSauvegardee)
+def invalider_recherches(sender, **kwargs):
+    # Index des recherches sauvegardées recompilé par le worker
+    alertes.invalidate()
+
+
+# ==================== RÉFÉRENCES DES FICHIERS MÉDIAS ====================
+
+_CHAMPS_FICHIERS = {Voiture: "image_principale", ImageVoiture: "image", Marque: "logo"}
+
+
+def _nom_fichier(instance, field: str) -> str | None:
+    # Lecture sans déclencher le chargement d'un champ différé (.only()/.defer()).
+    value = instance.__dict__.get(field)
+    return getattr(value, "name", value)
+
+
+@receiver(post_init, sender=Voiture)
+@receiver(post_init, sender=ImageVoiture)
+@receiver(post_init, sender=Marque)
+def memoriser_fichier(sender, instance, **kwargs):
+    instance._fichier_initial = _nom_fichier(instance, _CHAMPS_FICHIERS[sender])
+
+
+@receiver(post_save, sender=Voiture)
+@receiver(post_save, sender=ImageVoiture)
+def declinaisons(sender, instance, raw=False, created=False, **kwargs):
+    # Reçu avant compter_references, qui remplace _fichier_initial par le nouveau nom.
+    champ = _CHAMPS_FICHIERS[sender]
+    nouveau = _nom_fichier(instance, champ)
+    if raw or not (created or nouveau != getattr(instance, "_fichier_initial", None)):
+        return
+    # Annonce sans photo : l'image par défaut n'a pas de déclinaisons.
+    if not nouveau or nouveau == sender._meta.get_field(champ).get_default():
+        return
+    # Génération par le worker média, hors de la requête : l'affichage ne fait que lire image_largeur.
+    transaction.on_commit(
+        lambda: taches.enqueue("image_variants", modele=sender._meta.label, pk=instance.pk, champ=champ, nom=nouveau)
+    )
+
+
+@receiver(post_save, sender=Voiture)
+@receiver(post_save, sender=ImageVoiture)
+@receiver(post_save, sender=Marque)
+def compter_references(sender, instance, raw=False, **kwargs):
+    ancien = getattr(instance, "_fichier_initial", None)
+    nouveau = _nom_fichier(instance, _CHAMPS_FICHIERS[sender])
+    if raw or nouveau == ancien:
+        return
+    stockage.retain([nouveau])
+    stockage.release([ancien])
+    instance._fichier_initial = nouveau
+
+
+@receiver(post_delete, sender=Voiture)
+@receiver(post_delete, sender=ImageVoiture)
+@receiver(post_delete, sender=Marque)
+def liberer_reference(sender, instance, **kwargs):
+    stockage.release([_nom_fichier(instance, _CHAMPS_FICHIERS[sender])])
+
+
+# ==================== STATISTIQUES QUOTIDIENNES ====================
+
+
+@receiver(post_save, sender=Voiture)
+def stats_annonce_creee(sender, instance, created=False, raw=False, **kwargs):
+    if created and not raw:
+        statistiques.bump(statistiques.day_of(instance.date_ajout), annonces_creees=1)
+
+
+@receiver(post_delete, sender=Voiture)
+def stats_annonce_supprimee(sender, instance, **kwargs):
+    statistiques.bump(statistiques.day_of(instance.date_ajout), annonces_creees=-1)
+
+
+@receiver(post_save, sender=User)
+def stats_utilisateur_cree(sender, instance, created=False, raw=False, **kwargs):
+    if created and not raw:
+        statistiques.bump(statistiques.day_of(instance.date_joined), nouveaux_utilisateurs=1)
+
+
+@receiver(post_delete, sender=User)
+def stats_utilisateur_supprime(sender, instance, **kwargs):
+    statistiques.bump(statistiques.day_of(instance.date_joined), nouveaux_utilisateurs=-1)
+
+
+def _etat_transaction(instance):
+    # None si un champ utile est différé : la réconciliation nocturne corrigera.
+    values = instance.__dict__
+    if not {"statut", "prix_final", "date_mise_a_jour"} <= values.keys():
+        return None
+    return values["statut"], values["prix_final"], values["date_mise_a_jour"]
+
+
+def _ajouter(deltas: dict, autres: dict) -> dict:
+    for name, delta in autres.items():
+        deltas[name] = deltas.get(name, 0) + delta
+    return deltas
+
+
+@receiver(post_init, sender=Transaction)
+def memoriser_transaction(sender, instance, **kwargs):
+    instance._etat_initial = _etat_transaction(instance) if instance.pk else None
+
+
+@receiver(post_save, sender=Transaction)
+def stats_transaction(sender, instance, created=False, raw=False, **kwargs):
+    ancien, nouveau = getattr(instance, "_etat_initial", None), _etat_transaction(instance)
+    instance._etat_initial = nouveau
+    if raw or nouveau is None or (not created and (ancien is None or ancien[:2] == nouveau[:2])):
+        return
+    statut, prix, maj = nouveau
+    # Incréments regroupés par jour : une requête par jour touché.
+    par_jour = {statistiques.day_of(instance.date_transaction): statistiques.transaction_deltas(statut, prix, 1)}
+    deltas = next(iter(par_jour.values()))
+    if created:
+        # Chaque demande d'achat réserve l'annonce.
+        deltas["annonces_reservees"] = 1
+    else:
+        _ajouter(deltas, statistiques.transaction_deltas(ancien[0], ancien[1], -1))
+
+    etait_vendue = not created and ancien[0] in statistiques.VENDUS
+    if statut in statistiques.VENDUS and not etait_vendue:
+        _ajouter(par_jour.setdefault(statistiques.day_of(maj), {}), {"annonces_vendues": 1})
+    elif etait_vendue and statut not in statistiques.VENDUS:
+        _ajouter(par_jour.setdefault(statistiques.day_of(ancien[2]), {}), {"annonces_vendues": -1})
+    for jour, deltas in par_jour.items():
+        statistiques.bump(jour, **deltas)
+
+
+@receiver(post_delete, sender=Transaction)
+def stats_transaction_supprimee(sender, instance, **kwargs):
+    etat = _etat_transaction(instance)
+    if etat is None:
+        return
+    statut, prix, maj = etat
+    par_jour = {
+        statistiques.day_of(instance.date_transaction): _ajouter(
+            statistiques.transaction_deltas(statut, prix, -1), {"annonces_reservees": -1}
+        )
+    }
+    if statut in statistiques.VENDUS:
+        _ajouter(par_jour.setdefault(statistiques.day_of(maj), {}), {"annonces_vendues": -1})
+    for jour, deltas in par_jour.items():
+        statistiques.bump(jour, **deltas)
+
+
+# ==================== ANNONCES SIMILAIRES ====================
+
+
+@receiver(post_init, sender=Voiture)
+def memoriser_similarite(sender, instance, **kwargs):
+    instance._similarite_initiale = similaires.signature(instance) if instance.pk else None
+
+
+@receiver(post_save, sender=Voiture)
+def similaires_annonce(sender, instance, created=False, raw=False, **kwargs):
+    ancienne, nouvelle = getattr(instance, "_similarite_initiale", None), similaires.signature(instance)
+    instance._similarite_initiale = nouvelle
+    if raw or (not created and ancienne is not None and ancienne == nouvelle):
+        return
+    similaires.request_refresh([instance.pk])
+
+
+@receiver(post_init, sender=Modele)
+def memoriser_similarite_modele(sender, instance, **kwargs):
+    instance._similarite_initiale = similaires.signature(instance, similaires.CHAMPS_MODELE) if instance.pk else None
+
+
+@receiver(post_save, sender=Modele)
+def similaires_modele(sender, instance, created=False, raw=False, **kwargs):
+    # Marque, carburant ou transmission modifiés : toutes les annonces du modèle changent de voisines.
+    ancienne = getattr(instance, "_similarite_initiale", None)
+    nouvelle = instance._similarite_initiale = similaires.signature(instance, similaires.CHAMPS_MODELE)
+    if raw or created or (ancienne is not None and ancienne == nouvelle):
+        return
+    similaires.request_refresh(instance.voitures.filter(est_vendue=False).values_list("id", flat=True))
+
+
+@receiver(pre_delete, sender=Voiture)
+def similaires_annonce_supprimee(sender, instance, **kwargs):
+    # Les lignes qui la citent disparaissent en cascade : on note avant quelles listes compléter.
+    voisines = VoitureSimilaire.objects.filter(similaire=instance).values_list("voiture_id", flat=True)
+    similaires.request_refresh(voisines)
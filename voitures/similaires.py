@@ -0,0 +1,197 @@
+"""
+Annonces similaires, précalculées dans VoitureSimilaire.
+
+La distance entre deux annonces en vente combine :
+- l'écart de prix relatif (une unité = ECHELLES["prix"], soit 20 % d'écart),
+- l'écart d'année et de kilométrage,
+- une pénalité fixe si la marque, le carburant ou la transmission diffèrent.
+
+Les distances sont calculées avec NumPy, par blocs, sur tout l'inventaire en vente.
+`rebuild()` recalcule toutes les listes. `refresh(ids)` ne recalcule que les listes touchées
+par des annonces modifiées : la leur, celles qui les contiennent, et celles où elles entrent
+(distance inférieure à la dernière voisine retenue). Le worker appelle `refresh` (tâche
+"similar_cars"), et la page de détail lit la liste en une requête.
+"""
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Iterable
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from voitures.models import Voiture, VoitureSimilaire
+
+# Champs d'une annonce qui changent ses voisines.
+CHAMPS = ("modele_id", "prix", "annee", "kilometrage", "est_vendue")
+# Champs d'un modèle qui changent les voisines de toutes ses annonces.
+CHAMPS_MODELE = ("marque_id", "type_carburant", "transmission")
+
+# Écart qui compte pour une unité de distance.
+ECHELLES = {"prix": math.log(1.2), "annee": 2.0, "kilometrage": 25000.0}
+# Pénalité si la caractéristique diffère (même unité que le carré des écarts ci-dessus).
+PENALITES = {"marque": 1.5, "carburant": 1.0, "transmission": 0.5}
+
+# Taille maximale (en cellules) de la matrice de distances d'un bloc.
+BLOC_CELLULES = 4_000_000
+
+
+def nombre() -> int:
+    return int(getattr(settings, "SIMILAIRES_NOMBRE", 8))
+
+
+@dataclass
+class Inventaire:
+    """Annonces en vente, sous forme de tableaux (une ligne par annonce, triées par id)."""
+
+    ids: np.ndarray
+    numeriques: np.ndarray  # (n, 3) prix, année, kilométrage, mis à l'échelle
+    categories: np.ndarray  # (n, 3) marque, carburant, transmission, codés en entiers
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def lookup(self, ids: Iterable[int]) -> tuple[np.ndarray, np.ndarray]:
+        """Positions de ces ids, et masque de ceux qui sont dans l'inventaire."""
+        ids = np.fromiter(ids, dtype=np.int64)
+        if not len(self.ids):
+            return np.zeros(len(ids), np.int64), np.zeros(len(ids), bool)
+        found = np.minimum(np.searchsorted(self.ids, ids), len(self.ids) - 1)
+        return found, self.ids[found] == ids
+
+    def positions(self, ids: Iterable[int]) -> np.ndarray:
+        found, known = self.lookup(ids)
+        return found[known]
+
+
+def inventaire() -> Inventaire:
+    rows = list(
+        Voiture.objects.filter(est_vendue=False)
+        .order_by("id")
+        .values_list("id", "prix", "annee", "kilometrage", "modele__marque_id", "modele__type_carburant", "modele__transmission")
+    )
+    if not rows:
+        return Inventaire(np.empty(0, np.int64), np.empty((0, 3), np.float32), np.empty((0, 3), np.int64))
+    ids, prix, annees, kms, marques, carburants, transmissions = zip(*rows)
+    numeriques = np.column_stack([
+        np.log(np.maximum(np.array(prix, dtype=np.float64), 1.0)) / ECHELLES["prix"],
+        np.array(annees, dtype=np.float64) / ECHELLES["annee"],
+        np.array(kms, dtype=np.float64) / ECHELLES["kilometrage"],
+    ]).astype(np.float32)
+    categories = np.column_stack([
+        np.array(marques, dtype=np.int64),
+        np.unique(np.array(carburants, dtype=object).astype(str), return_inverse=True)[1],
+        np.unique(np.array(transmissions, dtype=object).astype(str), return_inverse=True)[1],
+    ])
+    return Inventaire(np.array(ids, dtype=np.int64), numeriques, categories)
+
+
+def distances(inv: Inventaire, rows: np.ndarray) -> np.ndarray:
+    """Matrice (len(rows), len(inv)) des distances des annonces `rows` (positions) à tout l'inventaire."""
+    result = np.zeros((len(rows), len(inv)), dtype=np.float32)
+    for j in range(inv.numeriques.shape[1]):
+        diff = inv.numeriques[rows, j][:, None] - inv.numeriques[:, j][None, :]
+        result += diff * diff
+    for j, penalite in enumerate(PENALITES.values()):
+        result += np.float32(penalite) * (inv.categories[rows, j][:, None] != inv.categories[:, j][None, :])
+    return result
+
+
+def _blocs(inv: Inventaire, rows: np.ndarray):
+    size = max(1, BLOC_CELLULES // max(len(inv), 1))
+    for start in range(0, len(rows), size):
+        block = rows[start:start + size]
+        yield block, distances(inv, block)
+
+
+def top_k(inv: Inventaire, rows: np.ndarray, k: int) -> list[VoitureSimilaire]:
+    """Les `k` plus proches voisines de chaque annonce `rows`, prêtes à insérer."""
+    k = min(k, len(inv) - 1)
+    if k <= 0:
+        return []
+    objs = []
+    for block, dist in _blocs(inv, rows):
+        dist[np.arange(len(block)), block] = np.inf  # une annonce n'est pas sa propre voisine
+        nearest = np.argpartition(dist, k - 1, axis=1)[:, :k]
+        nearest_dist = np.take_along_axis(dist, nearest, axis=1)
+        # Tri par distance puis par id, pour un résultat stable d'un calcul à l'autre.
+        order = np.lexsort((inv.ids[nearest], nearest_dist), axis=-1)
+        nearest = np.take_along_axis(nearest, order, axis=1)
+        nearest_dist = np.take_along_axis(nearest_dist, order, axis=1)
+        for i, row in enumerate(block):
+            voiture_id = int(inv.ids[row])
+            objs.extend(
+                VoitureSimilaire(voiture_id=voiture_id, similaire_id=int(inv.ids[n]), rang=rang, distance=float(d))
+                for rang, (n, d) in enumerate(zip(nearest[i], nearest_dist[i]))
+            )
+    return objs
+
+
+@transaction.atomic
+def rebuild() -> int:
+    """Recalcule les voisines de toutes les annonces en vente. Renvoie le nombre d'annonces."""
+    inv = inventaire()
+    objs = top_k(inv, np.arange(len(inv)), nombre())
+    VoitureSimilaire.objects.all().delete()
+    VoitureSimilaire.objects.bulk_create(objs, batch_size=2000)
+    return len(inv)
+
+
+@transaction.atomic
+def refresh(voiture_ids: Iterable[int]) -> int:
+    """
+    Met à jour les listes touchées par ces annonces (créées, modifiées, vendues ou supprimées).
+    Renvoie le nombre de listes recalculées.
+    """
+    k = nombre()
+    changed = set(voiture_ids)
+    inv = inventaire()
+    affected = changed | set(
+        VoitureSimilaire.objects.filter(similaire_id__in=changed).values_list("voiture_id", flat=True)
+    )
+
+    rows = inv.positions(sorted(changed))
+    if len(rows) and len(inv) > 1:
+        # Distance de la dernière voisine retenue (infinie si la liste est incomplète) : une
+        # annonce modifiée plus proche que celle-ci entre dans la liste.
+        seuils = np.full(len(inv), np.inf, dtype=np.float32)
+        last = list(VoitureSimilaire.objects.filter(rang=k - 1).values_list("voiture_id", "distance"))
+        if last:
+            ids, dist = zip(*last)
+            positions, known = inv.lookup(ids)
+            seuils[positions[known]] = np.array(dist, dtype=np.float32)[known]
+        for _, dist in _blocs(inv, rows):
+            affected.update(inv.ids[(dist < seuils[None, :]).any(axis=0)].tolist())
+
+    VoitureSimilaire.objects.filter(voiture_id__in=affected).delete()
+    VoitureSimilaire.objects.bulk_create(top_k(inv, inv.positions(sorted(affected)), k), batch_size=2000)
+    return len(affected)
+
+
+def request_refresh(voiture_ids: Iterable[int]) -> None:
+    """Confie la mise à jour au worker, une fois la transaction en cours validée."""
+    ids = sorted(set(voiture_ids))
+    if not ids:
+        return
+    from voitures import taches
+
+    transaction.on_commit(lambda: taches.enqueue("similar_cars", ids=ids))
+
+
+def signature(instance, champs: tuple[str, ...] = CHAMPS) -> tuple | None:
+    """Valeurs de ces champs (CHAMPS d'une annonce par défaut), ou None si l'un d'eux est différé (.only()/.defer())."""
+    values = instance.__dict__
+    if not set(champs) <= values.keys():
+        return None
+    return tuple(values[name] for name in champs)
+
+
+def for_voiture(voiture: Voiture, limit: int = 4):
+    """Annonces similaires encore en vente, de la plus proche à la plus lointaine (une requête)."""
+    return (
+        Voiture.objects.filter(voisine_de__voiture=voiture, est_vendue=False)
+        .select_related("modele__marque")
+        .order_by("voisine_de__rang")[:limit]
+    )
@@ -0,0 +1,184 @@
+"""
+Statistiques quotidiennes du dashboard (modèle StatistiqueJour, une ligne par jour).
+
+Les signaux (voitures.signals) appliquent des incréments au fil de l'eau ; `rebuild()`
+recalcule les jours demandés depuis les tables sources, pour rattraper ce que les signaux
+ne voient pas (insertions groupées, `QuerySet.update`, suppressions en cascade hors ORM).
+Les vues ne se recalculent pas : seul le compteur (voitures.compteur_vues) les alimente.
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from voitures.models import StatistiqueJour, Transaction, Voiture
+
+# Statut de transaction -> colonne de StatistiqueJour.
+STATUTS = {
+    "en_attente": "transactions_en_attente",
+    "confirmee": "transactions_confirmees",
+    "annulee": "transactions_annulees",
+    "terminee": "transactions_terminees",
+}
+# Statuts qui comptent dans le chiffre d'affaires et les ventes.
+VENDUS = {"confirmee", "terminee"}
+
+# Colonnes recalculées par rebuild() (tout sauf les vues).
+RECALCULEES = (
+    "annonces_creees",
+    "annonces_vendues",
+    "annonces_reservees",
+    *STATUTS.values(),
+    "chiffre_affaires",
+    "nouveaux_utilisateurs",
+)
+
+
+def day_of(value: datetime | None) -> date:
+    return timezone.localdate(value) if value is not None else timezone.localdate()
+
+
+def bump(day: date, **deltas) -> None:
+    """Ajoute `deltas` (colonne -> incrément, éventuellement négatif) à la ligne du jour."""
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    # Une seule requête : INSERT ... ON CONFLICT DO UPDATE (PostgreSQL, SQLite >= 3.24).
+    opts = StatistiqueJour._meta
+    fields = opts.concrete_fields
+    quote = connection.ops.quote_name
+    table = quote(opts.db_table)
+    sql = (
+        f"INSERT INTO {table} ({', '.join(quote(f.column) for f in fields)}) "
+        f"VALUES ({', '.join(['%s'] * len(fields))}) "
+        f"ON CONFLICT ({quote(opts.pk.column)}) DO UPDATE SET "
+        + ", ".join(
+            f"{quote(f.column)} = {table}.{quote(f.column)} + EXCLUDED.{quote(f.column)}"
+            for f in fields
+            if f.attname in deltas
+        )
+    )
+    params = [f.get_db_prep_save(day if f.primary_key else deltas.get(f.attname, 0), connection) for f in fields]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def transaction_deltas(statut: str | None, prix: Decimal | None, sign: int) -> dict:
+    """Part d'une transaction dans la ligne de son jour de création (sign=-1 pour la retirer)."""
+    if statut not in STATUTS:
+        return {}
+    deltas = {STATUTS[statut]: sign}
+    if statut in VENDUS:
+        deltas["chiffre_affaires"] = sign * (prix or Decimal("0"))
+    return deltas
+
+
+def _per_day(queryset, field: str, **aggregates) -> dict[date, dict]:
+    rows = (
+        queryset.annotate(jour=TruncDate(field, tzinfo=timezone.get_current_timezone()))
+        .values("jour")
+        .annotate(**aggregates)
+        .order_by()
+    )
+    return {row.pop("jour"): row for row in rows}
+
+
+def compute(start: date | None = None, end: date | None = None) -> dict[date, dict]:
+    """Colonnes recalculables par jour, depuis les tables sources (une requête groupée par source)."""
+
+    def window(queryset, field):
+        tz = timezone.get_current_timezone()
+        if start is not None:
+            queryset = queryset.filter(**{f"{field}__gte": datetime.combine(start, datetime.min.time(), tz)})
+        if end is not None:
+            queryset = queryset.filter(**{f"{field}__lt": datetime.combine(end + timedelta(days=1), datetime.min.time(), tz)})
+        return queryset
+
+    days: dict[date, dict] = {}
+
+    def merge(values: dict[date, dict]):
+        for day, row in values.items():
+            days.setdefault(day, dict.fromkeys(RECALCULEES, 0)).update(
+                {name: value or 0 for name, value in row.items()}
+            )
+
+    merge(_per_day(window(Voiture.objects.all(), "date_ajout"), "date_ajout", annonces_creees=Count("id")))
+    merge(_per_day(window(User.objects.all(), "date_joined"), "date_joined", nouveaux_utilisateurs=Count("id")))
+    merge(
+        _per_day(
+            window(Transaction.objects.all(), "date_transaction"),
+            "date_transaction",
+            annonces_reservees=Count("id"),
+            chiffre_affaires=Sum("prix_final", filter=Q(statut__in=VENDUS)),
+            **{column: Count("id", filter=Q(statut=statut)) for statut, column in STATUTS.items()},
+        )
+    )
+    # Une vente est datée de sa confirmation, dernière mise à jour de la transaction.
+    merge(
+        _per_day(
+            window(Transaction.objects.filter(statut__in=VENDUS), "date_mise_a_jour"),
+            "date_mise_a_jour",
+            annonces_vendues=Count("id"),
+        )
+    )
+    return days
+
+
+@transaction.atomic
+def rebuild(start: date | None = None, end: date | None = None) -> int:
+    """
+    Recalcule les jours de [start, end] (tout l'historique par défaut) ; les vues sont conservées.
+    Renvoie le nombre de lignes corrigées.
+    """
+    expected = compute(start, end)
+    existing = StatistiqueJour.objects.all()
+    if start is not None:
+        existing = existing.filter(jour__gte=start)
+    if end is not None:
+        existing = existing.filter(jour__lte=end)
+    current = {row.jour: row for row in existing}
+
+    zero = dict.fromkeys(RECALCULEES, 0)
+    to_create, to_update = [], []
+    for day in expected.keys() | current.keys():
+        values = expected.get(day, zero)
+        row = current.get(day)
+        if row is None:
+            to_create.append(StatistiqueJour(jour=day, **values))
+        elif any(getattr(row, name) != values[name] for name in RECALCULEES):
+            for name in RECALCULEES:
+                setattr(row, name, values[name])
+            to_update.append(row)
+    StatistiqueJour.objects.bulk_create(to_create, batch_size=1000)
+    StatistiqueJour.objects.bulk_update(to_update, list(RECALCULEES), batch_size=1000)
+    return len(to_create) + len(to_update)
+
+
+def totals() -> dict:
+    """Totaux du dashboard : une agrégation sur les lignes quotidiennes (O(jours))."""
+    sums = StatistiqueJour.objects.aggregate(
+        total_utilisateurs=Sum("nouveaux_utilisateurs"),
+        total_voitures=Sum("annonces_creees"),
+        chiffre_affaires=Sum("chiffre_affaires"),
+        **{column: Sum(column) for column in STATUTS.values()},
+    )
+    return {
+        "total_utilisateurs": sums["total_utilisateurs"] or 0,
+        "total_voitures": sums["total_voitures"] or 0,
+        "total_transactions": sum(sums[column] or 0 for column in STATUTS.values()),
+        "chiffre_affaires": sums["chiffre_affaires"] or 0,
+    }
+
+
+def series(days: int = 30) -> list[StatistiqueJour]:
+    """Les `days` derniers jours, du plus ancien au plus récent, jours vides compris."""
+    today = timezone.localdate()
+    first = today - timedelta(days=days - 1)
+    rows = {row.jour: row for row in StatistiqueJour.objects.filter(jour__gte=first, jour__lte=today)}
+    return [rows.get(first + timedelta(days=i)) or StatistiqueJour(jour=first + timedelta(days=i)) for i in range(days)]
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from collections import Counter
+from pathlib import PurePosixPath
+from typing import Iterable
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from PIL import Image
+
+BLOB_PREFIX = "blobs/"
+
+# Format réel (Pillow) -> extension ; et variantes d'écriture d'une même extension.
+_EXTENSIONS = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp", "GIF": ".gif"}
+_ALIAS = {".jpeg": ".jpg", ".jpe": ".jpg", ".jfif": ".jpg"}
+
+
+def blob_name(sha256: str, ext: str) -> str:
+    """Nom de stockage d'un contenu : blobs/ab/cd/abcd…<ext> (l'extension est gardée pour le type MIME)."""
+    return f"{BLOB_PREFIX}{sha256[:2]}/{sha256[2:4]}/{sha256}{ext.lower()}"
+
+
+def blob_sha(name: str | None) -> str | None:
+    """Empreinte d'un nom du stockage par contenu, quelle que soit son extension."""
+    return PurePosixPath(name).stem if is_blob(name) else None
+
+
+def content_extension(fh, name: str) -> str:
+    """
+    Extension d'un contenu : celle de son format réel (en-tête lu par Pillow) pour une image,
+    sinon celle de `name`, normalisée. Un même contenu reçu en .jpeg, .JPG ou .jpg a ainsi
+    toujours le même nom.
+    """
+    position = fh.tell()
+    try:
+        with Image.open(fh) as image:
+            fmt = image.format
+    except Exception:
+        fmt = None
+    finally:
+        fh.seek(position)
+    if fmt in _EXTENSIONS:
+        return _EXTENSIONS[fmt]
+    ext = PurePosixPath(name).suffix.lower()
+    return _ALIAS.get(ext, ext)
+
+
+def is_blob(name: str | None) -> bool:
+    return bool(name) and name.startswith(BLOB_PREFIX)
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stockage par contenu (SHA-256) : deux fichiers identiques ne sont écrits qu'une fois,
+    quel que soit le nom d'origine. Chaque contenu a une ligne FichierMedia dont le compteur
+    de références est tenu par les signaux (voitures.signals) ; les contenus qui ne sont plus
+    référencés sont supprimés par `python manage.py gc_blobs`.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # Le nom final dépend du contenu : pas de suffixe aléatoire en cas de collision.
+        return name
+
+    def _save(self, name, content):
+        digest = hashlib.sha256()
+        size = 0
+        if hasattr(content, "seek"):
+            content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+            size += len(chunk)
+        sha = digest.hexdigest()
+        content.seek(0)
+        name = blob_name(sha, content_extension(content, name))
+
+        if not self.exists(name):
+            path = self.path(name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            content.seek(0)
+            with open(tmp, "wb") as fh:
+                for chunk in content.chunks():
+                    fh.write(chunk)
+            # Même contenu => même nom : un remplacement concurrent est sans effet.
+            os.replace(tmp, path)
+        register([(sha, name, size)])
+        return name
+
+    def delete(self, name):
+        # Un contenu peut être partagé : seul le ramasse-miettes (gc_blobs) supprime des fichiers.
+        if not is_blob(name):
+            super().delete(name)
+
+    def delete_blob(self, name):
+        super().delete(name)
+
+    def blob_files(self, sha256: str) -> list[str]:
+        """Noms présents sur disque pour ce contenu, quelle que soit leur extension."""
+        directory = PurePosixPath(blob_name(sha256, ""))
+        try:
+            _, filenames = self.listdir(str(directory.parent))
+        except FileNotFoundError:
+            return []
+        return [
+            str(directory.parent / filename)
+            for filename in filenames
+            if PurePosixPath(filename).stem == sha256 and not filename.endswith(".tmp")
+        ]
+
+
+_storage = ContentAddressedStorage()
+
+
+def blob_storage() -> ContentAddressedStorage:
+    return _storage
+
+
+def register(entries: Iterable[tuple[str, str, int]]) -> None:
+    """Déclare des contenus (sha256, nom, taille) écrits sur disque, sans toucher à leurs références."""
+    FichierMedia = apps.get_model("voitures", "FichierMedia")
+    entries = list(entries)
+    FichierMedia.objects.bulk_create(
+        [FichierMedia(sha256=sha, nom=name, taille=size) for sha, name, size in entries],
+        ignore_conflicts=True,
+    )
+    # Un contenu réutilisé repart pour un délai de grâce complet avant d'être ramassable.
+    FichierMedia.objects.filter(sha256__in=[sha for sha, _, _ in entries]).update(date_maj=timezone.now())
+
+
+def _adjust(names: Iterable[str | None], sign: int) -> None:
+    # Par empreinte (clé primaire) : un nom d'une autre extension compte pour le même contenu.
+    FichierMedia = apps.get_model("voitures", "FichierMedia")
+    counts = Counter(blob_sha(name) for name in names if is_blob(name))
+    by_count: dict[int, list[str]] = {}
+    for sha, n in counts.items():
+        by_count.setdefault(n, []).append(sha)
+    for n, group in by_count.items():
+        FichierMedia.objects.filter(sha256__in=group).update(
+            references=Greatest(F("references") + sign * n, Value(0))
+        )
+
+
+def retain(names: Iterable[str | None]) -> None:
+    _adjust(names, +1)
+
+
+def release(names: Iterable[str | None]) -> None:
+    _adjust(names, -1)
+
+
+# Champs image stockés par contenu : (app_label.Modele, champ).
+FIELDS = (
+    ("voitures.Voiture", "image_principale"),
+    ("voitures.ImageVoiture", "image"),
+    ("voitures.Marque", "logo"),
+)
+
+
+def count_references() -> Counter:
+    """
+    Références réelles de chaque contenu (par empreinte, toutes extensions confondues), relues
+    depuis les tables : source de vérité du ramasse-miettes.
+    """
+    counts: Counter = Counter()
+    for label, field in FIELDS:
+        model = apps.get_model(label)
+        names = model.objects.filter(**{f"{field}__startswith": BLOB_PREFIX}).values_list(field, flat=True)
+        counts.update(blob_sha(name) for name in names.iterator(chunk_size=2000))
+    return counts
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import logging
+import traceback
+from datetime import timedelta
+from typing import Callable
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from voitures import alertes, images, similaires
+from voitures.models import Tache
+
+logger = logging.getLogger(__name__)
+
+HANDLERS: dict[str, Callable[[Tache], None]] = {}
+# Types qui lisent ou écrivent les fichiers médias : exécutés seulement là où le disque est monté.
+MEDIA: set[str] = set()
+
+
+def _setting(name: str, default: int) -> int:
+    return int(getattr(settings, name, default))
+
+
+def handler(type: str, *, media: bool = False):
+    """Enregistre la fonction qui exécute les tâches de ce type (`media` : a besoin du disque média)."""
+
+    def decorator(func: Callable[[Tache], None]) -> Callable[[Tache], None]:
+        HANDLERS[type] = func
+        if media:
+            MEDIA.add(type)
+        return func
+
+    return decorator
+
+
+def enqueue(type: str, /, *, max_tentatives: int | None = None, **donnees) -> Tache:
+    if type not in HANDLERS:
+        raise ValueError(f"Type de tâche inconnu: {type}")
+    return Tache.objects.create(
+        type=type,
+        donnees=donnees,
+        max_tentatives=max_tentatives or _setting("TACHES_MAX_TENTATIVES", 5),
+    )
+
+
+def claim(batch_size: int = 10, media: bool | None = None) -> list[Tache]:
+    """
+    Réserve jusqu'à `batch_size` tâches prêtes à être exécutées.
+    Une tâche "en_cours" dont le bail a expiré (worker arrêté) est reprise.
+    `media` : True pour ne réserver que les types MEDIA, False pour les exclure, None pour tout.
+    """
+    now = timezone.now()
+    lease = timedelta(seconds=_setting("TACHES_DUREE_BAIL", 300))
+    pretes = Tache.objects.filter(statut__in=["en_attente", "en_cours"], disponible_a__lte=now)
+    if media is not None:
+        pretes = pretes.filter(type__in=MEDIA) if media else pretes.exclude(type__in=MEDIA)
+    with transaction.atomic():
+        taches = list(pretes.select_for_update(skip_locked=True).order_by("disponible_a", "id")[:batch_size])
+        for tache in taches:
+            tache.statut = "en_cours"
+            tache.tentatives += 1
+            tache.disponible_a = now + lease
+            tache.date_mise_a_jour = now
+        Tache.objects.bulk_update(taches, ["statut", "tentatives", "disponible_a", "date_mise_a_jour"])
+    return taches
+
+
+def run(tache: Tache) -> bool:
+    func = HANDLERS.get(tache.type)
+    try:
+        if func is None:
+            raise ValueError(f"Type de tâche inconnu: {tache.type}")
+        func(tache)
+    except Exception:
+        tache.derniere_erreur = traceback.format_exc()
+        if tache.tentatives >= tache.max_tentatives:
+            tache.statut = "echouee"
+            logger.exception("Tâche #%s abandonnée après %s tentatives", tache.id, tache.tentatives)
+        else:
+            # Backoff exponentiel : 30s, 60s, 120s, ... plafonné à 1h.
+            delay = min(30 * 2 ** (tache.tentatives - 1), 3600)
+            tache.statut = "en_attente"
+            tache.disponible_a = timezone.now() + timedelta(seconds=delay)
+            logger.warning("Tâche #%s en échec, nouvel essai dans %ss", tache.id, delay)
+        tache.save(update_fields=["statut", "disponible_a", "derniere_erreur", "date_mise_a_jour"])
+        return False
+
+    tache.statut = "terminee"
+    tache.derniere_erreur = ""
+    tache.save(update_fields=["statut", "donnees", "derniere_erreur", "date_mise_a_jour"])
+    return True
+
+
+def purge() -> int:
+    """
+    Supprime les tâches terminées ou abandonnées anciennes. Renvoie le nombre de tâches supprimées.
+    `disponible_a` (fin du bail de la dernière tentative) date la fin de la tâche et suit l'index
+    (statut, disponible_a).
+    """
+    now = timezone.now()
+    deleted = 0
+    for statut, days in (
+        ("terminee", _setting("TACHES_RETENTION_JOURS", 7)),
+        ("echouee", _setting("TACHES_RETENTION_ECHOUEES_JOURS", 30)),
+    ):
+        deleted += Tache.objects.filter(statut=statut, disponible_a__lt=now - timedelta(days=days)).delete()[0]
+    return deleted
+
+
+def run_pending(batch_size: int = 10, media: bool | None = None) -> int:
+    taches = claim(batch_size, media)
+    for tache in taches:
+        run(tache)
+    return len(taches)
+
+
+# ==================== HANDLERS ====================
+
+@handler("similar_cars")
+def similar_cars(tache: Tache) -> None:
+    """Met à jour les annonces similaires après la création, modification ou suppression d'annonces."""
+    similaires.refresh(tache.donnees["ids"])
+
+
+@handler("saved_search_matches")
+def saved_search_matches(tache: Tache) -> None:
+    """Notifie les utilisateurs dont une recherche sauvegardée trouve la nouvelle annonce."""
+    alertes.notify_matches(tache.donnees["voiture_id"])
+
+
+@handler("image_variants", media=True)
+def image_variants(tache: Tache) -> None:
+    """Déclinaisons d'une photo qui vient d'être enregistrée, et sa largeur sur la ligne concernée."""
+    donnees = tache.donnees
+    images.generate_for_row(apps.get_model(donnees["modele"]), donnees["pk"], donnees["champ"], donnees["nom"])
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+from decimal import Decimal
+
+from django import template
+from django.utils.html import format_html, format_html_join
+
+register = template.Library()
+
+
+@register.simple_tag
+def barres(serie, champ: str, hauteur: int = 48, libelle: str = ""):
+    """
+    Histogramme SVG (sans JavaScript) d'une colonne de StatistiqueJour sur une série de jours.
+    Usage : {% barres serie 'annonces_creees' 48 'Annonces' %}
+    """
+    valeurs = [getattr(jour, champ) or 0 for jour in serie]
+    if not valeurs:
+        return ""
+    plus_grand = max(max(valeurs), 1)
+    largeur = 10
+    barres = []
+    for i, (jour, valeur) in enumerate(zip(serie, valeurs)):
+        h = max(0, round(float(Decimal(valeur) / Decimal(plus_grand)) * hauteur, 1))
+        barres.append((i * largeur + 1, hauteur - h, largeur - 2, h, f"{jour.jour:%d/%m} : {int(valeur)}"))
+    rects = format_html_join(
+        "",
+        '<rect x="{}" y="{}" width="{}" height="{}" rx="1"><title>{}</title></rect>',
+        barres,
+    )
+    return format_html(
+        '<svg class="am-graphique" viewBox="0 0 {} {}" preserveAspectRatio="none" role="img" aria-label="{}" '
+        'width="100%" height="{}" fill="currentColor">{}</svg>',
+        len(valeurs) * largeur, hauteur, libelle or champ, hauteur, rects,
+    )
@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+from django import template
+
+from voitures.images import picture_sources
+
+register = template.Library()
+
+
+@register.inclusion_tag("voitures/_picture.html")
+def picture(field_file, variant: str = "card", alt: str = "", sizes: str | None = None, lazy: bool = False) -> dict:
+    """
+    <picture> d'une photo redimensionnée : WebP, puis JPEG en repli, puis l'image par défaut.
+    Usage : {% picture voiture.image_principale 'card' alt=voiture.modele lazy=True %}
+    """
+    return {**picture_sources(field_file, variant, sizes), "alt": alt, "lazy": lazy}
@@ -1,3 +1,387 @@
-from django.test import TestCase
+import io
+import random
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from voitures import compteur_vues, recherche, sante, stockage, taches, urls, views
+from voitures.alertes import Index
+from voitures.models import (
+    Favori, FichierMedia, Marque, Message, Modele, Notification, RechercheSauvegardee, StatistiqueJour, Tache,
+    Transaction, Voiture, VoitureSimilaire,
+)
+from voitures.pagination import KeysetPaginator
+from voitures.requetes import assert_queries
+
+# Liste des marques dans l'admin : session, utilisateur, deux comptages, la page, le compteur
+# de notifications non lues (context processor) et le filtre par pays.
+BUDGET_ADMIN_MARQUES = 7
+
+# Vue -> utilisateur connecté pour test_budgets (par défaut : l'acheteur ; None : anonyme).
+ROLES_BUDGET = {
+    "accueil": None,
+    "liste_voitures": None,
+    "detail_voiture": None,
+    "modifier_voiture": "vendeur",
+    "mes_voitures": "vendeur",
+    "mes_ventes": "vendeur",
+    "dashboard": "admin",
+}
+
+
+# Sans collectstatic ni cache partagé : fichiers statiques non hachés, cache propre au processus.
+@override_settings(
+    STORAGES={
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    },
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+)
+class BudgetRequetesTests(TestCase):
+    """
+    Budgets @query_budget et détection des N+1 (voitures.requetes) sur des pages qui affichent
+    assez de lignes pour qu'une requête par ligne dépasse REQUETES_SEUIL_N_PLUS_1.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendeur = User.objects.create_user("vendeur", password="Vendeur123!")
+        cls.acheteur = User.objects.create_user("acheteur", password="Acheteur123!")
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "Admin123!")
+        voitures = []
+        for i, nom in enumerate(["Renault", "Peugeot", "Toyota", "Dacia", "Kia"]):
+            marque = Marque.objects.create(nom=nom, pays="France", date_creation=date(1900 + i, 1, 1))
+            for j in range(2):
+                modele = Modele.objects.create(marque=marque, nom=f"Modèle {j}", annee_lancement=2000 + j)
+                voitures += [
+                    Voiture.objects.create(
+                        modele=modele,
+                        prix=10000 + 1000 * k,
+                        kilometrage=20000 * k,
+                        annee=2015 + k,
+                        couleur="blanc",
+                        etat="occasion",
+                        description=f"Annonce {nom} {j} {k}",
+                        vendeur=cls.vendeur,
+                    )
+                    for k in range(2)
+                ]
+        cls.voiture = voitures[0]
+        VoitureSimilaire.objects.bulk_create(
+            VoitureSimilaire(voiture=cls.voiture, similaire=v, rang=rang, distance=float(rang))
+            for rang, v in enumerate(voitures[1:9])
+        )
+        # Assez de lignes par page (REQUETES_SEUIL_N_PLUS_1) pour qu'un N+1 se voie.
+        for v in voitures[:6]:
+            Favori.objects.create(utilisateur=cls.acheteur, voiture=v)
+            Transaction.objects.create(voiture=v, acheteur=cls.acheteur, vendeur=cls.vendeur, prix_final=v.prix)
+            Message.objects.create(expediteur=cls.acheteur, destinataire=cls.vendeur, sujet=str(v), contenu="Bonjour")
+            Message.objects.create(expediteur=cls.vendeur, destinataire=cls.acheteur, sujet=str(v), contenu="Oui")
+            Notification.objects.create(utilisateur=cls.acheteur, type="message", titre=str(v))
+            RechercheSauvegardee.objects.create(utilisateur=cls.acheteur, nom=str(v), filtres={"marque": str(v.modele.marque_id)})
+
+    def setUp(self):
+        # Pire cas : aucune page ni compteur en cache.
+        cache.clear()
+
+    def tearDown(self):
+        # Vues mises en tampon par detail_voiture : écrites dans la base de test, pas à la sortie du processus.
+        compteur_vues.flush()
+
+    def test_budgets(self):
+        """Chaque vue @query_budget de voitures/urls.py, caches vides, tient dans son budget."""
+        users = {"vendeur": self.vendeur, "acheteur": self.acheteur, "admin": self.admin}
+        kwargs = {"voiture_id": self.voiture.id}
+        vues = [p for p in urls.urlpatterns if getattr(p.callback, "query_budget", None) is not None]
+        self.assertGreaterEqual(len(vues), 10)
+        for pattern in vues:
+            with self.subTest(vue=pattern.name):
+                cache.clear()
+                self.client.logout()
+                role = ROLES_BUDGET.get(pattern.name, "acheteur")
+                if role:
+                    self.client.force_login(users[role])
+                url = reverse(pattern.name, kwargs={k: kwargs[k] for k in pattern.pattern.converters})
+                with assert_queries(pattern.callback.query_budget):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_budgets_caches_chauds(self):
+        """Vues qui déclarent un budget `warm` : la deuxième visite anonyme le respecte."""
+        vues = [p for p in urls.urlpatterns if getattr(p.callback, "query_budget_warm", None) is not None]
+        self.assertTrue(vues)
+        for pattern in vues:
+            with self.subTest(vue=pattern.name):
+                url = reverse(pattern.name)
+                self.client.get(url)
+                with assert_queries(pattern.callback.query_budget_warm):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_detail_voiture(self):
+        with assert_queries(views.detail_voiture.query_budget):
+            response = self.client.get(reverse("detail_voiture", args=[self.voiture.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["voitures_similaires"]), 4)
+
+    def test_mes_voitures(self):
+        self.client.force_login(self.vendeur)
+        with assert_queries(views.mes_voitures.query_budget):
+            response = self.client.get(reverse("mes_voitures"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["voitures"]), 20)
+
+    def test_admin_liste_marques(self):
+        self.client.force_login(self.admin)
+        with assert_queries(BUDGET_ADMIN_MARQUES):
+            response = self.client.get(reverse("admin:voitures_marque_changelist"))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Peugeot")
+
+
+class PaginationTests(TestCase):
+    """KeysetPaginator : ni doublon ni oubli quand plusieurs lignes ont la même valeur de tri."""
+
+    @classmethod
+    def setUpTestData(cls):
+        vendeur = User.objects.create_user("vendeur")
+        marque = Marque.objects.create(nom="Toyota", pays="Japon", date_creation=date(1937, 8, 28))
+        modele = Modele.objects.create(marque=marque, nom="Yaris", annee_lancement=1999)
+        # Trois prix seulement pour 11 annonces : chaque page coupe un groupe d'ex aequo.
+        for i in range(11):
+            Voiture.objects.create(
+                modele=modele, prix=10000 + 1000 * (i % 3), kilometrage=0, annee=2020, couleur="blanc",
+                etat="occasion", description="Yaris hybride", vendeur=vendeur,
+            )
+
+    def _parcourir(self, queryset, field, descending):
+        paginator = KeysetPaginator(queryset, field, descending, per_page=4)
+        pages, cursor = [], None
+        while True:
+            page = paginator.get_page(cursor)
+            pages.append([v.id for v in page])
+            if not page.has_next():
+                return paginator, pages
+            cursor = page.next_cursor
+
+    def test_ex_aequo(self):
+        for descending in (False, True):
+            with self.subTest(descending=descending):
+                prefix = "-" if descending else ""
+                attendu = list(Voiture.objects.order_by(f"{prefix}prix", f"{prefix}id").values_list("id", flat=True))
+                _, pages = self._parcourir(Voiture.objects.all(), "prix", descending)
+                self.assertEqual([i for page in pages for i in page], attendu)
+
+    def test_page_precedente(self):
+        paginator, pages = self._parcourir(Voiture.objects.all(), "prix", False)
+        deuxieme = paginator.get_page(paginator.get_page(None).next_cursor)
+        precedente = paginator.get_page(deuxieme.previous_cursor)
+        self.assertEqual([v.id for v in precedente], pages[0])
+        self.assertFalse(precedente.has_previous())
+
+    def test_pertinence(self):
+        # Même texte partout : toutes les annonces ont la même pertinence.
+        resultats = recherche.search(Voiture.objects.all(), "yaris")
+        _, pages = self._parcourir(resultats, "pertinence", True)
+        ids = [i for page in pages for i in page]
+        self.assertEqual(ids, sorted(Voiture.objects.values_list("id", flat=True), reverse=True))
+
+
+@override_settings(VUES_FENETRE_DEDUP=1800, CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class CompteurVuesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        vendeur = User.objects.create_user("vendeur")
+        marque = Marque.objects.create(nom="Dacia", pays="Roumanie", date_creation=date(1966, 1, 1))
+        modele = Modele.objects.create(marque=marque, nom="Sandero", annee_lancement=2008)
+        cls.voiture = Voiture.objects.create(
+            modele=modele, prix=9000, kilometrage=0, annee=2021, couleur="gris", etat="occasion",
+            description="Sandero", vendeur=vendeur,
+        )
+
+    def setUp(self):
+        cache.clear()
+        compteur_vues.flush()
+        self.factory = RequestFactory()
+
+    def _visite(self, ip):
+        return compteur_vues.record_view(self.factory.get("/", REMOTE_ADDR=ip), self.voiture.id)
+
+    def test_flush(self):
+        self.assertTrue(self._visite("10.0.0.1"))
+        self.assertFalse(self._visite("10.0.0.1"))  # même visiteur, même fenêtre
+        self.assertTrue(self._visite("10.0.0.2"))
+        self.voiture.refresh_from_db()
+        self.assertEqual(self.voiture.vue, 0)  # rien d'écrit avant le flush
+
+        self.assertEqual(compteur_vues.flush(), 2)
+        self.voiture.refresh_from_db()
+        self.assertEqual(self.voiture.vue, 2)
+        self.assertEqual(StatistiqueJour.objects.get(pk=timezone.localdate()).vues, 2)
+        self.assertEqual(compteur_vues.flush(), 0)
+
+    def test_flush_en_echec(self):
+        self._visite("10.0.0.1")
+        with mock.patch("voitures.compteur_vues.statistiques.bump", side_effect=DatabaseError), self.assertLogs(
+            "voitures.compteur_vues", "ERROR"
+        ):
+            self.assertEqual(compteur_vues.flush(), 0)
+        # Les vues sont remises en attente et écrites au flush suivant.
+        self.assertEqual(compteur_vues.flush(), 1)
+        self.voiture.refresh_from_db()
+        self.assertEqual(self.voiture.vue, 1)
+
+
+class TachesTests(TestCase):
+    def setUp(self):
+        self.appels = []
+
+        def echoue(tache):
+            self.appels.append(tache.id)
+            raise RuntimeError("échec")
+
+        taches.handler("test_reussit")(lambda tache: self.appels.append(tache.id))
+        taches.handler("test_echoue")(echoue)
+        taches.handler("test_media", media=True)(lambda tache: self.appels.append(tache.id))
+        for nom in ("test_reussit", "test_echoue", "test_media"):
+            self.addCleanup(taches.HANDLERS.pop, nom)
+        self.addCleanup(taches.MEDIA.discard, "test_media")
+
+    def test_claim(self):
+        prete, plus_tard = taches.enqueue("test_reussit"), taches.enqueue("test_reussit")
+        Tache.objects.filter(id=plus_tard.id).update(disponible_a=timezone.now() + timedelta(hours=1))
+        reservees = taches.claim(10)
+        self.assertEqual([t.id for t in reservees], [prete.id])
+        prete.refresh_from_db()
+        self.assertEqual((prete.statut, prete.tentatives), ("en_cours", 1))
+        self.assertGreater(prete.disponible_a, timezone.now())
+        # Bail en cours : personne d'autre ne la reprend ; bail expiré (worker arrêté) : reprise.
+        self.assertEqual(taches.claim(10), [])
+        Tache.objects.filter(id=prete.id).update(disponible_a=timezone.now() - timedelta(seconds=1))
+        self.assertEqual([t.tentatives for t in taches.claim(10)], [2])
+
+    def test_claim_media(self):
+        normale, media = taches.enqueue("test_reussit"), taches.enqueue("test_media")
+        self.assertEqual([t.id for t in taches.claim(10, media=False)], [normale.id])
+        self.assertEqual([t.id for t in taches.claim(10, media=True)], [media.id])
+
+    def test_nouvel_essai_puis_abandon(self):
+        tache = taches.enqueue("test_echoue", max_tentatives=2)
+        avant = timezone.now()
+        with self.assertLogs("voitures.taches", "WARNING"):
+            self.assertEqual(taches.run_pending(), 1)
+        tache.refresh_from_db()
+        self.assertEqual(tache.statut, "en_attente")
+        self.assertIn("RuntimeError", tache.derniere_erreur)
+        # Premier échec : nouvel essai dans 30 s.
+        self.assertGreaterEqual(tache.disponible_a, avant + timedelta(seconds=30))
+        self.assertEqual(taches.run_pending(), 0)
+
+        Tache.objects.filter(id=tache.id).update(disponible_a=timezone.now())
+        with self.assertLogs("voitures.taches", "ERROR"):
+            self.assertEqual(taches.run_pending(), 1)
+        tache.refresh_from_db()
+        self.assertEqual((tache.statut, tache.tentatives), ("echouee", 2))
+        self.assertEqual(self.appels, [tache.id, tache.id])
+
+    def test_reussite(self):
+        tache = taches.enqueue("test_reussit")
+        self.assertEqual(taches.run_pending(), 1)
+        tache.refresh_from_db()
+        self.assertEqual((tache.statut, tache.derniere_erreur), ("terminee", ""))
+
+
+class IndexAlertesTests(TestCase):
+    """alertes.Index.candidates comparé à un filtrage exhaustif des bornes."""
+
+    def test_candidates(self):
+        rng = random.Random(0)
+        prix = [5000, 10000, 15000, 20000, 30000]
+        annees = [2010, 2015, 2018, 2020]
+        recherches = []
+        for i in range(300):
+            filtres = {}
+            if rng.random() < 0.7:
+                filtres["marque"] = str(rng.randint(1, 3))
+            for nom, valeurs in (("prix_min", prix), ("prix_max", prix), ("annee_min", annees), ("annee_max", annees)):
+                if rng.random() < 0.5:
+                    filtres[nom] = str(rng.choice(valeurs))
+            recherches.append((i, 1, f"r{i}", filtres))
+        index = Index(recherches)
+
+        def accepte(filtres, marque, p, a):
+            return (
+                int(filtres.get("marque", marque)) == marque
+                and int(filtres.get("prix_min", p)) <= p <= int(filtres.get("prix_max", p))
+                and int(filtres.get("annee_min", a)) <= a <= int(filtres.get("annee_max", a))
+            )
+
+        # Valeurs sur les bornes (intervalles fermés), entre elles et au-delà.
+        for marque in (1, 2, 3, 4):
+            for p in [1000, *prix, 12500, 50000]:
+                for a in [2000, *annees, 2016, 2030]:
+                    attendu = [i for i, (_, _, _, f) in enumerate(recherches) if accepte(f, marque, p, a)]
+                    self.assertEqual(sorted(index.candidates(marque, p, a)), attendu, (marque, p, a))
+
+
+@override_settings(HEALTHCHECK_DB_TIMEOUT_MS=300)
+class SanteTests(TestCase):
+    def test_base_joignable(self):
+        ok, checks = sante.readiness()
+        self.assertEqual(checks["database"]["status"], "ok")
+
+    def test_delai_de_la_sonde(self):
+        # Pilote bloqué (réseau coupé, verrou) : la sonde rend la main au bout du délai.
+        libere = threading.Event()
+        self.addCleanup(libere.set)
+        with mock.patch("voitures.sante._ping_database", side_effect=lambda timeout_ms: libere.wait(5)):
+            start = time.perf_counter()
+            with self.assertLogs("voitures.sante", "ERROR"):
+                ok, checks = sante.readiness()
+            elapsed = time.perf_counter() - start
+        self.assertFalse(ok)
+        self.assertEqual(checks["database"]["status"], "error")
+        self.assertEqual(checks["migrations"]["status"], "skipped")
+        self.assertLess(elapsed, 1.0)
+
+
+class StockageTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.storage = stockage.blob_storage()
+        buffer = io.BytesIO()
+        Image.new("RGB", (8, 8), "red").save(buffer, "JPEG")
+        self.contenu = buffer.getvalue()
+
+    def test_extension_du_format_reel(self):
+        noms = {self.storage.save(nom, ContentFile(self.contenu)) for nom in ("a.jpeg", "b.JPG", "c.png")}
+        self.assertEqual(len(noms), 1)
+        self.assertTrue(noms.pop().endswith(".jpg"))
+
+    def test_gc_connait_toutes_les_extensions(self):
+        nom = self.storage.save("a.jpg", ContentFile(self.contenu))
+        sha = stockage.blob_sha(nom)
+        stockage.register([(sha, nom, len(self.contenu))])
+        # Copie laissée sous une autre extension (ancienne version, import interrompu).
+        alias = stockage.blob_name(sha, ".jpeg")
+        with open(self.storage.path(alias), "wb") as fh:
+            fh.write(self.contenu)
+
+        call_command("gc_blobs", grace_hours=0, stdout=io.StringIO())
+        self.assertEqual(FichierMedia.objects.count(), 0)
+        self.assertFalse(self.storage.exists(nom))
+        self.assertFalse(self.storage.exists(alias))
@@ -1,6 +1,6 @@
 from django.urls import path
 from django.contrib.auth import views as auth_views
-from . import views
+from . import api, views
 from .forms import PasswordResetEmailForm, SetPasswordStyledForm
 
 urlpatterns = [
@@ -17,6 +17,9 @@ urlpatterns = [
     
     path('mes-voitures/', views.mes_voitures, name='mes_voitures'),
     path('mes-favoris/', views.mes_favoris, name='mes_favoris'),
+    path('mes-recherches/', views.mes_recherches, name='mes_recherches'),
+    path('mes-recherches/enregistrer/', views.enregistrer_recherche, name='enregistrer_recherche'),
+    path('mes-recherches/<int:recherche_id>/supprimer/', views.supprimer_recherche, name='supprimer_recherche'),
     path('mes-achats/', views.mes_achats, name='mes_achats'),
     path('mes-ventes/', views.mes_ventes, name='mes_ventes'),
     path('mes-messages/', views.mes_messages, name='mes_messages'),
@@ -42,7 +45,21 @@ urlpatterns = [
     
     # Pages d'administration (pour les utilisateurs staff)
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('dashboard/export/<str:dataset>.<str:fmt>', views.exporter, name='exporter'),
+    path('dashboard/profils/', views.profils, name='profils'),
+    path('dashboard/profils/<str:capture_id>/', views.profil, name='profil'),
+    path('dashboard/profils/<str:capture_id>/<str:kind>/', views.profil_fichier, name='profil_fichier'),
     
+    # API JSON en lecture seule (partenaires)
+    path('api/voitures/', api.voitures, name='api_voitures'),
+    path('api/voitures/<int:voiture_id>/', api.voiture, name='api_voiture'),
+    path('api/marques/', api.marques, name='api_marques'),
+    path('api/modeles/', api.modeles, name='api_modeles'),
+
+    # Sondes de santé (Render, load balancer)
+    path('healthz', views.healthz, name='healthz'),
+    path('readyz', views.readyz, name='readyz'),
+
     # Page de test
     path('test/', views.test, name='test'),
 ]
@@ -4,26 +4,24 @@ from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User  # IMPORT AJOUTÉ
 from django.contrib import messages
-from django.db.models import Q, Count, Avg, Sum
-from django.core.paginator import Paginator
-from django.http import HttpResponse
+from django.db import transaction as db_transaction
+from django.conf import settings
+from django.urls import reverse
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.views.decorators.cache import never_cache
 from django.views.decorators.http import require_POST
 import os
-from .models import Marque, Modele, Voiture, Favori, Transaction, Avis, Message, Notification
+import time
+from urllib.parse import urlencode
+from .models import Marque, Modele, Voiture, Favori, Transaction, Avis, Message, Notification, RechercheSauvegardee
 from .forms import InscriptionForm, AvisForm
-
-
-def _validate_uploaded_image(uploaded_file):
-    if not uploaded_file:
-        return None
-    max_bytes = 5 * 1024 * 1024  # 5MB
-    if uploaded_file.size and uploaded_file.size > max_bytes:
-        return "Image trop volumineuse (max 5MB)."
-    content_type = getattr(uploaded_file, "content_type", "") or ""
-    allowed = {"image/jpeg", "image/png", "image/webp"}
-    if content_type and content_type.lower() not in allowed:
-        return "Format d'image non supporté (JPG, PNG, WEBP)."
-    return None
+from .catalogue import CATALOGUE, clean_filters, estimated_stats, filter_voitures, homepage_snapshot, invalidate_homepage
+from .compteur_vues import record_view
+from .notifications import invalidate_unread, mark_all_read, recent_notifications
+from .pagination import SORTS, KeysetPaginator
+from .requetes import query_budget
+from . import alertes, caches, export, facettes, images, notes, profilage, sante, similaires, statistiques
 
 
 def _staff_users():
@@ -38,104 +36,75 @@ def _notify(users, *, type, titre, contenu="", url=""):
     ]
     if notifications:
         Notification.objects.bulk_create(notifications)
+        invalidate_unread({n.utilisateur_id for n in notifications})
 
 # ==================== VUES PUBLIQUES ====================
 
+# Caches vides : le contexte (cinq requêtes), plus session, utilisateur et notifications non lues.
+@query_budget(8, warm=0)
 def accueil(request):
     """Page d'accueil du site"""
-    voitures_recentes = Voiture.objects.filter(est_vendue=False).order_by('-date_ajout')[:6]
-    voitures_promo = Voiture.objects.filter(est_vendue=False).order_by('prix')[:6]
-    marques_populaires = Marque.objects.annotate(
-        nb_voitures=Count('modeles__voitures')
-    ).order_by('-nb_voitures')[:8]
-    
-    context = {
-        'voitures_recentes': voitures_recentes,
-        'voitures_promo': voitures_promo,
-        'marques_populaires': marques_populaires,
-        'marques': Marque.objects.all().order_by('nom'),
-        'voitures_vedette': Voiture.objects.filter(est_vendue=False).select_related('modele__marque').order_by('-date_ajout')[:12],
-        'total_voitures': Voiture.objects.filter(est_vendue=False).count(),
-    }
+    context = homepage_snapshot()
     return render(request, 'voitures/accueil.html', context)
 
+@query_budget(8)
 def liste_voitures(request):
     """Liste toutes les voitures avec filtres"""
     voitures_list = Voiture.objects.filter(est_vendue=False).select_related(
         'modele__marque', 'vendeur'
     ).prefetch_related('favoris')
 
-    q = request.GET.get("q")
-    sort = request.GET.get("sort")
-    statut = request.GET.get("statut")
-    
-    # Récupération des filtres
-    marque_id = request.GET.get('marque')
-    prix_min = request.GET.get('prix_min')
-    prix_max = request.GET.get('prix_max')
-    annee_min = request.GET.get('annee_min')
-    annee_max = request.GET.get('annee_max')
-
-    if q:
-        voitures_list = voitures_list.filter(
-            Q(modele__nom__icontains=q)
-            | Q(modele__marque__nom__icontains=q)
-            | Q(description__icontains=q)
-        )
-    
-    # Application des filtres
-    if marque_id:
-        voitures_list = voitures_list.filter(modele__marque_id=marque_id)
-    
-    if prix_min:
-        voitures_list = voitures_list.filter(prix__gte=prix_min)
-    
-    if prix_max:
-        voitures_list = voitures_list.filter(prix__lte=prix_max)
-    
-    if annee_min:
-        voitures_list = voitures_list.filter(annee__gte=annee_min)
-    
-    if annee_max:
-        voitures_list = voitures_list.filter(annee__lte=annee_max)
-
-    if statut == "reservee":
-        voitures_list = voitures_list.filter(est_reservee=True)
-    elif statut == "disponible":
-        voitures_list = voitures_list.filter(est_reservee=False)
-
-    if sort == "prix_asc":
-        voitures_list = voitures_list.order_by("prix")
-    elif sort == "prix_desc":
-        voitures_list = voitures_list.order_by("-prix")
-    elif sort == "annee_desc":
-        voitures_list = voitures_list.order_by("-annee")
-    elif sort == "km_asc":
-        voitures_list = voitures_list.order_by("kilometrage")
-    
-    # Pagination
-    paginator = Paginator(voitures_list, 12)
-    page_number = request.GET.get('page')
-    voitures = paginator.get_page(page_number)
-    
-    # Calcul du prix moyen
-    prix_moyen = voitures_list.aggregate(Avg('prix'))['prix__avg']
-    
+    sort = request.GET.get("sort") or ""
+    if sort not in SORTS:
+        sort = ""
+    cursor = request.GET.get("cursor")
+
+    # Récupération et application des filtres
+    filters = clean_filters(request.GET)
+    voitures_list = filter_voitures(voitures_list, filters)
+
+    # Pagination par curseur (pas d'OFFSET ni de COUNT(*) par page)
+    field, descending = SORTS[sort]
+    if filters.get('q') and not sort:
+        field, descending = 'pertinence', True
+    voitures = KeysetPaginator(voitures_list, field, descending, per_page=12).get_page(cursor)
+
+    # Nombre de résultats et prix moyen : estimation en cache, calculée sur la première page uniquement
+    stats = estimated_stats(voitures_list, filters, compute=not cursor) or {}
+
+    # Comptes par facette (marque, état, couleur, ...) en une requête groupée, en cache
+    marques = caches.cached_queryset(
+        Marque.objects.all(), 'marques', getattr(settings, 'ACCUEIL_CACHE_TIMEOUT', 3600), depends=(CATALOGUE,)
+    )
+    facets = facettes.build(facettes.cached_counts(voitures_list, filters), filters, marques, request.GET)
+
+    params = request.GET.copy()
+    params.pop("cursor", None)
+    params.pop("page", None)
+    query = params.urlencode()
+
     context = {
         'voitures': voitures,
-        'marques': Marque.objects.all(),
-        'marque_selected': int(marque_id) if marque_id else None,
-        'prix_min': prix_min,
-        'prix_max': prix_max,
-        'annee_min': annee_min,
-        'annee_max': annee_max,
-        'prix_moyen': prix_moyen,
-        'q': q,
+        'marques': marques,
+        'facettes': facets,
+        'filtres': filters,
+        'marque_selected': filters.get('marque'),
+        'prix_min': filters.get('prix_min'),
+        'prix_max': filters.get('prix_max'),
+        'annee_min': filters.get('annee_min'),
+        'annee_max': filters.get('annee_max'),
+        'prix_moyen': stats.get('prix_moyen'),
+        'total_estime': stats.get('total'),
+        'q': filters.get('q'),
         'sort': sort,
-        'statut': statut,
+        'statut': filters.get('statut'),
+        'query': query,
     }
     return render(request, 'voitures/liste_voitures.html', context)
 
+AVIS_PAR_PAGE = 5
+
+@query_budget(10)
 def detail_voiture(request, voiture_id):
     """Page de détails d'une voiture"""
     voiture = get_object_or_404(Voiture.objects.select_related(
@@ -144,7 +113,7 @@ def detail_voiture(request, voiture_id):
 
     if request.method == "GET":
         if not request.user.is_authenticated or request.user != voiture.vendeur:
-            voiture.incrementer_vue()
+            record_view(request, voiture.id)
     
     # Vérifier si l'utilisateur a cette voiture en favoris
     est_favori = False
@@ -154,14 +123,20 @@ def detail_voiture(request, voiture_id):
             voiture=voiture
         ).exists()
     
-    # Récupérer les avis
-    avis = Avis.objects.filter(voiture=voiture, approuve=True)
-    
-    # Voitures similaires
-    voitures_similaires = Voiture.objects.filter(
-        modele__marque=voiture.modele.marque,
-        est_vendue=False
-    ).exclude(id=voiture.id)[:4]
+    # Avis approuvés, par page (la moyenne et le total sont portés par la voiture)
+    avis = KeysetPaginator(
+        Avis.objects.filter(voiture=voiture, approuve=True).select_related('utilisateur'),
+        'date_publication', True, per_page=AVIS_PAR_PAGE,
+    ).get_page(request.GET.get('avis'))
+    
+    # Voitures similaires (précalculées par le worker, voir voitures.similaires)
+    voitures_similaires = list(similaires.for_voiture(voiture))
+    if not voitures_similaires:
+        # Annonce pas encore traitée par le worker : même marque, en attendant
+        voitures_similaires = Voiture.objects.filter(
+            modele__marque=voiture.modele.marque,
+            est_vendue=False
+        ).exclude(id=voiture.id).select_related('modele__marque')[:4]
     
     context = {
         'voiture': voiture,
@@ -251,8 +226,17 @@ def ajouter_voiture(request):
                 }
             )
             
+            # Gestion de l'image (validée et normalisée avant de créer l'annonce)
+            image = None
+            if 'image' in request.FILES:
+                try:
+                    image = images.normalize_upload(request.FILES['image'])
+                except images.InvalidImage as exc:
+                    messages.error(request, str(exc))
+                    return redirect("ajouter_voiture")
+
             # Création de la voiture
-            voiture = Voiture.objects.create(
+            voiture = Voiture(
                 modele=modele,
                 prix=prix,
                 kilometrage=kilometrage,
@@ -262,16 +246,9 @@ def ajouter_voiture(request):
                 description=description,
                 vendeur=request.user
             )
-            
-            # Gestion de l'image
-            if 'image' in request.FILES:
-                error = _validate_uploaded_image(request.FILES["image"])
-                if error:
-                    messages.error(request, error)
-                    voiture.delete()
-                    return redirect("ajouter_voiture")
-                voiture.image_principale = request.FILES['image']
-                voiture.save()
+            if image is not None:
+                voiture.image_principale = image
+            voiture.save()
             
             messages.success(request, 'Votre annonce a été publiée avec succès !')
             _notify(
@@ -281,13 +258,8 @@ def ajouter_voiture(request):
                 contenu=f"{request.user.username} a publié l'annonce #{voiture.id}.",
                 url=voiture.get_absolute_url(),
             )
-            _notify(
-                User.objects.filter(is_active=True).exclude(id=request.user.id),
-                type="new_listing",
-                titre="Nouvelle voiture disponible",
-                contenu=f"{voiture.modele.marque.nom} {voiture.modele.nom} ({voiture.annee}).",
-                url=voiture.get_absolute_url(),
-            )
+            # Seuls les utilisateurs dont une recherche sauvegardée trouve l'annonce sont notifiés (worker).
+            alertes.request_matching(voiture.id)
             return redirect('detail_voiture', voiture_id=voiture.id)
             
         except Exception as e:
@@ -298,6 +270,7 @@ def ajouter_voiture(request):
     context = {'marques': marques}
     return render(request, 'voitures/ajouter_voiture.html', context)
 
+@query_budget(10)
 @login_required
 def modifier_voiture(request, voiture_id):
     """Modifier une voiture existante"""
@@ -324,11 +297,11 @@ def modifier_voiture(request, voiture_id):
             
             # Gestion de l'image
             if 'image' in request.FILES:
-                error = _validate_uploaded_image(request.FILES["image"])
-                if error:
-                    messages.error(request, error)
+                try:
+                    voiture.image_principale = images.normalize_upload(request.FILES['image'])
+                except images.InvalidImage as exc:
+                    messages.error(request, str(exc))
                     return redirect('modifier_voiture', voiture_id=voiture.id)
-                voiture.image_principale = request.FILES['image']
             
             voiture.save()
             messages.success(request, 'Annonce mise à jour avec succès !')
@@ -394,26 +367,36 @@ def ajouter_avis(request, voiture_id):
 
     form = AvisForm(request.POST)
     if form.is_valid():
-        avis, created = Avis.objects.get_or_create(
-            voiture=voiture,
-            utilisateur=request.user,
-            defaults={
-                "note": form.cleaned_data["note"],
-                "commentaire": form.cleaned_data["commentaire"],
-                "approuve": False,
-            },
-        )
-        if not created:
-            avis.note = form.cleaned_data["note"]
-            avis.commentaire = form.cleaned_data["commentaire"]
-            avis.approuve = False
-            avis.save(update_fields=["note", "commentaire", "approuve"])
+        with db_transaction.atomic():
+            _enregistrer_avis(voiture, request.user, form.cleaned_data)
         messages.success(request, "Avis envoyé. Il sera visible après validation.")
     else:
         messages.error(request, "Avis invalide. Vérifiez les champs.")
     return redirect("detail_voiture", voiture_id=voiture_id)
 
 
+def _enregistrer_avis(voiture, utilisateur, data):
+    avis, created = Avis.objects.select_for_update().get_or_create(
+        voiture=voiture,
+        utilisateur=utilisateur,
+        defaults={
+            "note": data["note"],
+            "commentaire": data["commentaire"],
+            "approuve": False,
+        },
+    )
+    if not created:
+        etait_approuve = avis.approuve
+        avis.note = data["note"]
+        avis.commentaire = data["commentaire"]
+        avis.approuve = False
+        avis.save(update_fields=["note", "commentaire", "approuve"])
+        # Un avis modifié repasse en modération : il ne compte plus dans la note de l'annonce.
+        if etait_approuve:
+            notes.refresh([voiture.id])
+            db_transaction.on_commit(invalidate_homepage)
+
+
 @login_required
 @require_POST
 def envoyer_message(request, voiture_id):
@@ -444,6 +427,7 @@ def envoyer_message(request, voiture_id):
     return redirect("detail_voiture", voiture_id=voiture_id)
 
 
+@query_budget(8)
 @login_required
 def mes_messages(request):
     recus = Message.objects.filter(destinataire=request.user).select_related("expediteur").order_by("-date_envoi")
@@ -460,16 +444,20 @@ def mes_messages(request):
     return render(request, "voitures/mes_messages.html", context)
 
 
+@query_budget(10)
 @login_required
 def notifications(request):
-    items = Notification.objects.filter(utilisateur=request.user).order_by("-date_creation")[:200]
-    Notification.objects.filter(utilisateur=request.user, lu=False).update(lu=True)
+    items = recent_notifications(request.user, 200)
+    mark_all_read(request.user, items)
     return render(request, "voitures/notifications.html", {"items": items})
 
+@query_budget(12)
 @login_required
 def acheter_voiture(request, voiture_id):
     """Processus d'achat d'une voiture"""
-    voiture = get_object_or_404(Voiture, id=voiture_id, est_vendue=False)
+    voiture = get_object_or_404(
+        Voiture.objects.select_related('modele__marque', 'vendeur'), id=voiture_id, est_vendue=False
+    )
     
     if request.user == voiture.vendeur:
         messages.error(request, 'Vous ne pouvez pas acheter votre propre voiture.')
@@ -492,7 +480,8 @@ def acheter_voiture(request, voiture_id):
             
             # Réserver la voiture (en attente de confirmation du vendeur)
             voiture.est_reservee = True
-            voiture.save()
+            # Seuls ces champs changent : ni réindexation ni réécriture de toute la ligne.
+            voiture.save(update_fields=['est_reservee', 'date_modification'])
 
             _notify(
                 [voiture.vendeur],
@@ -521,10 +510,13 @@ def acheter_voiture(request, voiture_id):
     context = {'voiture': voiture}
     return render(request, 'voitures/acheter_voiture.html', context)
 
+@query_budget(10)
 @login_required
 def mes_voitures(request):
     """Liste des voitures de l'utilisateur"""
-    voitures = Voiture.objects.filter(vendeur=request.user).order_by('-date_ajout')
+    voitures = Voiture.objects.filter(vendeur=request.user).select_related(
+        'modele__marque'
+    ).order_by('-date_ajout')
     
     # Calcul des statistiques
     voitures_en_vente = voitures.filter(est_vendue=False).count()
@@ -539,6 +531,7 @@ def mes_voitures(request):
     }
     return render(request, 'voitures/mes_voitures.html', context)
 
+@query_budget(6)
 @login_required
 def mes_favoris(request):
     """Liste des favoris de l'utilisateur"""
@@ -549,6 +542,46 @@ def mes_favoris(request):
     context = {'favoris': favoris}
     return render(request, 'voitures/mes_favoris.html', context)
 
+@query_budget(6)
+@login_required
+def mes_recherches(request):
+    """Recherches sauvegardées de l'utilisateur"""
+    recherches = RechercheSauvegardee.objects.filter(utilisateur=request.user)
+    context = {'recherches': recherches}
+    return render(request, 'voitures/mes_recherches.html', context)
+
+@require_POST
+@login_required
+def enregistrer_recherche(request):
+    """Sauvegarder les filtres courants de la liste des voitures"""
+    filters = clean_filters(request.POST)
+    filters.pop('statut', None)  # une nouvelle annonce n'est jamais réservée
+    liste_url = reverse('liste_voitures') + ('?' + urlencode(alertes.serialize(filters)) if filters else '')
+    if not filters:
+        messages.error(request, "Choisissez au moins un filtre avant d'enregistrer la recherche.")
+        return redirect(liste_url)
+
+    maximum = getattr(settings, 'RECHERCHES_MAX_PAR_UTILISATEUR', 20)
+    if RechercheSauvegardee.objects.filter(utilisateur=request.user).count() >= maximum:
+        messages.error(request, f"Vous avez déjà {maximum} recherches sauvegardées. Supprimez-en une pour continuer.")
+        return redirect('mes_recherches')
+
+    marque = Marque.objects.filter(id=filters['marque']).first() if 'marque' in filters else None
+    nom = (request.POST.get('nom') or '').strip()[:100] or alertes.describe(filters, marque.nom if marque else None)
+    RechercheSauvegardee.objects.create(utilisateur=request.user, nom=nom, filtres=alertes.serialize(filters))
+    messages.success(request, f"Recherche « {nom} » enregistrée : vous serez notifié des nouvelles annonces.")
+    return redirect(liste_url)
+
+@require_POST
+@login_required
+def supprimer_recherche(request, recherche_id):
+    """Supprimer une recherche sauvegardée"""
+    recherche = get_object_or_404(RechercheSauvegardee, id=recherche_id, utilisateur=request.user)
+    recherche.delete()
+    messages.success(request, f"Recherche « {recherche.nom} » supprimée.")
+    return redirect('mes_recherches')
+
+@query_budget(6)
 @login_required
 def mes_achats(request):
     """Historique des achats de l'utilisateur"""
@@ -559,6 +592,7 @@ def mes_achats(request):
     context = {'achats': achats}
     return render(request, 'voitures/mes_achats.html', context)
 
+@query_budget(6)
 @login_required
 def mes_ventes(request):
     """Historique des ventes de l'utilisateur"""
@@ -610,41 +644,49 @@ def confirmer_vente(request, transaction_id):
 
 # ==================== VUES ADMIN UTILISATEURS ====================
 
+@query_budget(20)
 @login_required
 def dashboard(request):
     """Tableau de bord utilisateur"""
     if not request.user.is_staff:
         return redirect('accueil')
     
-    # Statistiques pour l'admin
-    total_utilisateurs = User.objects.count()
-    total_voitures = Voiture.objects.count()
-    total_transactions = Transaction.objects.count()
-    chiffre_affaires = Transaction.objects.filter(
-        statut__in=['confirmee', 'terminee']
-    ).aggregate(Sum('prix_final'))['prix_final__sum'] or 0
-    
+    # Statistiques et listes partagées par tout le staff : en cache, invalidées par les signaux.
+    # Totaux et séries viennent des agrégats quotidiens (une ligne par jour).
+    timeout = getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 60)
+    stats = caches.get_or_compute(
+        caches.versioned_key('dashboard', depends=(CATALOGUE, 'transactions')),
+        lambda: {**statistiques.totals(), 'serie': statistiques.series(30)},
+        timeout,
+    )
+
     # Dernières transactions
-    transactions_recentes = Transaction.objects.select_related(
-        'voiture', 'acheteur', 'vendeur'
-    ).order_by('-date_transaction')[:10]
+    transactions_recentes = caches.cached_queryset(
+        Transaction.objects.select_related(
+            'voiture__modele__marque', 'acheteur', 'vendeur'
+        ).order_by('-date_transaction')[:10],
+        'transactions', timeout, depends=(CATALOGUE,),
+    )
 
-    transactions_en_attente = Transaction.objects.filter(statut="en_attente").select_related(
-        "voiture", "acheteur", "vendeur"
-    ).order_by("-date_transaction")[:10]
+    transactions_en_attente = caches.cached_queryset(
+        Transaction.objects.filter(statut="en_attente").select_related(
+            "voiture__modele__marque", "acheteur", "vendeur"
+        ).order_by("-date_transaction")[:10],
+        'transactions', timeout, depends=(CATALOGUE,),
+    )
     
     # Voitures récentes
-    voitures_recentes = Voiture.objects.select_related(
-        'modele__marque', 'vendeur'
-    ).order_by('-date_ajout')[:10]
+    voitures_recentes = caches.cached_queryset(
+        Voiture.objects.select_related(
+            'modele__marque', 'vendeur'
+        ).order_by('-date_ajout')[:10],
+        'dashboard', timeout, depends=(CATALOGUE,),
+    )
 
-    notifications_recentes = Notification.objects.filter(utilisateur=request.user).order_by("-date_creation")[:10]
+    notifications_recentes = recent_notifications(request.user, 10)
     
     context = {
-        'total_utilisateurs': total_utilisateurs,
-        'total_voitures': total_voitures,
-        'total_transactions': total_transactions,
-        'chiffre_affaires': chiffre_affaires,
+        **stats,
         'transactions_recentes': transactions_recentes,
         'transactions_en_attente': transactions_en_attente,
         'voitures_recentes': voitures_recentes,
@@ -652,6 +694,78 @@ def dashboard(request):
     }
     return render(request, 'admin/dashboard.html', context)
 
+@login_required
+def exporter(request, dataset, fmt):
+    """Export complet (annonces ou transactions) en CSV ou NDJSON, envoyé au fil de la lecture."""
+    if not request.user.is_staff:
+        return redirect('accueil')
+    if dataset not in export.DATASETS or fmt not in export.CONTENT_TYPES:
+        raise Http404("Export inconnu")
+
+    response = StreamingHttpResponse(export.stream(dataset, fmt), content_type=export.CONTENT_TYPES[fmt])
+    filename = f"{dataset}-{timezone.localdate():%Y%m%d}.{fmt}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+@login_required
+def profils(request):
+    """Requêtes profilées (voitures.profilage), les plus lentes d'abord."""
+    if not request.user.is_staff:
+        return redirect('accueil')
+    if request.method == 'POST':
+        active = request.POST.get('session') == '1'
+        request.session[profilage.SESSION_KEY] = active
+        messages.success(request, "Profilage activé pour votre session." if active else "Profilage désactivé pour votre session.")
+        return redirect('profils')
+
+    context = {
+        'captures': profilage.list_captures(),
+        'actif': getattr(settings, 'PROFILAGE_ACTIF', False),
+        'session_active': request.session.get(profilage.SESSION_KEY, False),
+        'en_tete': profilage.HEADER,
+    }
+    return render(request, 'admin/profils.html', context)
+
+@login_required
+def profil(request, capture_id):
+    """Détail d'une capture : chronologie SQL et gabarits."""
+    if not request.user.is_staff:
+        return redirect('accueil')
+    capture = profilage.load_capture(capture_id)
+    if capture is None:
+        raise Http404("Profil introuvable")
+    return render(request, 'admin/profil.html', {'capture': capture})
+
+@login_required
+def profil_fichier(request, capture_id, kind):
+    if not request.user.is_staff:
+        return redirect('accueil')
+    path = profilage.capture_path(capture_id, kind)
+    if path is None:
+        raise Http404("Profil introuvable")
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=path.name)
+
+# ==================== SANTÉ ====================
+
+@never_cache
+def healthz(request):
+    """Sonde de vivacité : le processus répond, sans toucher à la base."""
+    return JsonResponse({"status": "ok"})
+
+@never_cache
+def readyz(request):
+    """Sonde de disponibilité : base (ping avec timeout), migrations et cache."""
+    start = time.perf_counter()
+    ok, checks = sante.readiness()
+    return JsonResponse(
+        {
+            "status": "ok" if ok else "error",
+            "checks": checks,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+        },
+        status=200 if ok else 503,
+    )
+
 # ==================== VUES D'ERREUR ====================
 
 def handler404(request, exception):